@@ -0,0 +1,59 @@
+from __future__ import annotations
+import argparse
+import json
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+from .db import connect, get_db_url, list_crawl_changes
+
+def parse_since(value: str) -> Tuple[Optional[datetime], Optional[str]]:
+    '''`--since` takes a crawl_run id or an ISO date/timestamp (UTC unless it has an offset).'''
+    try:
+        return None, str(uuid.UUID(value))
+    except ValueError:
+        pass
+    ts = datetime.fromisoformat(value)
+    return (ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)), None
+
+def describe(c: dict) -> str:
+    if c["entity"] == "family":
+        return f"{c['change']:<8} family   {c['family_slug']}"
+    line = f"{c['change']:<8} variant  {c['tag']}"
+    if c["change"] == "changed":
+        diffs = [
+            f"{name} {c['old_' + col]} -> {c['new_' + col]}"
+            for name, col in (("digest", "digest"), ("size", "size_bytes"), ("max_context", "max_context"))
+            if c["old_" + col] != c["new_" + col]
+        ]
+        line += "  (" + ", ".join(diffs) + ")"
+    return line
+
+def main():
+    ap = argparse.ArgumentParser(description="What changed in the catalog: the per-crawl_run change feed")
+    ap.add_argument("--db-url", default=None, help="Postgres or sqlite:///file.db URL (or use DATABASE_URL env var)")
+    ap.add_argument("--since", default=None, metavar="TIME_OR_RUN_ID",
+                    help="Changes recorded after this timestamp, or from runs started after this crawl_run")
+    ap.add_argument("--run", default=None, metavar="RUN_ID", help="Changes of one crawl_run")
+    ap.add_argument("--after-id", type=int, default=None, help="Changes after this feed id (consumer cursor)")
+    ap.add_argument("--entity", choices=["family", "variant"], default=None)
+    ap.add_argument("--json", action="store_true", help="One JSON object per change")
+    args = ap.parse_args()
+
+    since, since_run = parse_since(args.since) if args.since else (None, None)
+    with connect(get_db_url(args.db_url)) as conn:
+        changes = list_crawl_changes(conn, since=since, since_run=since_run, run_id=args.run, after_id=args.after_id)
+    if args.entity:
+        changes = [c for c in changes if c["entity"] == args.entity]
+
+    if args.json:
+        for c in changes:
+            print(json.dumps(c, default=str))
+        return
+    for c in changes:
+        print(f"{c['id']:>8}  {c['run_started_at'][:19]}  {describe(c)}")
+    counts = Counter(f"{c['entity']} {c['change']}" for c in changes)
+    print(f"{len(changes)} changes" + (": " + ", ".join(f"{k}={v}" for k, v in sorted(counts.items())) if counts else ""))
+
+if __name__ == "__main__":
+    main()
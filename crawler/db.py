@@ -1,25 +1,230 @@
 from __future__ import annotations
 import os
 import json
+import sqlite3
+from datetime import datetime, timedelta, timezone
 import psycopg
+from psycopg import sql
 from psycopg.rows import dict_row
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 from .types import FamilyParsed, VariantParsed
+from .embedded import SQLiteConnection, connect_sqlite, is_sqlite_url, utc_now
+
+# Errors that mean "the database is in trouble" (as opposed to a bad page/row) on either backend.
+DB_ERRORS = (psycopg.Error, sqlite3.Error)
 
 def get_db_url(cli_db_url: Optional[str] = None) -> str:
     return cli_db_url or os.environ.get("DATABASE_URL", "")
 
 def connect(db_url: str) -> psycopg.Connection:
+    '''
+    postgresql://... connects to Postgres (schema from migrations/*.sql);
+    sqlite:///path.db opens an embedded file, creating the schema if needed.
+    '''
     if not db_url:
         raise RuntimeError("DATABASE_URL is not set")
+    if is_sqlite_url(db_url):
+        return connect_sqlite(db_url)
     return psycopg.connect(db_url, row_factory=dict_row)
 
-def start_crawl_run(conn: psycopg.Connection) -> str:
+def is_sqlite(conn) -> bool:
+    return isinstance(conn, SQLiteConnection)
+
+def require_postgres(db_url: str, feature: str) -> None:
+    if is_sqlite_url(db_url):
+        raise RuntimeError(f"{feature} needs a Postgres DATABASE_URL (got {db_url!r})")
+
+def start_crawl_run(conn: psycopg.Connection, options: Optional[dict] = None) -> str:
     with conn.cursor() as cur:
-        cur.execute("INSERT INTO crawl_run DEFAULT VALUES RETURNING id;")
+        cur.execute("INSERT INTO crawl_run (options_json) VALUES (%s) RETURNING id;", (json.dumps(options or {}),))
         rid = cur.fetchone()["id"]
         return str(rid)
 
+def find_crawl_run(conn: psycopg.Connection, run_id: Optional[str]) -> Optional[dict]:
+    '''The given run, or the most recent one whatever its status.'''
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT id::text AS id, status, options_json
+            FROM crawl_run
+            WHERE (%(run_id)s::uuid IS NULL OR id = %(run_id)s::uuid)
+            ORDER BY started_at DESC
+            LIMIT 1;
+            """,
+            {"run_id": run_id},
+        )
+        return cur.fetchone()
+
+def reopen_crawl_run(conn: psycopg.Connection, run_id: str) -> None:
+    '''Mark a run running again; failed and abandoned families go back to pending.'''
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE crawl_queue
+            SET status = 'pending', claimed_by = NULL, claimed_at = NULL, error = NULL
+            WHERE run_id = %s AND status IN ('claimed', 'failed');
+            """,
+            (run_id,),
+        )
+        cur.execute("UPDATE crawl_run SET status = 'running', finished_at = NULL WHERE id = %s;", (run_id,))
+
+def enqueue_crawl_families(conn: psycopg.Connection, run_id: str, slugs: List[str]) -> None:
+    with conn.cursor() as cur:
+        if is_sqlite(conn):
+            cur.executemany(
+                "INSERT INTO crawl_queue (run_id, slug, position) VALUES (%s, %s, %s) ON CONFLICT (run_id, slug) DO NOTHING;",
+                [(run_id, slug, position) for position, slug in enumerate(slugs, 1)],
+            )
+            return
+        cur.execute(
+            """
+            INSERT INTO crawl_queue (run_id, slug, position)
+            SELECT %s, x.slug, x.position
+            FROM unnest(%s::text[]) WITH ORDINALITY AS x(slug, position)
+            ON CONFLICT (run_id, slug) DO NOTHING;
+            """,
+            (run_id, slugs),
+        )
+
+def crawl_queue_size(conn: psycopg.Connection, run_id: str, status: Optional[str] = None) -> int:
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT COUNT(*) AS n FROM crawl_queue WHERE run_id = %s AND (%s::text IS NULL OR status = %s);",
+            (run_id, status, status),
+        )
+        return int(cur.fetchone()["n"])
+
+def claim_crawl_families(conn: psycopg.Connection, run_id: str, worker: str, limit: int, stale_after_s: int) -> List[str]:
+    '''
+    Claim the next `limit` families (in library order) for `worker`. SKIP LOCKED lets
+    concurrent workers grab disjoint ranges; claims older than `stale_after_s` are
+    considered abandoned and can be taken over. On SQLite the claim runs under the
+    database write lock instead.
+    '''
+    with conn.cursor() as cur:
+        if is_sqlite(conn):
+            stale_before = (datetime.now(timezone.utc) - timedelta(seconds=stale_after_s)).isoformat(timespec="milliseconds")
+            cur.execute(
+                """
+                UPDATE crawl_queue
+                SET status = 'claimed', claimed_by = %(worker)s, claimed_at = %(now)s
+                WHERE run_id = %(run_id)s AND slug IN (
+                  SELECT slug
+                  FROM crawl_queue
+                  WHERE run_id = %(run_id)s
+                    AND (status = 'pending' OR (status = 'claimed' AND claimed_at < %(stale_before)s))
+                  ORDER BY position
+                  LIMIT %(limit)s
+                )
+                RETURNING slug, position;
+                """,
+                {"worker": worker, "run_id": run_id, "now": utc_now(), "stale_before": stale_before, "limit": limit},
+            )
+            return [r["slug"] for r in sorted(cur.fetchall(), key=lambda r: r["position"])]
+        cur.execute(
+            """
+            UPDATE crawl_queue q
+            SET status = 'claimed', claimed_by = %(worker)s, claimed_at = now()
+            FROM (
+              SELECT run_id, slug
+              FROM crawl_queue
+              WHERE run_id = %(run_id)s
+                AND (status = 'pending'
+                     OR (status = 'claimed' AND claimed_at < now() - make_interval(secs => %(stale)s)))
+              ORDER BY position
+              LIMIT %(limit)s
+              FOR UPDATE SKIP LOCKED
+            ) c
+            WHERE q.run_id = c.run_id AND q.slug = c.slug
+            RETURNING q.slug, q.position;
+            """,
+            {"worker": worker, "run_id": run_id, "stale": stale_after_s, "limit": limit},
+        )
+        return [r["slug"] for r in sorted(cur.fetchall(), key=lambda r: r["position"])]
+
+def complete_crawl_family(
+    conn: psycopg.Connection,
+    run_id: str,
+    slug: str,
+    status: str,
+    stats: dict,
+    error: Optional[str] = None,
+) -> None:
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE crawl_queue
+            SET status = %s, stats_json = %s, error = %s, finished_at = now()
+            WHERE run_id = %s AND slug = %s;
+            """,
+            (status, json.dumps(stats), error, run_id, slug),
+        )
+
+def release_crawl_claims(conn: psycopg.Connection, run_id: str, worker: str) -> None:
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE crawl_queue
+            SET status = 'pending', claimed_by = NULL, claimed_at = NULL
+            WHERE run_id = %s AND status = 'claimed' AND claimed_by = %s;
+            """,
+            (run_id, worker),
+        )
+
+def add_crawl_run_stats(conn: psycopg.Connection, run_id: str, deltas: dict) -> None:
+    '''Add run-level counters (not tied to a family checkpoint) to crawl_run.stats_json.'''
+    with conn.cursor() as cur:
+        cur.execute("SELECT stats_json FROM crawl_run WHERE id = %s FOR UPDATE;", (run_id,))
+        stats = cur.fetchone()["stats_json"] or {}
+        for k, v in deltas.items():
+            stats[k] = stats.get(k, 0) + v
+        cur.execute("UPDATE crawl_run SET stats_json = %s WHERE id = %s;", (json.dumps(stats), run_id))
+
+def finalize_crawl_run(conn: psycopg.Connection, run_id: str) -> Optional[dict]:
+    '''
+    If the run is still running and no family is pending/claimed, mark it successful
+    with stats summed over every family checkpoint (plus the run-level counters from
+    add_crawl_run_stats) and return them; otherwise return None. Closing a run also
+    records removed families in the change feed and prunes old snapshots.
+    '''
+    with conn.cursor() as cur:
+        # Serialize finalizers so exactly one worker closes the run; later ones find it closed.
+        cur.execute("SELECT status, options_json, stats_json FROM crawl_run WHERE id = %s FOR UPDATE;", (run_id,))
+        run = cur.fetchone()
+        if run["status"] != "running":
+            return None
+        options = run["options_json"] or {}
+        cur.execute(
+            """
+            SELECT status, stats_json, claimed_by
+            FROM crawl_queue
+            WHERE run_id = %s;
+            """,
+            (run_id,),
+        )
+        rows = cur.fetchall()
+    if any(r["status"] in ("pending", "claimed") for r in rows):
+        return None
+
+    stats = {
+        "families_seen": len(rows),
+        "families_failed": sum(1 for r in rows if r["status"] == "failed"),
+        "workers": len({r["claimed_by"] for r in rows if r["claimed_by"]}),
+    }
+    for r in rows:
+        for k, v in (r["stats_json"] or {}).items():
+            stats[k] = stats.get(k, 0) + v
+    stats["families_retagged"] = (run["stats_json"] or {}).get("families_retagged", 0)
+
+    # A --limit run only saw part of the listing, so absent families are not "removed".
+    stats["families_removed"] = 0
+    baseline = None if options.get("limit") else previous_crawl_run(conn, run_id)
+    if baseline is not None:
+        stats["families_removed"] = record_removed_families(conn, run_id, baseline)
+    prune_crawl_snapshots(conn)
+    finish_crawl_run(conn, run_id, "success", stats)
+    return stats
+
 def finish_crawl_run(conn: psycopg.Connection, run_id: str, status: str, stats: dict) -> None:
     with conn.cursor() as cur:
         cur.execute(
@@ -27,6 +232,218 @@ def finish_crawl_run(conn: psycopg.Connection, run_id: str, status: str, stats:
             (status, json.dumps(stats), run_id),
         )
 
+# -- change feed (007_crawl_change_feed.sql) ---------------------------------
+
+def previous_crawl_run(conn: psycopg.Connection, run_id: str) -> Optional[str]:
+    '''The latest successful full (no --limit) run started before `run_id`: the baseline for added/removed families.'''
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT id::text AS id
+            FROM crawl_run
+            WHERE status = 'success'
+              AND started_at < (SELECT started_at FROM crawl_run WHERE id = %(run_id)s::uuid)
+              AND COALESCE((options_json->>'limit')::int, 0) = 0
+            ORDER BY started_at DESC
+            LIMIT 1;
+            """,
+            {"run_id": run_id},
+        )
+        row = cur.fetchone()
+        return row["id"] if row else None
+
+def record_variant_snapshot(conn: psycopg.Connection, run_id: str, family_slug: str, rows: List[tuple]) -> None:
+    '''This run's view of a family: (tag, variant_id, digest, size_bytes, max_context) per variant.'''
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM crawl_variant_snapshot WHERE run_id = %s AND family_slug = %s;", (run_id, family_slug))
+        cur.executemany(
+            """
+            INSERT INTO crawl_variant_snapshot (run_id, family_slug, tag, variant_id, digest, size_bytes, max_context)
+            VALUES (%s, %s, %s, %s, %s, %s, %s);
+            """,
+            [(run_id, family_slug) + tuple(r) for r in rows],
+        )
+
+def record_family_changes(conn: psycopg.Connection, run_id: str, baseline_run_id: Optional[str], family_slug: str) -> Tuple[Optional[str], List[dict]]:
+    '''
+    Diff the family's snapshot in this run against its latest earlier snapshot and
+    append the differences to crawl_change. Returns (family change or None,
+    [{change, tag, variant_id}] for variants). Safe to repeat for the same run.
+    '''
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM crawl_change WHERE run_id = %s AND family_slug = %s;", (run_id, family_slug))
+        cur.execute(
+            """
+            SELECT s.run_id::text AS run_id
+            FROM crawl_variant_snapshot s
+            JOIN crawl_run r ON r.id = s.run_id
+            WHERE s.family_slug = %(slug)s
+              AND r.started_at < (SELECT started_at FROM crawl_run WHERE id = %(run_id)s::uuid)
+            ORDER BY r.started_at DESC
+            LIMIT 1;
+            """,
+            {"slug": family_slug, "run_id": run_id},
+        )
+        row = cur.fetchone()
+        base = row["run_id"] if row else None
+
+        cur.execute(
+            """
+            WITH cur AS (
+              SELECT tag, variant_id, digest, size_bytes, max_context
+              FROM crawl_variant_snapshot
+              WHERE run_id = %(run_id)s::uuid AND family_slug = %(slug)s
+            ), prev AS (
+              SELECT tag, variant_id, digest, size_bytes, max_context
+              FROM crawl_variant_snapshot
+              WHERE run_id = %(base)s::uuid AND family_slug = %(slug)s
+            )
+            INSERT INTO crawl_change (run_id, entity, change, family_slug, tag, variant_id,
+                                      old_digest, new_digest, old_size_bytes, new_size_bytes, old_max_context, new_max_context)
+            SELECT %(run_id)s::uuid, 'variant',
+                   CASE WHEN p.tag IS NULL THEN 'added' WHEN c.tag IS NULL THEN 'removed' ELSE 'changed' END,
+                   %(slug)s, COALESCE(c.tag, p.tag), COALESCE(c.variant_id, p.variant_id),
+                   p.digest, c.digest, p.size_bytes, c.size_bytes, p.max_context, c.max_context
+            FROM cur c
+            FULL JOIN prev p ON p.tag = c.tag
+            WHERE c.tag IS NULL OR p.tag IS NULL
+               OR c.digest IS DISTINCT FROM p.digest
+               OR c.size_bytes IS DISTINCT FROM p.size_bytes
+               OR c.max_context IS DISTINCT FROM p.max_context
+            RETURNING change, tag, variant_id::text AS variant_id;
+            """,
+            {"run_id": run_id, "base": base, "slug": family_slug},
+        )
+        variant_changes = cur.fetchall()
+
+        in_baseline = False
+        if baseline_run_id is not None:
+            # Runs from before 005 have no queue; their listing is the 007 baseline snapshot.
+            cur.execute(
+                """
+                SELECT 1 AS x FROM crawl_queue WHERE run_id = %(base)s::uuid AND slug = %(slug)s
+                UNION ALL
+                SELECT 1 AS x FROM crawl_variant_snapshot WHERE run_id = %(base)s::uuid AND family_slug = %(slug)s;
+                """,
+                {"base": baseline_run_id, "slug": family_slug},
+            )
+            in_baseline = bool(cur.fetchall())
+        if base is None or (baseline_run_id is not None and not in_baseline):
+            family_change = "added"
+        elif variant_changes:
+            family_change = "changed"
+        else:
+            family_change = None
+        if family_change:
+            cur.execute(
+                "INSERT INTO crawl_change (run_id, entity, change, family_slug) VALUES (%s, 'family', %s, %s);",
+                (run_id, family_change, family_slug),
+            )
+        return family_change, variant_changes
+
+def record_removed_families(conn: psycopg.Connection, run_id: str, baseline_run_id: str) -> int:
+    '''Families listed in the baseline run (its queue, or its 007 baseline snapshot) but not in this one.'''
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM crawl_change WHERE run_id = %s AND entity = 'family' AND change = 'removed';", (run_id,))
+        cur.execute(
+            """
+            INSERT INTO crawl_change (run_id, entity, change, family_slug)
+            SELECT %(run_id)s::uuid, 'family', 'removed', gone.slug
+            FROM (
+              SELECT slug FROM crawl_queue WHERE run_id = %(base)s::uuid
+              UNION
+              SELECT family_slug FROM crawl_variant_snapshot WHERE run_id = %(base)s::uuid
+              EXCEPT
+              SELECT slug FROM crawl_queue WHERE run_id = %(run_id)s::uuid
+            ) gone;
+            """,
+            {"run_id": run_id, "base": baseline_run_id},
+        )
+        return cur.rowcount
+
+# Runs whose snapshots are kept: the finalizing run plus enough history that a family
+# skipped or failed in the last couple of runs still has a baseline to diff against.
+SNAPSHOT_KEEP_RUNS = 3
+
+def prune_crawl_snapshots(conn: psycopg.Connection, keep_runs: int = SNAPSHOT_KEEP_RUNS) -> int:
+    '''
+    Drop the snapshots of every run older than the `keep_runs`-th latest one. The
+    cutoff is computed once, so a finalize only deletes what aged out since the last.
+    '''
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            DELETE FROM crawl_variant_snapshot
+            WHERE run_id IN (
+              SELECT id
+              FROM crawl_run
+              WHERE started_at < (SELECT started_at FROM crawl_run ORDER BY started_at DESC LIMIT 1 OFFSET %s)
+            );
+            """,
+            (keep_runs - 1,),
+        )
+        return cur.rowcount
+
+def list_crawl_changes(
+    conn: psycopg.Connection,
+    since: Optional[datetime] = None,
+    since_run: Optional[str] = None,
+    run_id: Optional[str] = None,
+    after_id: Optional[int] = None,
+) -> list:
+    '''
+    The change feed in order: recorded after `since`, from runs started after
+    `since_run`, from one run, or after a feed id (a consumer's cursor).
+    '''
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT id, run_id::text AS run_id, run_started_at::text AS run_started_at, run_status,
+                   entity, change, family_slug, tag, variant_id::text AS variant_id,
+                   old_digest, new_digest, old_size_bytes, new_size_bytes, old_max_context, new_max_context,
+                   recorded_at::text AS recorded_at
+            FROM v_crawl_change
+            WHERE (%(since)s::timestamptz IS NULL OR recorded_at > %(since)s::timestamptz)
+              AND (%(since_run)s::uuid IS NULL
+                   OR run_started_at > (SELECT started_at FROM crawl_run WHERE id = %(since_run)s::uuid))
+              AND (%(run_id)s::uuid IS NULL OR run_id = %(run_id)s::uuid)
+              AND (%(after_id)s::bigint IS NULL OR id > %(after_id)s::bigint)
+            ORDER BY id;
+            """,
+            {"since": since, "since_run": since_run, "run_id": run_id, "after_id": after_id},
+        )
+        return cur.fetchall()
+
+def variants_missing_estimates(
+    conn: psycopg.Connection,
+    variant_ids: List[str],
+    profile_id: str,
+    kv_cache_type: str,
+    context_tokens: int,
+) -> set:
+    '''Variants without an estimate for this profile / KV type / default context (new options, retention, failed runs).'''
+    if not variant_ids:
+        return set()
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT mv.id::text AS id
+            FROM model_variant mv
+            WHERE mv.id = ANY(%(ids)s::uuid[])
+              AND NOT EXISTS (
+                SELECT 1
+                FROM derived_estimate de
+                WHERE de.variant_id = mv.id
+                  AND de.estimate_profile_id = %(profile_id)s::uuid
+                  AND de.offload_fraction = 1.0
+                  AND de.kv_cache_type = %(kv)s
+                  AND de.context_tokens = %(ctx)s
+              );
+            """,
+            {"ids": variant_ids, "profile_id": profile_id, "kv": kv_cache_type, "ctx": context_tokens},
+        )
+        return {r["id"] for r in cur.fetchall()}
+
 def ensure_estimate_profile(conn: psycopg.Connection, name: str, version: str, assumptions: dict) -> str:
     with conn.cursor() as cur:
         cur.execute(
@@ -56,7 +473,7 @@ def upsert_family(conn: psycopg.Connection, fam: FamilyParsed) -> Tuple[str, Opt
               verification = 'catalog'
             RETURNING id, catalog_first_seen_at::text;
             """,
-            (fam.slug, fam.display_name, fam.description, fam.labels, fam.downloads, fam.catalog_updated_text),
+            (fam.slug, fam.display_name, fam.description, list(fam.labels), fam.downloads, fam.catalog_updated_text),
         )
         row = cur.fetchone()
         return (str(row["id"]), row["catalog_first_seen_at"])
@@ -86,27 +503,274 @@ def upsert_variant(conn: psycopg.Connection, family_id: str, family_first_seen_a
         )
         return str(cur.fetchone()["id"])
 
-def insert_estimate(
+ESTIMATE_COLUMNS = (
+    "variant_id", "estimate_profile_id", "estimate_type", "value", "units",
+    "context_tokens", "kv_cache_type", "offload_fraction", "confidence", "verification",
+)
+
+def insert_estimates(conn: psycopg.Connection, rows: List[tuple]) -> None:
+    '''Insert derived_estimate rows (tuples in ESTIMATE_COLUMNS order) in one batch.'''
+    if not rows:
+        return
+    with conn.cursor() as cur:
+        # psycopg pipelines executemany, so a family's estimates cost one round-trip.
+        cur.executemany(
+            f"INSERT INTO derived_estimate ({', '.join(ESTIMATE_COLUMNS)}) VALUES ({', '.join(['%s'] * len(ESTIMATE_COLUMNS))});",
+            rows,
+        )
+
+# Range-partitioned by month on Postgres (006_partition_growth_tables.sql): table -> partition key.
+PARTITIONED_TABLES = {"derived_estimate": "created_at", "workflow_run": "submitted_at"}
+
+def ensure_time_partitions(conn: psycopg.Connection, months_ahead: int = 3) -> int:
+    '''Create this month's and the next `months_ahead` partitions; 0 on SQLite or before migration 006.'''
+    if is_sqlite(conn):
+        return 0
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regproc('ensure_time_partitions') IS NOT NULL AS ok;")
+        if not cur.fetchone()["ok"]:
+            return 0
+        cur.execute("SELECT ensure_time_partitions(%s) AS created;", (months_ahead,))
+        return cur.fetchone()["created"]
+
+def drop_time_partitions(conn: psycopg.Connection, table: str, older_than: datetime) -> List[str]:
+    '''Drop the monthly partitions of `table` that end at or before `older_than` (Postgres only).'''
+    with conn.cursor() as cur:
+        cur.execute("SELECT drop_time_partitions(%s, %s) AS name;", (table, older_than))
+        return [r["name"] for r in cur.fetchall()]
+
+def delete_rows_before(conn: psycopg.Connection, table: str, older_than: datetime) -> int:
+    '''Retention without partitions (SQLite): delete rows older than `older_than`.'''
+    with conn.cursor() as cur:
+        cur.execute(f"DELETE FROM {table} WHERE {PARTITIONED_TABLES[table]} < %s;", (older_than,))
+        return cur.rowcount
+
+def load_family_tag_rules(conn: psycopg.Connection) -> list:
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT tag_id::text AS tag_id, pattern, confidence::float8 AS confidence
+            FROM tag_rule
+            WHERE scope = 'family'
+            ORDER BY pattern, tag_id;
+            """
+        )
+        return cur.fetchall()
+
+def get_tag_rules_digest(conn: psycopg.Connection) -> Optional[str]:
+    with conn.cursor() as cur:
+        cur.execute("SELECT rules_digest FROM tag_inference_state WHERE id = 1;")
+        row = cur.fetchone()
+        return row["rules_digest"] if row else None
+
+def set_tag_rules_digest(conn: psycopg.Connection, digest: str) -> None:
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO tag_inference_state (id, rules_digest, applied_at)
+            VALUES (1, %s, now())
+            ON CONFLICT (id) DO UPDATE SET rules_digest = EXCLUDED.rules_digest, applied_at = now();
+            """,
+            (digest,),
+        )
+
+def list_family_slugs(conn: psycopg.Connection) -> list:
+    with conn.cursor() as cur:
+        cur.execute("SELECT id::text AS id, slug FROM model_family ORDER BY slug;")
+        return cur.fetchall()
+
+def replace_inferred_family_tags(
     conn: psycopg.Connection,
-    *,
-    variant_id: str,
-    profile_id: str,
-    estimate_type: str,
-    value: float,
-    units: str,
-    context_tokens: int,
-    kv_cache_type: str,
-    offload_fraction: float,
-    confidence: str,
-    verification: str = "estimated",
+    rows: List[Tuple[str, str, float]],
+    family_ids: Optional[List[str]] = None,
 ) -> None:
+    '''
+    Replace `inferred_rule` tags with `rows` of (family_id, tag_id, confidence).
+    Scoped to `family_ids` when given, otherwise every family is re-tagged.
+    Manual/admin tags on the same (family, tag) always win.
+    '''
     with conn.cursor() as cur:
+        if family_ids is None:
+            cur.execute("DELETE FROM model_family_tag WHERE source = 'inferred_rule';")
+        else:
+            cur.execute(
+                "DELETE FROM model_family_tag WHERE source = 'inferred_rule' AND family_id = ANY(%s::uuid[]);",
+                (family_ids,),
+            )
+        if not rows:
+            return
+        if is_sqlite(conn):
+            cur.executemany(
+                """
+                INSERT INTO model_family_tag (family_id, tag_id, source, confidence, verification)
+                VALUES (%s, %s, 'inferred_rule', %s, 'estimated')
+                ON CONFLICT (family_id, tag_id) DO NOTHING;
+                """,
+                rows,
+            )
+            return
         cur.execute(
             """
-            INSERT INTO derived_estimate
-              (variant_id, estimate_profile_id, estimate_type, value, units, context_tokens, kv_cache_type, offload_fraction, confidence, verification)
-            VALUES
-              (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            INSERT INTO model_family_tag (family_id, tag_id, source, confidence, verification)
+            SELECT x.family_id, x.tag_id, 'inferred_rule', x.confidence, 'estimated'
+            FROM unnest(%s::uuid[], %s::uuid[], %s::numeric[]) AS x(family_id, tag_id, confidence)
+            ON CONFLICT (family_id, tag_id) DO NOTHING;
+            """,
+            ([r[0] for r in rows], [r[1] for r in rows], [r[2] for r in rows]),
+        )
+
+WORKFLOW_RUN_COLUMNS = (
+    "variant_id", "workflow_id", "toolchain_id", "constraint_profile_id",
+    "context_tokens", "kv_cache_type", "tokens_per_second", "ttft_ms",
+    "quality_score", "success", "notes", "verification", "submitted_at",
+)
+
+def insert_workflow_runs(conn: psycopg.Connection, runs: List[dict]) -> None:
+    # Fills in verification/submitted_at defaults on `runs` so the aggregates see the stored values.
+    now = datetime.now(timezone.utc)
+    for r in runs:
+        r.setdefault("verification", "community_verified")
+        if r.get("submitted_at") is None:
+            r["submitted_at"] = now
+    with conn.cursor() as cur:
+        if is_sqlite(conn):
+            cur.executemany(
+                f"INSERT INTO workflow_run ({', '.join(WORKFLOW_RUN_COLUMNS)}) VALUES ({', '.join(['%s'] * len(WORKFLOW_RUN_COLUMNS))});",
+                [tuple(r.get(c) for c in WORKFLOW_RUN_COLUMNS) for r in runs],
+            )
+            return
+        with cur.copy(f"COPY workflow_run ({', '.join(WORKFLOW_RUN_COLUMNS)}) FROM STDIN") as cp:
+            for r in runs:
+                cp.write_row(tuple(r.get(c) for c in WORKFLOW_RUN_COLUMNS))
+
+def iter_workflow_runs(conn: psycopg.Connection):
+    # Server-side cursor: stream every run without materializing the table client-side.
+    with conn.cursor(name="workflow_run_scan") as cur:
+        cur.itersize = 10_000
+        cur.execute(
+            """
+            SELECT variant_id::text, workflow_id::text, toolchain_id::text,
+                   tokens_per_second::float8, ttft_ms, quality_score, success,
+                   verification::text, submitted_at
+            FROM workflow_run;
+            """
+        )
+        yield from cur
+
+def truncate_workflow_run_agg(conn: psycopg.Connection) -> None:
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM workflow_run_agg;" if is_sqlite(conn) else "TRUNCATE workflow_run_agg;")
+
+def lock_workflow_run_agg(conn: psycopg.Connection, key: Tuple[str, str, Optional[str]]) -> dict:
+    variant_id, workflow_id, toolchain_id = key
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO workflow_run_agg (variant_id, workflow_id, toolchain_id)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (variant_id, workflow_id, (COALESCE(toolchain_id, '00000000-0000-0000-0000-000000000000'::uuid)))
+            DO NOTHING;
+            """,
+            (variant_id, workflow_id, toolchain_id),
+        )
+        cur.execute(
+            """
+            SELECT run_count, run_count_trusted, quality_sum, quality_count, success_count,
+                   tps_sketch, ttft_sketch, last_run_at
+            FROM workflow_run_agg
+            WHERE variant_id = %s AND workflow_id = %s
+              AND COALESCE(toolchain_id, '00000000-0000-0000-0000-000000000000'::uuid)
+                  = COALESCE(%s::uuid, '00000000-0000-0000-0000-000000000000'::uuid)
+            FOR UPDATE;
+            """,
+            (variant_id, workflow_id, toolchain_id),
+        )
+        return cur.fetchone()
+
+def update_workflow_run_agg(conn: psycopg.Connection, key: Tuple[str, str, Optional[str]], agg: dict) -> None:
+    variant_id, workflow_id, toolchain_id = key
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE workflow_run_agg SET
+              run_count = %(run_count)s,
+              run_count_trusted = %(run_count_trusted)s,
+              quality_sum = %(quality_sum)s,
+              quality_count = %(quality_count)s,
+              success_count = %(success_count)s,
+              tps_sketch = %(tps_sketch)s,
+              ttft_sketch = %(ttft_sketch)s,
+              p50_tps = %(p50_tps)s,
+              p95_tps = %(p95_tps)s,
+              p50_ttft_ms = %(p50_ttft_ms)s,
+              p95_ttft_ms = %(p95_ttft_ms)s,
+              last_run_at = %(last_run_at)s,
+              updated_at = now()
+            WHERE variant_id = %(variant_id)s AND workflow_id = %(workflow_id)s
+              AND COALESCE(toolchain_id, '00000000-0000-0000-0000-000000000000'::uuid)
+                  = COALESCE(%(toolchain_id)s::uuid, '00000000-0000-0000-0000-000000000000'::uuid);
+            """,
+            {**agg, "variant_id": variant_id, "workflow_id": workflow_id, "toolchain_id": toolchain_id},
+        )
+
+def pop_toolchain_run_aggs(conn: psycopg.Connection, toolchain_slug: str) -> List[dict]:
+    '''Delete and return the workflow_run_agg rows of one toolchain.'''
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            DELETE FROM workflow_run_agg
+            WHERE toolchain_id = (SELECT id FROM toolchain WHERE slug = %s)
+            RETURNING variant_id::text, workflow_id::text, run_count, run_count_trusted, quality_sum,
+                      quality_count, success_count, tps_sketch, ttft_sketch, last_run_at;
             """,
-            (variant_id, profile_id, estimate_type, value, units, context_tokens, kv_cache_type, offload_fraction, confidence, verification),
+            (toolchain_slug,),
+        )
+        return cur.fetchall()
+
+def delete_toolchain(conn: psycopg.Connection, toolchain_slug: str) -> bool:
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM toolchain WHERE slug = %s RETURNING id;", (toolchain_slug,))
+        return cur.fetchone() is not None
+
+def load_key_ids(conn: psycopg.Connection, table: str, key_column: str) -> dict:
+    '''Returns {key_column::text: id::text} for a lookup table (slugs, tags, ...).'''
+    with conn.cursor() as cur:
+        cur.execute(
+            sql.SQL("SELECT id::text AS id, {}::text AS key FROM {};").format(
+                sql.Identifier(key_column), sql.Identifier(table)
+            )
+        )
+        return {r["key"]: r["id"] for r in cur.fetchall()}
+
+def upsert_template_votes(conn: psycopg.Connection, votes: List[Tuple[str, str, int]]) -> int:
+    '''
+    Bulk upsert (template_id, voter_fingerprint, vote) rows via COPY into a session temp table.
+    `votes` must already be unique per (template_id, voter_fingerprint).
+    Votes for unknown templates are dropped. Returns the number of rows written.
+    '''
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            CREATE TEMP TABLE IF NOT EXISTS template_vote_stage (
+              template_id uuid NOT NULL,
+              voter_fingerprint text NOT NULL,
+              vote int NOT NULL
+            ) ON COMMIT DELETE ROWS;
+            """
+        )
+        with cur.copy("COPY template_vote_stage (template_id, voter_fingerprint, vote) FROM STDIN") as cp:
+            for v in votes:
+                cp.write_row(v)
+        cur.execute(
+            """
+            INSERT INTO template_vote (template_id, voter_fingerprint, vote)
+            SELECT s.template_id, s.voter_fingerprint, s.vote
+            FROM template_vote_stage s
+            JOIN task_template tt ON tt.id = s.template_id
+            ON CONFLICT (template_id, voter_fingerprint) DO UPDATE SET
+              vote = EXCLUDED.vote,
+              created_at = now()
+            WHERE template_vote.vote IS DISTINCT FROM EXCLUDED.vote;
+            """
         )
+        return cur.rowcount
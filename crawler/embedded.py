@@ -0,0 +1,195 @@
+from __future__ import annotations
+import json
+import os
+import re
+import sqlite3
+import uuid
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Iterator, Optional
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations", "sqlite", "schema.sql")
+# Bump when migrations/sqlite/schema.sql changes; the schema file is idempotent and re-applied.
+SCHEMA_VERSION = 5
+BUSY_TIMEOUT_S = 30.0
+MIN_SQLITE_VERSION = (3, 39, 0)
+
+# jsonb / text[] columns are declared JSON in the SQLite schema and decoded on read.
+sqlite3.register_converter("JSON", json.loads)
+
+_PARAM = re.compile(r"%\((\w+)\)s|%s|%%")
+_CAST = re.compile(r"::\w+(?:\[\])?")
+_ANY = re.compile(r"=\s*ANY\(([^()]*)\)", re.IGNORECASE)
+_FOR_UPDATE = re.compile(r"\s+FOR\s+UPDATE(?:\s+SKIP\s+LOCKED)?", re.IGNORECASE)
+_LEADING_FLAGS = re.compile(r"^\(\?[a-zA-Z]+\)")
+
+def is_sqlite_url(db_url: str) -> bool:
+    return db_url.startswith("sqlite:")
+
+def sqlite_path(db_url: str) -> str:
+    '''sqlite:///relative.db, sqlite:////abs/path.db or sqlite:///:memory:'''
+    rest = db_url[len("sqlite:"):]
+    if rest.startswith("//"):
+        rest = rest[2:]
+    if rest.startswith("/"):
+        rest = rest[1:]
+    return rest or ":memory:"
+
+def utc_now() -> str:
+    # Same text format as the schema's strftime() defaults, so timestamps sort as strings.
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+
+@lru_cache(maxsize=512)
+def translate(query: str, with_params: bool) -> str:
+    '''
+    Rewrite the Postgres SQL used in crawler/db.py for SQLite:
+    %s / %(name)s placeholders, ::casts (SQLite is dynamically typed),
+    `= ANY(array)` (arrays are bound as JSON) and row locks (every write
+    transaction already holds the database lock, see SQLiteConnection).
+    '''
+    if with_params:
+        query = _PARAM.sub(lambda m: f":{m.group(1)}" if m.group(1) else ("?" if m.group(0) == "%s" else "%"), query)
+    query = _CAST.sub("", query)
+    query = _ANY.sub(r"IN (SELECT value FROM json_each(\1))", query)
+    return _FOR_UPDATE.sub("", query)
+
+def _adapt(value: Any) -> Any:
+    if isinstance(value, (list, tuple, dict)):
+        return json.dumps(list(value) if isinstance(value, tuple) else value)
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        return value.isoformat(timespec="milliseconds")
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+def _adapt_params(params: Any) -> Any:
+    if params is None:
+        return ()
+    if isinstance(params, dict):
+        return {k: _adapt(v) for k, v in params.items()}
+    return tuple(_adapt(v) for v in params)
+
+def _dict_row(cur: sqlite3.Cursor, row: tuple) -> dict:
+    return {d[0]: v for d, v in zip(cur.description, row)}
+
+def _regexp(pattern: str, value: Optional[str]) -> bool:
+    # `slug ~* pattern` in the Postgres views; tag_rule patterns may carry a leading (?i).
+    return value is not None and re.search(_LEADING_FLAGS.sub("", pattern), value, re.IGNORECASE) is not None
+
+class SQLiteCursor:
+    '''The subset of the psycopg cursor API used by crawler/db.py, with dict rows.'''
+    def __init__(self, conn: "SQLiteConnection"):
+        self.connection = conn
+        self._cur = conn.raw.cursor()
+        self.itersize = 0  # accepted for psycopg server-side cursor parity; SQLite already streams
+
+    def execute(self, query: str, params: Any = None) -> "SQLiteCursor":
+        self.connection._begin()
+        self._cur.execute(translate(query, params is not None), _adapt_params(params))
+        return self
+
+    def executemany(self, query: str, params_seq) -> "SQLiteCursor":
+        self.connection._begin()
+        self._cur.executemany(translate(query, True), (_adapt_params(p) for p in params_seq))
+        return self
+
+    def fetchone(self) -> Optional[dict]:
+        return self._cur.fetchone()
+
+    def fetchall(self) -> list:
+        return self._cur.fetchall()
+
+    @property
+    def rowcount(self) -> int:
+        return self._cur.rowcount
+
+    def __iter__(self) -> Iterator[dict]:
+        return iter(self._cur)
+
+    def close(self) -> None:
+        self._cur.close()
+
+    def __enter__(self) -> "SQLiteCursor":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+class SQLiteConnection:
+    '''
+    psycopg-style connection over an embedded SQLite file (dict rows, implicit
+    transactions, commit/rollback on context exit).
+
+    Transactions start with BEGIN IMMEDIATE, so each one holds SQLite's single
+    write lock from its first statement. That is what FOR UPDATE / SKIP LOCKED
+    buy on Postgres: several local crawl workers on one file serialize their
+    claims instead of racing.
+    '''
+    dialect = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self.raw = sqlite3.connect(path, timeout=BUSY_TIMEOUT_S, isolation_level=None,
+                                   detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+        self.raw.row_factory = _dict_row
+        self.raw.create_function("now", 0, utc_now)
+        self.raw.create_function("regexp", 2, _regexp, deterministic=True)
+        self.raw.execute("PRAGMA foreign_keys = ON;")
+        if path != ":memory:":
+            self.raw.execute("PRAGMA journal_mode = WAL;")
+            self.raw.execute("PRAGMA synchronous = NORMAL;")
+        self.autocommit = False
+
+    def _begin(self) -> None:
+        if not self.autocommit and not self.raw.in_transaction:
+            self.raw.execute("BEGIN IMMEDIATE;")
+
+    def cursor(self, name: Optional[str] = None) -> SQLiteCursor:
+        return SQLiteCursor(self)
+
+    def execute(self, query: str, params: Any = None) -> SQLiteCursor:
+        return self.cursor().execute(query, params)
+
+    def commit(self) -> None:
+        if self.raw.in_transaction:
+            self.raw.execute("COMMIT;")
+
+    def rollback(self) -> None:
+        if self.raw.in_transaction:
+            self.raw.execute("ROLLBACK;")
+
+    def close(self) -> None:
+        self.raw.close()
+
+    def __enter__(self) -> "SQLiteConnection":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        try:
+            if exc_type is None:
+                self.commit()
+            else:
+                self.rollback()
+        finally:
+            self.close()
+
+def ensure_schema(conn: SQLiteConnection) -> None:
+    '''Apply migrations/sqlite/schema.sql when the file is new or the schema version changed.'''
+    version = conn.raw.execute("PRAGMA user_version;").fetchone()["user_version"]
+    if version >= SCHEMA_VERSION:
+        return
+    with open(SCHEMA_PATH, encoding="utf-8") as f:
+        conn.raw.executescript(f.read())
+    conn.raw.execute(f"PRAGMA user_version = {SCHEMA_VERSION};")
+
+def connect_sqlite(db_url: str) -> SQLiteConnection:
+    if sqlite3.sqlite_version_info < MIN_SQLITE_VERSION:
+        raise RuntimeError(f"SQLite >= {'.'.join(map(str, MIN_SQLITE_VERSION))} is required (RETURNING, aggregate FILTER, FULL JOIN); found {sqlite3.sqlite_version}")
+    path = sqlite_path(db_url)
+    if path != ":memory:" and os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = SQLiteConnection(path)
+    ensure_schema(conn)
+    return conn
@@ -0,0 +1,130 @@
+from __future__ import annotations
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+
+GiB = 1024 ** 3
+
+# KV cache types offered by the site; factors mirror kvOverheadFactor() in site/app.js.
+KV_CACHE_TYPES = ("fp16", "q8", "q4")
+
+FIT_TIER_ORDER = {"fits_cons": 0, "fits_opt": 1, "unknown": 2, "no_fit": 3}
+
+def kv_overhead_factor(kv_cache_type: Optional[str]) -> float:
+    '''
+    Scale KV cache memory relative to the fp16 baseline estimates.
+    fp16 ~= 2 bytes/elem; q8 ~= 1 byte/elem; q4 ~= 0.5 bytes/elem (+10% overhead).
+    '''
+    k = (kv_cache_type or "fp16").lower()
+    if k in ("q8", "int8"):
+        return 0.50
+    if k in ("q4", "int4"):
+        return 0.275
+    return 1.0
+
+class ComponentTable:
+    '''
+    Columnar view of `variant_components` (one row per variant).
+    Variants with incomplete components are dropped; the site's client-side
+    fallback (apply() in site/app.js) skips them the same way.
+    '''
+    def __init__(self, comps: Iterable[dict]):
+        # Last row per variant wins (same as the Map built in app.js).
+        by_variant: Dict[str, dict] = {}
+        for c in comps:
+            by_variant[c["variant_id"]] = c
+
+        rows = [
+            c for c in by_variant.values()
+            if None not in (c.get("weights_vram_gib"), c.get("runtime_overhead_gib"),
+                            c.get("kv_bytes_per_token_opt"), c.get("kv_bytes_per_token_cons"))
+        ]
+        self.variant_ids = np.array([c["variant_id"] for c in rows], dtype=object)
+        self.weights = np.array([c["weights_vram_gib"] for c in rows], dtype=np.float64)
+        self.runtime = np.array([c["runtime_overhead_gib"] for c in rows], dtype=np.float64)
+        self.kv_opt = np.array([c["kv_bytes_per_token_opt"] for c in rows], dtype=np.float64)
+        self.kv_cons = np.array([c["kv_bytes_per_token_cons"] for c in rows], dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self.variant_ids)
+
+def compute_fits(table: ComponentTable, budget_gib: float, context_tokens: int, kv_cache_type: str) -> dict:
+    '''
+    Vectorized computeVram / fitTier / maxCtxThatFits over every variant.
+    Returns parallel arrays (same order as `table`).
+    '''
+    factor = kv_overhead_factor(kv_cache_type)
+    base = table.weights + table.runtime
+    vram_opt = base + (table.kv_opt * context_tokens * factor) / GiB
+    vram_cons = base + (table.kv_cons * context_tokens * factor) / GiB
+
+    if not budget_gib or budget_gib <= 0:
+        tiers = np.full(len(table), "unknown", dtype=object)
+    else:
+        tiers = np.where(vram_cons <= budget_gib, "fits_cons",
+                         np.where(vram_opt <= budget_gib, "fits_opt", "no_fit")).astype(object)
+
+    headroom = (budget_gib or 0) - base
+    with np.errstate(divide="ignore", invalid="ignore"):
+        max_ctx = np.floor((headroom * GiB) / (table.kv_cons * factor))
+    max_ctx = np.where((headroom <= 0) | ~np.isfinite(max_ctx), 0, max_ctx).astype(np.int64)
+
+    return {
+        "fit_tier": tiers,
+        "vram_required_opt_gib": vram_opt,
+        "vram_required_cons_gib": vram_cons,
+        "max_context_tokens_cons": max_ctx,
+    }
+
+def build_fit_table(table: ComponentTable, variant_index: np.ndarray, budget_gib: float, context_tokens: int, kv_cache_type: str) -> dict:
+    '''
+    Fitting variants only (fit_tier != no_fit), sorted by tier then conservative VRAM.
+    Columnar to keep catalog.json small; variants are referenced by their position
+    in the catalog's `variants` list (`variant_index`, aligned with `table`, -1 = not exported).
+    '''
+    fits = compute_fits(table, budget_gib, context_tokens, kv_cache_type)
+    keep = np.flatnonzero((fits["fit_tier"] != "no_fit") & (variant_index >= 0))
+    tier_rank = np.array([FIT_TIER_ORDER[t] for t in fits["fit_tier"][keep]], dtype=np.int8)
+    order = keep[np.lexsort((fits["vram_required_cons_gib"][keep], tier_rank))]
+
+    return {
+        "variant_idx": variant_index[order].tolist(),
+        "fit_tiers": fits["fit_tier"][order].tolist(),
+        "vram_required_cons_gib": fits["vram_required_cons_gib"][order].round(4).tolist(),
+        "vram_required_opt_gib": fits["vram_required_opt_gib"][order].round(4).tolist(),
+        "max_context_tokens_cons": fits["max_context_tokens_cons"][order].tolist(),
+    }
+
+def profile_budget_gib(profile: dict) -> Optional[float]:
+    # The site's hardware presets only set a VRAM budget; CPU/RAM-only profiles get no table.
+    budget = profile.get("vram_gib")
+    return float(budget) if budget is not None else None
+
+def build_fit_tables(
+    comps: Iterable[dict],
+    variants: Iterable[dict],
+    constraint_profiles: Iterable[dict],
+    context_buckets: Iterable[int],
+    kv_cache_types: Iterable[str] = KV_CACHE_TYPES,
+) -> List[dict]:
+    '''
+    Precompute one fit table per (hardware profile, context bucket, KV type).
+    '''
+    table = ComponentTable(comps)
+    position = {v["id"]: i for i, v in enumerate(variants)}
+    variant_index = np.array([position.get(vid, -1) for vid in table.variant_ids], dtype=np.int64)
+    buckets = sorted({int(c) for c in context_buckets if c})
+    out: List[dict] = []
+    for profile in constraint_profiles:
+        budget = profile_budget_gib(profile)
+        if budget is None:
+            continue
+        for ctx in buckets:
+            for kv in kv_cache_types:
+                out.append({
+                    "profile_slug": profile["slug"],
+                    "budget_gib": budget,
+                    "context_tokens": ctx,
+                    "kv_cache_type": kv,
+                    **build_fit_table(table, variant_index, budget, ctx, kv),
+                })
+    return out
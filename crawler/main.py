@@ -1,46 +1,216 @@
 from __future__ import annotations
 import argparse
+import os
+import socket
 import time
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
+import psycopg
 from .http import fetch_text
 from .parse import parse_library_slugs, parse_family_and_variants_from_tags_page
 from .db import (
+    DB_ERRORS,
     connect,
     get_db_url,
     start_crawl_run,
     finish_crawl_run,
+    find_crawl_run,
+    reopen_crawl_run,
+    enqueue_crawl_families,
+    ensure_time_partitions,
+    crawl_queue_size,
+    claim_crawl_families,
+    complete_crawl_family,
+    release_crawl_claims,
+    finalize_crawl_run,
+    add_crawl_run_stats,
     ensure_estimate_profile,
     upsert_family,
     upsert_variant,
-    insert_estimate,
+    insert_estimates,
+    previous_crawl_run,
+    record_variant_snapshot,
+    record_family_changes,
+    variants_missing_estimates,
 )
-from .vram import estimate_vram_total_gib
+from .types import VariantParsed
+from .vram import GiB, estimate_vram_total_gib
+from .tagging import FamilyTagger, sync_tag_rules, tag_families
 
 DEFAULT_BASE = "https://ollama.com"
 DEFAULT_DELAY_S = 0.35
+DEFAULT_CLAIM_SIZE = 8
+DEFAULT_CLAIM_TIMEOUT_S = 1800
+
+# Options that must stay the same for every process working on one crawl_run.
+RUN_OPTIONS = ("base_url", "estimate", "kv_cache_type", "context_default", "reestimate_all", "limit")
+
+# derived_estimate rows written per context point: (estimate_type, units).
+ESTIMATE_TYPES = (
+    ("vram_total_gib_opt", "GiB"),
+    ("vram_total_gib_cons", "GiB"),
+    # Component estimates (useful for VRAM budget + context math)
+    ("vram_weights_gib", "GiB"),
+    ("vram_runtime_overhead_gib", "GiB"),
+    ("vram_kv_gib_opt", "GiB"),
+    ("vram_kv_gib_cons", "GiB"),
+    ("kv_bytes_per_token_opt", "bytes/token"),
+    ("kv_bytes_per_token_cons", "bytes/token"),
+)
+
+def estimate_rows(args: argparse.Namespace, profile_id: str, variant_id: str, var: VariantParsed) -> List[tuple]:
+    '''derived_estimate rows (ESTIMATE_COLUMNS order) for one variant at each context point.'''
+    rows: List[tuple] = []
+    ctx_points = set([args.context_default])
+    if var.max_context and var.max_context > 0:
+        ctx_points.add(var.max_context)
+
+    for ctx in sorted(ctx_points):
+        ctx = int(ctx)
+        est = estimate_vram_total_gib(
+            size_bytes=var.size_bytes,
+            tag=var.tag,
+            context_tokens=ctx,
+            kv_cache_type=args.kv_cache_type,
+            offload_fraction=1.0,
+        )
+        values = (est.total_gib_opt, est.total_gib_cons, est.weights_gib, est.runtime_overhead_gib,
+                  est.kv_gib_opt, est.kv_gib_cons)
+        # NOTE: kv_bytes_per_token_* derived from estimated KV GiB at the selected context length.
+        if ctx:
+            values += (est.kv_gib_opt * GiB / ctx, est.kv_gib_cons * GiB / ctx)
+        for (estimate_type, units), value in zip(ESTIMATE_TYPES, values):
+            rows.append((variant_id, profile_id, estimate_type, value, units, ctx,
+                         args.kv_cache_type, 1.0, est.confidence, "estimated"))
+    return rows
+
+def crawl_family(
+    conn: psycopg.Connection,
+    args: argparse.Namespace,
+    run_id: str,
+    baseline_run_id: Optional[str],
+    profile_id: Optional[str],
+    tagger: FamilyTagger,
+    slug: str,
+) -> Dict[str, int]:
+    '''
+    Fetch + upsert one family with its variants, record what changed since the
+    family's previous crawl, and estimate only added/changed variants (or ones
+    missing estimates for this run's options). Does not commit; the caller
+    commits together with the family's checkpoint.
+    Raises FetchError/parse errors for the caller to record as a failed family.
+    '''
+    stats = {"variants_seen": 0, "variants_failed": 0, "estimates_written": 0, "family_tags_inferred": 0,
+             "families_added": 0, "families_changed": 0, "variants_added": 0, "variants_changed": 0, "variants_removed": 0}
+
+    tags_url = f"{args.base_url.rstrip('/')}/library/{slug}/tags"
+    html = fetch_text(tags_url)
+    fam, variants = parse_family_and_variants_from_tags_page(html, slug)
+
+    family_id, family_first_seen_at = upsert_family(conn, fam)
+    family_first_seen_at = family_first_seen_at or "now()"
+
+    upserted: List[Tuple[str, VariantParsed]] = []
+    for var in variants:
+        stats["variants_seen"] += 1
+        try:
+            variant_id = upsert_variant(conn, family_id, family_first_seen_at, var)
+        except Exception:
+            stats["variants_failed"] += 1
+            continue
+        upserted.append((variant_id, var))
+
+    record_variant_snapshot(conn, run_id, slug, [(var.tag, vid, var.digest, var.size_bytes, var.max_context) for vid, var in upserted])
+    family_change, variant_changes = record_family_changes(conn, run_id, baseline_run_id, slug)
+    if family_change:
+        stats[f"families_{family_change}"] += 1
+    for c in variant_changes:
+        stats[f"variants_{c['change']}"] += 1
+
+    # Tag rules only look at the slug, so only new families need inferring here.
+    if family_change == "added":
+        stats["family_tags_inferred"] += tag_families(conn, tagger, [(family_id, fam.slug)])
+
+    if args.estimate and profile_id:
+        ids = [vid for vid, _ in upserted]
+        if args.reestimate_all:
+            stale = set(ids)
+        else:
+            stale = {c["variant_id"] for c in variant_changes if c["change"] != "removed"}
+            stale |= variants_missing_estimates(conn, ids, profile_id, args.kv_cache_type, args.context_default)
+        estimates = [row for vid, var in upserted if vid in stale for row in estimate_rows(args, profile_id, vid, var)]
+        insert_estimates(conn, estimates)
+        stats["estimates_written"] = len(estimates)
+    return stats
 
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--db-url", default=None, help="Postgres URL (or use DATABASE_URL env var)")
+    ap.add_argument("--db-url", default=None, help="Postgres or sqlite:///file.db URL (or use DATABASE_URL env var)")
     ap.add_argument("--base-url", default=DEFAULT_BASE)
     ap.add_argument("--delay", type=float, default=DEFAULT_DELAY_S, help="Delay between requests (seconds)")
     ap.add_argument("--limit", type=int, default=0, help="Limit number of families (debug)")
     ap.add_argument("--estimate", action="store_true", help="Write first-pass VRAM estimates to DB")
     ap.add_argument("--kv-cache-type", default="fp16", help="KV cache type for estimates (fp16/q8/q4)")
     ap.add_argument("--context-default", type=int, default=8192, help="Default context tokens for estimates")
+    ap.add_argument("--reestimate-all", action="store_true",
+                    help="Re-estimate every variant, not just the ones the change feed marks added/changed")
+    ap.add_argument("--resume", nargs="?", const="latest", default=None, metavar="RUN_ID",
+                    help="Resume a failed/interrupted crawl_run, or retry the failed families of a finished one (default: the latest); committed families are skipped")
+    ap.add_argument("--worker", nargs="?", const="latest", default=None, metavar="RUN_ID",
+                    help="Join a running crawl_run (default: the latest) and claim families from its queue")
+    ap.add_argument("--claim-size", type=int, default=DEFAULT_CLAIM_SIZE, help="Families claimed per queue round-trip")
+    ap.add_argument("--claim-timeout", type=int, default=DEFAULT_CLAIM_TIMEOUT_S,
+                    help="Seconds before a claimed but unfinished family may be taken over by another worker")
     args = ap.parse_args()
 
+    if args.resume and args.worker:
+        ap.error("--resume and --worker are mutually exclusive")
+
     db_url = get_db_url(args.db_url)
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
 
     with connect(db_url) as conn:
         conn.autocommit = False
-        run_id = start_crawl_run(conn)
+        # New estimates must land in a monthly partition, not the default one.
+        ensure_time_partitions(conn)
+        if args.resume or args.worker:
+            requested = args.resume or args.worker
+            action = "resume" if args.resume else "join"
+            # Only the latest run counts: a newer successful crawl supersedes older failures.
+            run = find_crawl_run(conn, None if requested == "latest" else requested)
+            if run is None:
+                raise SystemExit(f"No crawl_run to {action} ({requested})")
+            run_id = run["id"]
+            resumable = run["status"] in ("running", "failed") or (
+                # Finalized, but some families failed (e.g. fetches that ran out of retries).
+                run["status"] == "success" and crawl_queue_size(conn, run_id, "failed") > 0
+            )
+            if not (resumable if args.resume else run["status"] == "running"):
+                raise SystemExit(f"crawl_run {run_id} is {run['status']}; nothing to {action}")
+            # Estimates must be computed the same way by every process in the run.
+            for k, v in (run["options_json"] or {}).items():
+                if k in RUN_OPTIONS:
+                    setattr(args, k, v)
+            if args.resume:
+                reopen_crawl_run(conn, run_id)
+        else:
+            run_id = start_crawl_run(conn, {k: getattr(args, k) for k in RUN_OPTIONS})
+        # Baseline for the change feed: the previous successful full crawl.
+        baseline_run_id = previous_crawl_run(conn, run_id)
+        conn.commit()
+
         stats: Dict[str, int] = {
             "families_seen": 0,
             "variants_seen": 0,
             "families_failed": 0,
             "variants_failed": 0,
             "estimates_written": 0,
+            "families_retagged": 0,
+            "family_tags_inferred": 0,
+            "families_added": 0,
+            "families_changed": 0,
+            "variants_added": 0,
+            "variants_changed": 0,
+            "variants_removed": 0,
         }
 
         profile_id = None
@@ -57,172 +227,67 @@ def main():
             )
 
         try:
-            library_url = f"{args.base_url.rstrip('/')}/library"
-            lib_html = fetch_text(library_url)
-            slugs = parse_library_slugs(lib_html)
-            if args.limit and args.limit > 0:
-                slugs = slugs[:args.limit]
-
-            for slug in slugs:
-                stats["families_seen"] += 1
-                tags_url = f"{args.base_url.rstrip('/')}/library/{slug}/tags"
-                try:
-                    html = fetch_text(tags_url)
-                    fam, variants = parse_family_and_variants_from_tags_page(html, slug)
-                except Exception:
-                    stats["families_failed"] += 1
-                    time.sleep(args.delay)
-                    continue
+            # Bulk re-tag only when tag_rule changed; otherwise new families are tagged as they appear.
+            tagger, retagged = sync_tag_rules(conn)
+            stats["families_retagged"] = retagged or 0
+            if retagged:
+                # Kept on the run: whichever process finalizes it reports the count.
+                add_crawl_run_stats(conn, run_id, {"families_retagged": retagged})
+            conn.commit()
+
+            # The library listing is fetched once per run; its slugs become the run's work queue.
+            if not args.worker and crawl_queue_size(conn, run_id) == 0:
+                library_url = f"{args.base_url.rstrip('/')}/library"
+                lib_html = fetch_text(library_url)
+                slugs = parse_library_slugs(lib_html)
+                if args.limit and args.limit > 0:
+                    slugs = slugs[:args.limit]
+                enqueue_crawl_families(conn, run_id, slugs)
+                conn.commit()
+            elif args.worker and crawl_queue_size(conn, run_id) == 0:
+                raise SystemExit(f"crawl_run {run_id} has no work queue yet; start workers after the coordinator")
 
-                family_id, family_first_seen_at = upsert_family(conn, fam)
-                family_first_seen_at = family_first_seen_at or "now()"
+            while True:
+                slugs = claim_crawl_families(conn, run_id, worker_id, args.claim_size, args.claim_timeout)
+                conn.commit()
+                if not slugs:
+                    break
 
-                for var in variants:
-                    stats["variants_seen"] += 1
+                for slug in slugs:
+                    stats["families_seen"] += 1
                     try:
-                        variant_id = upsert_variant(conn, family_id, family_first_seen_at, var)
-                    except Exception:
-                        stats["variants_failed"] += 1
+                        fam_stats = crawl_family(conn, args, run_id, baseline_run_id, profile_id, tagger, slug)
+                    except DB_ERRORS:
+                        # DB trouble fails the run; --resume picks up from the last checkpoint.
+                        raise
+                    except Exception as e:
+                        conn.rollback()
+                        stats["families_failed"] += 1
+                        complete_crawl_family(conn, run_id, slug, "failed", {}, error=str(e))
+                        conn.commit()
+                        time.sleep(args.delay)
                         continue
 
-                    if args.estimate and profile_id:
-                        ctx_points = set([args.context_default])
-                        if var.max_context and var.max_context > 0:
-                            ctx_points.add(var.max_context)
-
-                        for ctx in sorted(ctx_points):
-                            est = estimate_vram_total_gib(
-                                size_bytes=var.size_bytes,
-                                tag=var.tag,
-                                context_tokens=int(ctx),
-                                kv_cache_type=args.kv_cache_type,
-                                offload_fraction=1.0,
-                            )
-                            insert_estimate(
-                                conn,
-                                variant_id=variant_id,
-                                profile_id=profile_id,
-                                estimate_type="vram_total_gib_opt",
-                                value=est.total_gib_opt,
-                                units="GiB",
-                                context_tokens=int(ctx),
-                                kv_cache_type=args.kv_cache_type,
-                                offload_fraction=1.0,
-                                confidence=est.confidence,
-                                verification="estimated",
-                            )
-                            insert_estimate(
-                                conn,
-                                variant_id=variant_id,
-                                profile_id=profile_id,
-                                estimate_type="vram_total_gib_cons",
-                                value=est.total_gib_cons,
-                                units="GiB",
-                                context_tokens=int(ctx),
-                                kv_cache_type=args.kv_cache_type,
-                                offload_fraction=1.0,
-                                confidence=est.confidence,
-                                verification="estimated",
-                            )
-                                                        # Component estimates (useful for VRAM budget + context math)
-                            # NOTE: kv_bytes_per_token_* derived from estimated KV GiB at the selected context length.
-                            kv_bpt_opt = (est.kv_gib_opt * (1024 ** 3)) / float(ctx) if ctx else None
-                            kv_bpt_cons = (est.kv_gib_cons * (1024 ** 3)) / float(ctx) if ctx else None
-
-                            insert_estimate(
-                                conn,
-                                variant_id=variant_id,
-                                profile_id=profile_id,
-                                estimate_type="vram_weights_gib",
-                                value=est.weights_gib,
-                                units="GiB",
-                                context_tokens=int(ctx),
-                                kv_cache_type=args.kv_cache_type,
-                                offload_fraction=1.0,
-                                confidence=est.confidence,
-                                verification="estimated",
-                            )
-                            insert_estimate(
-                                conn,
-                                variant_id=variant_id,
-                                profile_id=profile_id,
-                                estimate_type="vram_runtime_overhead_gib",
-                                value=est.runtime_overhead_gib,
-                                units="GiB",
-                                context_tokens=int(ctx),
-                                kv_cache_type=args.kv_cache_type,
-                                offload_fraction=1.0,
-                                confidence=est.confidence,
-                                verification="estimated",
-                            )
-                            insert_estimate(
-                                conn,
-                                variant_id=variant_id,
-                                profile_id=profile_id,
-                                estimate_type="vram_kv_gib_opt",
-                                value=est.kv_gib_opt,
-                                units="GiB",
-                                context_tokens=int(ctx),
-                                kv_cache_type=args.kv_cache_type,
-                                offload_fraction=1.0,
-                                confidence=est.confidence,
-                                verification="estimated",
-                            )
-                            insert_estimate(
-                                conn,
-                                variant_id=variant_id,
-                                profile_id=profile_id,
-                                estimate_type="vram_kv_gib_cons",
-                                value=est.kv_gib_cons,
-                                units="GiB",
-                                context_tokens=int(ctx),
-                                kv_cache_type=args.kv_cache_type,
-                                offload_fraction=1.0,
-                                confidence=est.confidence,
-                                verification="estimated",
-                            )
-                            if kv_bpt_opt is not None:
-                                insert_estimate(
-                                    conn,
-                                    variant_id=variant_id,
-                                    profile_id=profile_id,
-                                    estimate_type="kv_bytes_per_token_opt",
-                                    value=kv_bpt_opt,
-                                    units="bytes/token",
-                                    context_tokens=int(ctx),
-                                    kv_cache_type=args.kv_cache_type,
-                                    offload_fraction=1.0,
-                                    confidence=est.confidence,
-                                    verification="estimated",
-                                )
-                            if kv_bpt_cons is not None:
-                                insert_estimate(
-                                    conn,
-                                    variant_id=variant_id,
-                                    profile_id=profile_id,
-                                    estimate_type="kv_bytes_per_token_cons",
-                                    value=kv_bpt_cons,
-                                    units="bytes/token",
-                                    context_tokens=int(ctx),
-                                    kv_cache_type=args.kv_cache_type,
-                                    offload_fraction=1.0,
-                                    confidence=est.confidence,
-                                    verification="estimated",
-                                )
-
-                            stats["estimates_written"] += 8
-
-
-                conn.commit()
-                time.sleep(args.delay)
+                    for k, v in fam_stats.items():
+                        stats[k] += v
+                    # Checkpoint: the family's rows and its 'done' mark commit together.
+                    complete_crawl_family(conn, run_id, slug, "done", fam_stats)
+                    conn.commit()
+                    time.sleep(args.delay)
 
-            finish_crawl_run(conn, run_id, "success", stats)
+            final = finalize_crawl_run(conn, run_id)
             conn.commit()
-            print("Crawl complete:", stats)
+            if final is not None:
+                print("Crawl complete:", final)
+            else:
+                print("Worker finished; the run is still being crawled or was closed by another process:", stats)
 
         except Exception as e:
             conn.rollback()
-            finish_crawl_run(conn, run_id, "failed", {**stats, "error": str(e)})
+            release_crawl_claims(conn, run_id, worker_id)
+            # The run belongs to its coordinator: a failing worker only hands its claims back.
+            if not args.worker:
+                finish_crawl_run(conn, run_id, "failed", {**stats, "error": str(e)})
             conn.commit()
             raise
 
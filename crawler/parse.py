@@ -64,7 +64,7 @@ def parse_family_and_variants_from_tags_page(html: str, slug: str) -> Tuple[Fami
         if re.search(rf"\b{re.escape(lab)}\b", page_text):
             labels.append(lab)
 
-    family = FamilyParsed(
+    family = FamilyParsed.checked(
         slug=slug,
         display_name=display_name,
         description=description,
@@ -116,7 +116,7 @@ def parse_family_and_variants_from_tags_page(html: str, slug: str) -> Tuple[Fami
         age_text = extract_age_text(text)
         tag_short = tag.split(":", 1)[1] if ":" in tag else tag
 
-        variants.append(VariantParsed(
+        variants.append(VariantParsed.checked(
             family_slug=slug,
             tag=tag,
             tag_short=tag_short,
@@ -0,0 +1,49 @@
+from __future__ import annotations
+import argparse
+from datetime import datetime, timezone
+from .db import (
+    PARTITIONED_TABLES,
+    connect,
+    delete_rows_before,
+    drop_time_partitions,
+    ensure_time_partitions,
+    get_db_url,
+    is_sqlite,
+)
+
+def retention_cutoff(keep_months: int, now: datetime) -> datetime:
+    '''Start of the month `keep_months` before the current one (UTC): the current month always survives.'''
+    months = now.year * 12 + (now.month - 1) - keep_months
+    return datetime(months // 12, months % 12 + 1, 1, tzinfo=timezone.utc)
+
+def main():
+    ap = argparse.ArgumentParser(description="Manage monthly partitions of derived_estimate / workflow_run")
+    ap.add_argument("--db-url", default=None, help="Postgres or sqlite:///file.db URL (or use DATABASE_URL env var)")
+    sub = ap.add_subparsers(dest="command", required=True)
+    ens = sub.add_parser("ensure", help="Create partitions for the current and upcoming months")
+    ens.add_argument("--months-ahead", type=int, default=3)
+    drop = sub.add_parser("drop", help="Retention: drop whole months older than --keep-months")
+    drop.add_argument("--keep-months", type=int, required=True, help="Full months to keep before the current one")
+    drop.add_argument("--table", choices=sorted(PARTITIONED_TABLES), action="append",
+                      help="Table to trim (repeatable; default: all partitioned tables)")
+    args = ap.parse_args()
+
+    with connect(get_db_url(args.db_url)) as conn:
+        if args.command == "ensure":
+            n = ensure_time_partitions(conn, args.months_ahead)
+            conn.commit()
+            print("SQLite: no partitions to create" if is_sqlite(conn) else f"Created {n} partitions")
+            return
+
+        cutoff = retention_cutoff(args.keep_months, datetime.now(timezone.utc))
+        for table in args.table or sorted(PARTITIONED_TABLES):
+            if is_sqlite(conn):
+                n = delete_rows_before(conn, table, cutoff)
+                print(f"{table}: deleted {n} rows before {cutoff:%Y-%m-%d}")
+            else:
+                dropped = drop_time_partitions(conn, table, cutoff)
+                print(f"{table}: dropped {len(dropped)} partitions before {cutoff:%Y-%m-%d}" + (f" ({', '.join(dropped)})" if dropped else ""))
+            conn.commit()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+from __future__ import annotations
+import argparse
+import heapq
+import json
+import math
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+from .fit import ComponentTable, compute_fits
+
+DEFAULT_CATALOG = "site/data/catalog.json"
+DEFAULT_PORT = 8092
+DEFAULT_K = 20
+MAX_K = 500
+DEFAULT_CACHE_SIZE = 1024
+
+@dataclass(frozen=True)
+class Query:
+    '''Normalized recommendation query (hashable; used as the cache key).'''
+    budget_gib: float = 24.0
+    context_tokens: int = 16384
+    kv_cache_type: str = "fp16"
+    workflow: Optional[str] = None
+    toolchain: Optional[str] = None
+    use_case: Optional[str] = None
+    q: Optional[str] = None
+    prefer_quality: bool = True
+    min_tps: Optional[float] = None
+    max_ttft_ms: Optional[float] = None
+    k: int = DEFAULT_K
+
+    @classmethod
+    def normalize(cls, **params) -> "Query":
+        def text(v) -> Optional[str]:
+            v = (str(v).strip() if v is not None else "")
+            return v or None
+
+        def num(name: str) -> Optional[float]:
+            v = params.get(name)
+            if v in (None, ""):
+                return None
+            x = float(v)
+            if not math.isfinite(x):
+                raise ValueError(f"{name} must be a finite number, got {v!r}")
+            return x
+
+        def slug(v) -> Optional[str]:
+            # Unescaped '+' in query strings arrives as a space; slugs never contain spaces.
+            v = text(v)
+            return v.replace(" ", "+") if v else None
+
+        prefer = params.get("prefer_quality", True)
+        if isinstance(prefer, str):
+            prefer = prefer.strip().lower() not in ("false", "0", "no")
+        q = text(params.get("q"))
+        budget = num("budget_gib")
+        ctx = num("context_tokens")
+        return cls(
+            budget_gib=round(budget if budget is not None else cls.budget_gib, 3),
+            context_tokens=int(ctx if ctx is not None else cls.context_tokens),
+            kv_cache_type=(text(params.get("kv_cache_type")) or "fp16").lower(),
+            workflow=slug(params.get("workflow")),
+            toolchain=slug(params.get("toolchain")),
+            use_case=text(params.get("use_case")),
+            q=q.lower() if q else None,
+            prefer_quality=bool(prefer),
+            min_tps=num("min_tps"),
+            max_ttft_ms=num("max_ttft_ms"),
+            k=max(1, min(MAX_K, int(num("k") or DEFAULT_K))),
+        )
+
+class CatalogIndex:
+    '''
+    In-memory columnar index over an exported catalog.json.
+    Variant arrays are aligned with the ComponentTable rows (variants without
+    complete VRAM components are not rankable, same as on the site).
+    '''
+    def __init__(self, catalog: dict):
+        self.version = catalog.get("generated_at") or ""
+        self.comps = ComponentTable(catalog.get("variant_components") or [])
+
+        variants = {v["id"]: v for v in catalog.get("variants") or []}
+        families = {f["slug"]: f for f in catalog.get("families") or []}
+        self.variants = [variants.get(vid) or {"id": vid} for vid in self.comps.variant_ids]
+
+        texts, family_ids = [], []
+        for v in self.variants:
+            fam = families.get(v.get("family_slug")) or {}
+            texts.append(f"{v.get('family_slug', '')} {v.get('tag', '')} {fam.get('display_name') or ''} "
+                         f"{' '.join(fam.get('labels') or [])}".lower())
+            family_ids.append(fam.get("id"))
+        self.search_text = np.array(texts, dtype=object)
+        self.family_ids = np.array(family_ids, dtype=object)
+
+        self.families_by_tag: Dict[str, set] = {}
+        for ft in catalog.get("family_tags") or []:
+            self.families_by_tag.setdefault(ft["tag_slug"], set()).add(ft["family_id"])
+
+        self.run_agg = {(r["variant_id"], r["workflow_slug"], r["toolchain_slug"]): r
+                        for r in catalog.get("workflow_run_agg") or []}
+        self.best_templates = {(t.get("variant_id") or "", t["workflow_slug"], t.get("toolchain_slug") or ""): t
+                               for t in catalog.get("best_templates") or []}
+        self._signals: Dict[Tuple[Optional[str], Optional[str]], Dict[str, np.ndarray]] = {}
+        self._signals_lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str) -> "CatalogIndex":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def signals(self, workflow: Optional[str], toolchain: Optional[str]) -> Dict[str, np.ndarray]:
+        '''Per-variant run/template signal columns for one (workflow, toolchain); built once.'''
+        key = (workflow, toolchain)
+        with self._signals_lock:
+            if key in self._signals:
+                return self._signals[key]
+            n = len(self.comps)
+            cols = {
+                "run_count_trusted": np.zeros(n),
+                "p50_tps": np.full(n, np.nan),
+                "p50_ttft_ms": np.full(n, np.nan),
+                "avg_quality": np.full(n, np.nan),
+                "avg_success": np.full(n, np.nan),
+                "template_vote_sum": np.zeros(n),
+            }
+            for i, vid in enumerate(self.comps.variant_ids):
+                run = self.run_agg.get((vid, workflow, toolchain)) if workflow and toolchain else None
+                if run:
+                    for c in ("run_count_trusted", "p50_tps", "p50_ttft_ms", "avg_quality", "avg_success"):
+                        if run.get(c) is not None:
+                            cols[c][i] = run[c]
+                if workflow:
+                    tmpl = (self.best_templates.get((vid, workflow, toolchain or ""))
+                            or self.best_templates.get((vid, workflow, "")))
+                    if tmpl and tmpl.get("vote_sum") is not None:
+                        cols["template_vote_sum"][i] = tmpl["vote_sum"]
+            self._signals[key] = cols
+            return cols
+
+def rank_scores(tiers: np.ndarray, sig: Dict[str, np.ndarray], query: Query) -> np.ndarray:
+    '''Vectorized rankScore() from site/app.js.'''
+    score = np.select([tiers == "fits_cons", tiers == "fits_opt", tiers == "no_fit"], [100.0, 60.0, -999.0], 0.0)
+    score = score + 10 * np.log1p(sig["run_count_trusted"])
+    if query.prefer_quality:
+        score = score + np.nan_to_num(sig["avg_quality"]) * 4
+    else:
+        score = score + np.nan_to_num(sig["p50_tps"]) * 0.8
+    score = score + np.clip(sig["template_vote_sum"], 0, 20)
+    with np.errstate(invalid="ignore"):
+        if query.min_tps is not None:
+            score = score - 50 * (sig["p50_tps"] < query.min_tps)
+        if query.max_ttft_ms is not None:
+            score = score - 30 * (sig["p50_ttft_ms"] > query.max_ttft_ms)
+    return score
+
+def _opt(x) -> Optional[float]:
+    x = float(x)
+    return None if np.isnan(x) else x
+
+def recommend(index: CatalogIndex, query: Query) -> List[dict]:
+    fits = compute_fits(index.comps, query.budget_gib, query.context_tokens, query.kv_cache_type)
+    mask = fits["fit_tier"] != "no_fit"
+    if query.q:
+        mask &= np.fromiter((query.q in t for t in index.search_text), dtype=bool, count=len(index.search_text))
+    if query.use_case:
+        mask &= np.isin(index.family_ids, list(index.families_by_tag.get(query.use_case, ())))
+
+    sig = index.signals(query.workflow, query.toolchain)
+    scores = rank_scores(fits["fit_tier"], sig, query)
+    vram_cons = fits["vram_required_cons_gib"]
+    top = heapq.nlargest(query.k, np.flatnonzero(mask).tolist(), key=lambda i: (scores[i], -vram_cons[i]))
+
+    out = []
+    for i in top:
+        v = index.variants[i]
+        out.append({
+            "variant_id": v.get("id"),
+            "family_slug": v.get("family_slug"),
+            "tag": v.get("tag"),
+            "tag_short": v.get("tag_short"),
+            "size_gib": v.get("size_gib"),
+            "max_context_catalog": v.get("max_context"),
+            "fit_tier": fits["fit_tier"][i],
+            "vram_required_opt_gib": float(fits["vram_required_opt_gib"][i]),
+            "vram_required_cons_gib": float(vram_cons[i]),
+            "max_context_tokens_cons": int(fits["max_context_tokens_cons"][i]),
+            "run_count_trusted": int(sig["run_count_trusted"][i]),
+            "p50_tps": _opt(sig["p50_tps"][i]),
+            "p50_ttft_ms": _opt(sig["p50_ttft_ms"][i]),
+            "avg_quality": _opt(sig["avg_quality"][i]),
+            "avg_success": _opt(sig["avg_success"][i]),
+            "template_vote_sum": int(sig["template_vote_sum"][i]),
+            "rank_score": float(scores[i]),
+        })
+    return out
+
+class Recommender:
+    '''
+    Serves queries from the current catalog index with an LRU cache keyed on
+    (catalog version, normalized query). The catalog file is re-read when it changes.
+    Cached results are stored as a tuple and every caller gets its own copies of the rows.
+    '''
+    def __init__(self, catalog_path: str, cache_size: int = DEFAULT_CACHE_SIZE):
+        self.catalog_path = catalog_path
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[str, Query], Tuple[dict, ...]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stamp: Optional[Tuple[float, int]] = None
+        self.index: Optional[CatalogIndex] = None
+        self.hits = 0
+        self.misses = 0
+
+    def _current_index(self) -> CatalogIndex:
+        st = os.stat(self.catalog_path)
+        stamp = (st.st_mtime, st.st_size)
+        with self._lock:
+            if self.index is None or stamp != self._stamp:
+                self.index = CatalogIndex.load(self.catalog_path)
+                self._stamp = stamp
+            return self.index
+
+    def query(self, query: Query) -> Tuple[str, List[dict]]:
+        index = self._current_index()
+        key = (index.version, query)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return index.version, [dict(r) for r in self._cache[key]]
+        result = tuple(recommend(index, query))
+        with self._lock:
+            self.misses += 1
+            self._cache[key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return index.version, [dict(r) for r in result]
+
+# Query-string names -> Query fields
+_PARAM_ALIASES = {
+    "budget": "budget_gib", "budget_gib": "budget_gib", "vram": "budget_gib",
+    "context": "context_tokens", "ctx": "context_tokens", "context_tokens": "context_tokens",
+    "kv": "kv_cache_type", "kv_cache_type": "kv_cache_type",
+    "workflow": "workflow", "toolchain": "toolchain", "use_case": "use_case", "q": "q",
+    "prefer_quality": "prefer_quality", "min_tps": "min_tps",
+    "max_ttft": "max_ttft_ms", "max_ttft_ms": "max_ttft_ms", "k": "k",
+}
+
+def _make_handler(recommender: Recommender):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status: int, payload: dict) -> None:
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/healthz":
+                index = recommender.index
+                self._send(200, {"ok": True, "catalog_version": index.version if index else None,
+                                 "variants": len(index.comps) if index else 0,
+                                 "cache": {"hits": recommender.hits, "misses": recommender.misses}})
+                return
+            if url.path != "/recommend":
+                self._send(404, {"error": "not found"})
+                return
+            params = {}
+            for k, vals in parse_qs(url.query).items():
+                if k in _PARAM_ALIASES:
+                    params[_PARAM_ALIASES[k]] = vals[-1]
+            try:
+                query = Query.normalize(**params)
+            except (ValueError, OverflowError) as e:
+                self._send(400, {"error": str(e)})
+                return
+            version, results = recommender.query(query)
+            self._send(200, {"catalog_version": version, "query": asdict(query), "results": results})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+def main():
+    ap = argparse.ArgumentParser(description="Top-k model recommendations from the exported catalog")
+    ap.add_argument("--catalog", default=DEFAULT_CATALOG, help="Path to catalog.json from scripts/export_site.py")
+    ap.add_argument("--serve", action="store_true", help="Run the HTTP endpoint instead of a one-shot query")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT)
+    ap.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE)
+    ap.add_argument("--budget", type=float, default=24.0, help="VRAM budget (GiB)")
+    ap.add_argument("--context", type=int, default=16384, help="Target context tokens")
+    ap.add_argument("--kv", default="fp16", help="KV cache type (fp16/q8/q4)")
+    ap.add_argument("--workflow", default=None)
+    ap.add_argument("--toolchain", default=None)
+    ap.add_argument("--use-case", default=None)
+    ap.add_argument("--q", default=None, help="Search text")
+    ap.add_argument("--prefer-speed", action="store_true", help="Rank by p50 TPS instead of quality")
+    ap.add_argument("--min-tps", type=float, default=None)
+    ap.add_argument("--max-ttft", type=float, default=None, help="Max p50 TTFT (ms)")
+    ap.add_argument("-k", type=int, default=DEFAULT_K)
+    args = ap.parse_args()
+
+    recommender = Recommender(args.catalog, cache_size=args.cache_size)
+    if args.serve:
+        recommender._current_index()
+        server = ThreadingHTTPServer((args.host, args.port), _make_handler(recommender))
+        print(f"Recommendations on http://{args.host}:{args.port}/recommend?budget=16&context=32768&workflow=web-dev")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return
+
+    query = Query.normalize(
+        budget_gib=args.budget, context_tokens=args.context, kv_cache_type=args.kv,
+        workflow=args.workflow, toolchain=args.toolchain, use_case=args.use_case, q=args.q,
+        prefer_quality=not args.prefer_speed, min_tps=args.min_tps, max_ttft_ms=args.max_ttft, k=args.k,
+    )
+    version, results = recommender.query(query)
+    print(json.dumps({"catalog_version": version, "query": asdict(query), "results": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
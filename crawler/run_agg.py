@@ -0,0 +1,175 @@
+from __future__ import annotations
+import argparse
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+import psycopg
+from .sketch import DDSketch
+from .db import (
+    connect,
+    get_db_url,
+    insert_workflow_runs,
+    lock_workflow_run_agg,
+    update_workflow_run_agg,
+    iter_workflow_runs,
+    truncate_workflow_run_agg,
+    pop_toolchain_run_aggs,
+    delete_toolchain,
+)
+
+TRUSTED_VERIFICATION = ("community_verified", "admin_verified")
+
+AggKey = Tuple[str, str, Optional[str]]  # (variant_id, workflow_id, toolchain_id)
+
+def _as_datetime(ts) -> Optional[datetime]:
+    # The embedded (SQLite) backend returns timestamps as ISO-8601 text.
+    return datetime.fromisoformat(ts) if isinstance(ts, str) else ts
+
+@dataclass
+class RunAgg:
+    '''
+    Counts/sums plus mergeable TPS/TTFT sketches for one (variant, workflow, toolchain).
+    Mirrors the columns of the workflow_run_agg table.
+    '''
+    run_count: int = 0
+    run_count_trusted: int = 0
+    quality_sum: float = 0.0
+    quality_count: int = 0
+    success_count: int = 0
+    tps: DDSketch = field(default_factory=DDSketch)
+    ttft: DDSketch = field(default_factory=DDSketch)
+    last_run_at: Optional[datetime] = None
+
+    def add(self, run: dict) -> None:
+        self.run_count += 1
+        if (run.get("verification") or "community_verified") in TRUSTED_VERIFICATION:
+            self.run_count_trusted += 1
+        if run.get("quality_score") is not None:
+            self.quality_sum += float(run["quality_score"])
+            self.quality_count += 1
+        if run.get("success"):
+            self.success_count += 1
+        self.tps.add(run.get("tokens_per_second"))
+        self.ttft.add(run.get("ttft_ms"))
+        self._touch(run.get("submitted_at"))
+
+    def merge(self, other: "RunAgg") -> None:
+        self.run_count += other.run_count
+        self.run_count_trusted += other.run_count_trusted
+        self.quality_sum += other.quality_sum
+        self.quality_count += other.quality_count
+        self.success_count += other.success_count
+        self.tps.merge(other.tps)
+        self.ttft.merge(other.ttft)
+        self._touch(other.last_run_at)
+
+    def _touch(self, ts: Optional[datetime]) -> None:
+        ts = _as_datetime(ts)
+        if ts is not None and (self.last_run_at is None or ts > self.last_run_at):
+            self.last_run_at = ts
+
+    @classmethod
+    def from_row(cls, row: dict) -> "RunAgg":
+        return cls(
+            run_count=row["run_count"],
+            run_count_trusted=row["run_count_trusted"],
+            quality_sum=float(row["quality_sum"]),
+            quality_count=row["quality_count"],
+            success_count=row["success_count"],
+            tps=DDSketch.from_bytes(row["tps_sketch"]),
+            ttft=DDSketch.from_bytes(row["ttft_sketch"]),
+            last_run_at=_as_datetime(row["last_run_at"]),
+        )
+
+    def to_params(self) -> dict:
+        return {
+            "run_count": self.run_count,
+            "run_count_trusted": self.run_count_trusted,
+            "quality_sum": self.quality_sum,
+            "quality_count": self.quality_count,
+            "success_count": self.success_count,
+            "tps_sketch": self.tps.to_bytes(),
+            "ttft_sketch": self.ttft.to_bytes(),
+            "p50_tps": self.tps.quantile(0.50),
+            "p95_tps": self.tps.quantile(0.95),
+            "p50_ttft_ms": self.ttft.quantile(0.50),
+            "p95_ttft_ms": self.ttft.quantile(0.95),
+            "last_run_at": self.last_run_at,
+        }
+
+def run_key(run: dict) -> AggKey:
+    tc = run.get("toolchain_id")
+    return (str(run["variant_id"]), str(run["workflow_id"]), str(tc) if tc else None)
+
+def fold_runs(runs: Iterable[dict]) -> Dict[AggKey, RunAgg]:
+    out: Dict[AggKey, RunAgg] = {}
+    for run in runs:
+        key = run_key(run)
+        agg = out.get(key)
+        if agg is None:
+            agg = out[key] = RunAgg()
+        agg.add(run)
+    return out
+
+def merge_run_aggregates(conn: psycopg.Connection, deltas: Dict[AggKey, RunAgg]) -> None:
+    '''
+    Merge per-key deltas into workflow_run_agg (row-locked; keys in sorted order to avoid deadlocks).
+    '''
+    for key in sorted(deltas, key=lambda k: (k[0], k[1], k[2] or "")):
+        row = lock_workflow_run_agg(conn, key)
+        agg = RunAgg.from_row(row)
+        agg.merge(deltas[key])
+        update_workflow_run_agg(conn, key, agg.to_params())
+
+def record_workflow_runs(conn: psycopg.Connection, runs: List[dict]) -> int:
+    '''
+    Insert runs and fold them into the maintained aggregates in the same transaction.
+    '''
+    if not runs:
+        return 0
+    insert_workflow_runs(conn, runs)
+    merge_run_aggregates(conn, fold_runs(runs))
+    return len(runs)
+
+def rebuild_workflow_run_aggregates(conn: psycopg.Connection) -> int:
+    '''
+    Recompute workflow_run_agg from scratch (backfill, or repair after manual SQL writes).
+    '''
+    truncate_workflow_run_agg(conn)
+    deltas = fold_runs(iter_workflow_runs(conn))
+    merge_run_aggregates(conn, deltas)
+    return len(deltas)
+
+def fold_and_delete_toolchain(conn: psycopg.Connection, toolchain_slug: str) -> Optional[int]:
+    '''
+    Delete a toolchain, folding its aggregates into the no-toolchain bucket of the same
+    (variant, workflow) first. Its runs stay with toolchain_id NULL (ON DELETE SET NULL).
+    Returns the number of folded keys, or None if there is no such toolchain.
+    '''
+    rows = pop_toolchain_run_aggs(conn, toolchain_slug)
+    merge_run_aggregates(conn, {(r["variant_id"], r["workflow_id"], None): RunAgg.from_row(r) for r in rows})
+    if not delete_toolchain(conn, toolchain_slug):
+        return None
+    return len(rows)
+
+def main():
+    ap = argparse.ArgumentParser(description="Rebuild workflow_run_agg from workflow_run")
+    ap.add_argument("--db-url", default=None, help="Postgres or sqlite:///file.db URL (or use DATABASE_URL env var)")
+    ap.add_argument("--delete-toolchain", default=None, metavar="SLUG",
+                    help="Delete a toolchain, folding its aggregates into the no-toolchain bucket (no rebuild)")
+    args = ap.parse_args()
+
+    with connect(get_db_url(args.db_url)) as conn:
+        if args.delete_toolchain:
+            n = fold_and_delete_toolchain(conn, args.delete_toolchain)
+            if n is None:
+                raise SystemExit(f"No toolchain {args.delete_toolchain!r}")
+            conn.commit()
+            print(f"Deleted toolchain {args.delete_toolchain} ({n} aggregate keys folded into the no-toolchain bucket)")
+            return
+        n = rebuild_workflow_run_aggregates(conn)
+        conn.commit()
+    print(f"Rebuilt workflow_run_agg ({n} keys)")
+
+if __name__ == "__main__":
+    main()
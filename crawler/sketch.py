@@ -0,0 +1,89 @@
+from __future__ import annotations
+import math
+import struct
+from typing import Dict, Optional
+
+_FORMAT_VERSION = 1
+_HEADER = struct.Struct("<BdQI")  # version, relative_accuracy, zero_count, n_bins
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+# Values at or below this are counted in the zero bucket (log-indexing needs x > 0).
+MIN_INDEXABLE_VALUE = 1e-9
+
+class DDSketch:
+    '''
+    Mergeable quantile sketch (DDSketch, Masson et al. 2019) with a sparse bucket map.
+
+    Every quantile estimate is within `relative_accuracy` of the true value, and two
+    sketches with the same accuracy merge exactly by adding bucket counts, so
+    aggregates can be updated per insert batch without re-reading old rows.
+    Serialized to bytes for storage in a bytea column.
+    '''
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError(f"relative_accuracy must be in (0, 1), got {relative_accuracy}")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+
+    @property
+    def count(self) -> int:
+        return self.zero_count + sum(self.bins.values())
+
+    def add(self, value: Optional[float]) -> None:
+        if value is None:
+            return
+        value = float(value)
+        if not math.isfinite(value):
+            # NaN/inf have no bucket (log(inf) overflows); skip them rather than fail the batch.
+            return
+        if value <= MIN_INDEXABLE_VALUE:
+            self.zero_count += 1
+            return
+        k = math.ceil(math.log(value) / self._log_gamma)
+        self.bins[k] = self.bins.get(k, 0) + 1
+
+    def merge(self, other: "DDSketch") -> None:
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge DDSketches with different relative accuracy")
+        self.zero_count += other.zero_count
+        for k, n in other.bins.items():
+            self.bins[k] = self.bins.get(k, 0) + n
+
+    def quantile(self, q: float) -> Optional[float]:
+        total = self.count
+        if total == 0:
+            return None
+        rank = q * (total - 1)
+        if rank < self.zero_count:
+            return 0.0
+        seen = self.zero_count
+        for k in sorted(self.bins):
+            seen += self.bins[k]
+            if seen > rank:
+                return 2 * self.gamma ** k / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+    def to_bytes(self) -> bytes:
+        keys = sorted(self.bins)
+        n = len(keys)
+        return (
+            _HEADER.pack(_FORMAT_VERSION, self.relative_accuracy, self.zero_count, n)
+            + struct.pack(f"<{n}i{n}Q", *keys, *(self.bins[k] for k in keys))
+        )
+
+    @classmethod
+    def from_bytes(cls, data: Optional[bytes]) -> "DDSketch":
+        if not data:
+            return cls()
+        data = bytes(data)
+        version, accuracy, zero_count, n = _HEADER.unpack_from(data, 0)
+        if version != _FORMAT_VERSION:
+            raise ValueError(f"Unsupported DDSketch format version {version}")
+        sk = cls(accuracy)
+        sk.zero_count = zero_count
+        values = struct.unpack_from(f"<{n}i{n}Q", data, _HEADER.size)
+        sk.bins = dict(zip(values[:n], values[n:]))
+        return sk
@@ -0,0 +1,115 @@
+from __future__ import annotations
+import argparse
+import hashlib
+import re
+from typing import Dict, List, Optional, Tuple
+import psycopg
+from .db import (
+    connect,
+    get_db_url,
+    load_family_tag_rules,
+    get_tag_rules_digest,
+    set_tag_rules_digest,
+    list_family_slugs,
+    replace_inferred_family_tags,
+)
+
+# Postgres AREs only allow embedded options at the very start, e.g. '(?i)(coder|code)'.
+# Rules are applied case-insensitively anyway (they were used with ~*), so strip them.
+_LEADING_FLAGS = re.compile(r"^\(\?[a-zA-Z]+\)")
+# Backreferences / named groups would break once the patterns are combined.
+_UNSAFE = re.compile(r"\\[1-9]|\(\?P[<=]")
+
+class FamilyTagger:
+    '''
+    All family-scope tag_rule patterns compiled into one regex.
+
+    Each rule becomes an optional lookahead `(?:(?=.*?(?P<rN>pattern)))?` anchored at
+    the start of the slug, so a single match call reports every rule that matches
+    anywhere in the slug (a plain `a|b|c` alternation would stop at the first hit).
+    '''
+    def __init__(self, rules: List[dict]):
+        self.rules: List[dict] = []
+        self.skipped: List[str] = []
+        parts: List[str] = []
+        for rule in rules:
+            pattern = _LEADING_FLAGS.sub("", rule["pattern"])
+            try:
+                re.compile(pattern)
+            except re.error:
+                self.skipped.append(rule["pattern"])
+                continue
+            if _UNSAFE.search(pattern):
+                self.skipped.append(rule["pattern"])
+                continue
+            parts.append(f"(?:(?=.*?(?P<r{len(self.rules)}>{pattern})))?")
+            self.rules.append(rule)
+        self._regex = re.compile("".join(parts), re.IGNORECASE | re.DOTALL) if parts else None
+
+    def digest(self) -> str:
+        h = hashlib.sha256()
+        for r in sorted(self.rules, key=lambda r: (r["pattern"], r["tag_id"])):
+            h.update(f"{r['pattern']}\x00{r['tag_id']}\x00{r['confidence']}\n".encode("utf-8"))
+        return h.hexdigest()
+
+    def match(self, slug: str) -> Dict[str, float]:
+        '''Returns {tag_id: confidence}; the highest confidence wins when rules share a tag.'''
+        if self._regex is None:
+            return {}
+        m = self._regex.match(slug)
+        out: Dict[str, float] = {}
+        for name, hit in m.groupdict().items():
+            if hit is None:
+                continue
+            rule = self.rules[int(name[1:])]
+            if rule["confidence"] > out.get(rule["tag_id"], -1.0):
+                out[rule["tag_id"]] = rule["confidence"]
+        return out
+
+    def tag_rows(self, families: List[Tuple[str, str]]) -> List[Tuple[str, str, float]]:
+        rows: List[Tuple[str, str, float]] = []
+        for family_id, slug in families:
+            for tag_id, confidence in self.match(slug).items():
+                rows.append((family_id, tag_id, confidence))
+        return rows
+
+def load_tagger(conn: psycopg.Connection) -> FamilyTagger:
+    return FamilyTagger(load_family_tag_rules(conn))
+
+def tag_families(conn: psycopg.Connection, tagger: FamilyTagger, families: List[Tuple[str, str]]) -> int:
+    '''Re-tag the given (family_id, slug) pairs. Returns the number of tags written.'''
+    rows = tagger.tag_rows(families)
+    replace_inferred_family_tags(conn, rows, family_ids=[f[0] for f in families])
+    return len(rows)
+
+def sync_tag_rules(conn: psycopg.Connection, force: bool = False) -> Tuple[FamilyTagger, Optional[int]]:
+    '''
+    Load the current rules and, if they changed since the last sync (or `force`),
+    re-tag every family in bulk. Returns (tagger, families_retagged or None).
+    '''
+    tagger = load_tagger(conn)
+    digest = tagger.digest()
+    if not force and get_tag_rules_digest(conn) == digest:
+        return tagger, None
+
+    families = [(f["id"], f["slug"]) for f in list_family_slugs(conn)]
+    replace_inferred_family_tags(conn, tagger.tag_rows(families))
+    set_tag_rules_digest(conn, digest)
+    return tagger, len(families)
+
+def main():
+    ap = argparse.ArgumentParser(description="Re-apply family tag_rule patterns to model_family_tag")
+    ap.add_argument("--db-url", default=None, help="Postgres or sqlite:///file.db URL (or use DATABASE_URL env var)")
+    ap.add_argument("--force", action="store_true", help="Re-tag every family even if tag_rule is unchanged")
+    args = ap.parse_args()
+
+    with connect(get_db_url(args.db_url)) as conn:
+        tagger, retagged = sync_tag_rules(conn, force=args.force)
+        conn.commit()
+    if retagged is None:
+        print("tag_rule unchanged; nothing to do")
+    else:
+        print(f"Re-tagged {retagged} families with {len(tagger.rules)} rules (skipped: {tagger.skipped})")
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,69 @@
 from __future__ import annotations
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Any, NamedTuple, Optional, Tuple
 
-class FamilyParsed(BaseModel):
+# Parsed catalog records are plain NamedTuples: no per-instance __dict__ and no
+# validation on construction. Values coming from scraped pages go through
+# `checked()` once, in crawler/parse.py; everything downstream trusts them.
+
+def _check_str(name: str, value: Any, optional: bool = True) -> Optional[str]:
+    if value is None and optional:
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"{name}: expected str, got {value!r}")
+    return value
+
+def _check_int(name: str, value: Any, optional: bool = True) -> Optional[int]:
+    if value is None and optional:
+        return None
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str) and value.strip().lstrip("-").isdigit():
+        return int(value)
+    raise ValueError(f"{name}: expected int, got {value!r}")
+
+class FamilyParsed(NamedTuple):
     slug: str
     display_name: Optional[str] = None
     description: Optional[str] = None
-    labels: List[str] = Field(default_factory=list)
+    labels: Tuple[str, ...] = ()
     downloads: Optional[int] = None
     catalog_updated_text: Optional[str] = None
 
-class VariantParsed(BaseModel):
+    @classmethod
+    def checked(cls, **fields: Any) -> "FamilyParsed":
+        labels = fields.get("labels") or ()
+        if not all(isinstance(x, str) for x in labels):
+            raise ValueError(f"labels: expected a list of str, got {labels!r}")
+        return cls(
+            slug=_check_str("slug", fields.get("slug"), optional=False),
+            display_name=_check_str("display_name", fields.get("display_name")),
+            description=_check_str("description", fields.get("description")),
+            labels=tuple(labels),
+            downloads=_check_int("downloads", fields.get("downloads")),
+            catalog_updated_text=_check_str("catalog_updated_text", fields.get("catalog_updated_text")),
+        )
+
+class VariantParsed(NamedTuple):
     family_slug: str
     tag: str
+    size_bytes: int
     tag_short: Optional[str] = None
     digest: Optional[str] = None
-    size_bytes: int
     max_context: Optional[int] = None
     input_type: Optional[str] = None
     catalog_age_text: Optional[str] = None
+
+    @classmethod
+    def checked(cls, **fields: Any) -> "VariantParsed":
+        return cls(
+            family_slug=_check_str("family_slug", fields.get("family_slug"), optional=False),
+            tag=_check_str("tag", fields.get("tag"), optional=False),
+            size_bytes=_check_int("size_bytes", fields.get("size_bytes"), optional=False),
+            tag_short=_check_str("tag_short", fields.get("tag_short")),
+            digest=_check_str("digest", fields.get("digest")),
+            max_context=_check_int("max_context", fields.get("max_context")),
+            input_type=_check_str("input_type", fields.get("input_type")),
+            catalog_age_text=_check_str("catalog_age_text", fields.get("catalog_age_text")),
+        )
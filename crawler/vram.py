@@ -1,12 +1,14 @@
 from __future__ import annotations
 import re
-from dataclasses import dataclass
-from typing import Optional, Literal
+from typing import Literal, NamedTuple, Optional
 
 GiB = 1024 ** 3
 
-@dataclass(frozen=True)
-class VramEstimate:
+_TIER_MOE = re.compile(r":(\d+)x(\d+(?:\.\d+)?)b\b", re.IGNORECASE)
+_TIER_B = re.compile(r":(\d+(?:\.\d+)?)b\b", re.IGNORECASE)
+_TIER_M = re.compile(r":(\d+(?:\.\d+)?)m\b", re.IGNORECASE)
+
+class VramEstimate(NamedTuple):
     total_gib_opt: float
     total_gib_cons: float
     weights_gib: float
@@ -23,13 +25,13 @@ def _parse_param_tier_b(tag: str) -> Optional[float]:
     - mixtral:8x7b -> 56
     - qwen2.5:0.5b -> 0.5
     '''
-    m = re.search(r":(\d+)x(\d+(?:\.\d+)?)b\b", tag, re.IGNORECASE)
+    m = _TIER_MOE.search(tag)
     if m:
         return float(m.group(1)) * float(m.group(2))
-    m = re.search(r":(\d+(?:\.\d+)?)b\b", tag, re.IGNORECASE)
+    m = _TIER_B.search(tag)
     if m:
         return float(m.group(1))
-    m = re.search(r":(\d+(?:\.\d+)?)m\b", tag, re.IGNORECASE)
+    m = _TIER_M.search(tag)
     if m:
         return float(m.group(1)) / 1000.0
     return None
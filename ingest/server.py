@@ -0,0 +1,378 @@
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+from pydantic import BaseModel, ValidationError
+from psycopg.rows import dict_row
+from psycopg_pool import ConnectionPool
+from crawler.db import ensure_time_partitions, get_db_url, load_key_ids, require_postgres, upsert_template_votes
+from crawler.run_agg import record_workflow_runs
+from .types import RunSubmission, VoteSubmission
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8090
+MAX_BODY_BYTES = 1 << 20
+MAX_ITEMS_PER_REQUEST = 1000
+WRITE_TIMEOUT_S = 30.0
+RETRY_AFTER_S = 1
+
+_REASONS = {200: "OK", 201: "Created", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 422: "Unprocessable Entity", 500: "Internal Server Error",
+            503: "Service Unavailable"}
+
+class Overloaded(RuntimeError):
+    pass
+
+class WriteTimeout(RuntimeError):
+    '''The batch holding the items did not commit within WRITE_TIMEOUT_S; it may still.'''
+    pass
+
+class MicroBatcher:
+    '''
+    Coalesces submissions from concurrent requests into batches of up to `batch_size`
+    items (or whatever arrived within `max_wait_s`), written by `write_batch` in a
+    worker thread. Each request waits for the commit of the batch holding its items.
+
+    Backpressure: once `max_pending` items are queued or in flight, `submit` raises
+    Overloaded and the request is answered with 503 + Retry-After.
+
+    If the batch has not committed after WRITE_TIMEOUT_S, `submit` raises WriteTimeout.
+    The write keeps going and may still commit, so the request is answered with
+    202 (not applied yet, don't retry) rather than an error a client would retry,
+    which would insert the runs twice.
+    '''
+    def __init__(
+        self,
+        write_batch: Callable[[list], None],
+        *,
+        batch_size: int,
+        max_wait_s: float,
+        max_pending: int,
+        workers: int,
+    ):
+        self.write_batch = write_batch
+        self.batch_size = batch_size
+        self.max_wait_s = max_wait_s
+        self.max_pending = max_pending
+        self.workers = workers
+        self.pending = 0
+        self.stats = {"batches": 0, "items": 0, "rejected": 0, "timed_out": 0, "failed_batches": 0}
+        self._queue: "asyncio.Queue[Tuple[list, asyncio.Future]]" = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def submit(self, items: list) -> None:
+        if self.pending + len(items) > self.max_pending:
+            self.stats["rejected"] += len(items)
+            raise Overloaded(f"{self.pending} items pending")
+        self.pending += len(items)
+        fut = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((items, fut))
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), WRITE_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            self.stats["timed_out"] += len(items)
+            raise WriteTimeout(f"not committed after {WRITE_TIMEOUT_S:g}s") from None
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            n = len(batch[0][0])
+            deadline = loop.time() + self.max_wait_s
+            while n < self.batch_size:
+                try:
+                    entry = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        entry = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                batch.append(entry)
+                n += len(entry[0])
+
+            items = [item for entry in batch for item in entry[0]]
+            try:
+                await asyncio.to_thread(self.write_batch, items)
+            except Exception as e:
+                self.stats["failed_batches"] += 1
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+            else:
+                self.stats["batches"] += 1
+                self.stats["items"] += n
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_result(None)
+            finally:
+                self.pending -= n
+
+class KeyResolver:
+    '''
+    In-memory slug/tag -> id maps for validating submissions without a DB round-trip.
+    Reloaded on a miss, at most once every `min_reload_s`.
+    '''
+    def __init__(self, pool: ConnectionPool, min_reload_s: float = 30.0):
+        self.pool = pool
+        self.min_reload_s = min_reload_s
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self.maps: Dict[str, dict] = {}
+
+    def reload(self) -> None:
+        with self._lock:
+            with self.pool.connection() as conn:
+                self.maps = {
+                    "variant": load_key_ids(conn, "model_variant", "tag"),
+                    "workflow": load_key_ids(conn, "workflow", "slug"),
+                    "toolchain": load_key_ids(conn, "toolchain", "slug"),
+                    "constraint_profile": load_key_ids(conn, "constraint_profile", "slug"),
+                    "template": load_key_ids(conn, "task_template", "id"),
+                }
+            self._loaded_at = time.monotonic()
+
+    async def lookup(self, kind: str, key: str) -> Optional[str]:
+        found = self.maps.get(kind, {}).get(key)
+        if found is None and time.monotonic() - self._loaded_at >= self.min_reload_s:
+            await asyncio.to_thread(self.reload)
+            found = self.maps.get(kind, {}).get(key)
+        return found
+
+class UnknownReference(ValueError):
+    pass
+
+class IngestServer:
+    def __init__(
+        self,
+        db_url: str,
+        *,
+        pool_size: int = 4,
+        batch_size: int = 500,
+        max_wait_ms: float = 50.0,
+        max_pending: int = 20_000,
+        recent_votes: int = 100_000,
+    ):
+        if not db_url:
+            raise RuntimeError("DATABASE_URL is not set")
+        # Pooled, concurrent writers (COPY, row locks); the embedded backend is for batch crawls.
+        require_postgres(db_url, "The ingest service")
+        self.pool = ConnectionPool(db_url, min_size=1, max_size=pool_size,
+                                   kwargs={"row_factory": dict_row}, open=False)
+        self.resolver = KeyResolver(self.pool)
+        batch_opts = dict(batch_size=batch_size, max_wait_s=max_wait_ms / 1000.0, max_pending=max_pending)
+        # Runs lock aggregate rows in key order, so they can be written by several workers;
+        # votes use one worker so the recent-vote cache sees batches in order.
+        self.runs = MicroBatcher(self._write_runs, workers=max(1, pool_size - 1), **batch_opts)
+        self.votes = MicroBatcher(self._write_votes, workers=1, **batch_opts)
+        self._recent_votes: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+        self._recent_votes_max = recent_votes
+        self._server: Optional[asyncio.base_events.Server] = None
+
+    # -- writers (worker threads) ---------------------------------------------
+
+    def _ensure_partitions(self) -> None:
+        with self.pool.connection() as conn:
+            ensure_time_partitions(conn)
+
+    def _write_runs(self, runs: List[dict]) -> None:
+        with self.pool.connection() as conn:
+            record_workflow_runs(conn, runs)
+
+    def _write_votes(self, votes: List[Tuple[str, str, int]]) -> None:
+        # Last vote per (template, voter) wins; drop ones identical to what we last wrote.
+        latest: Dict[Tuple[str, str], int] = {}
+        for template_id, fingerprint, vote in votes:
+            latest[(template_id, fingerprint)] = vote
+        fresh = [(k[0], k[1], v) for k, v in latest.items() if self._recent_votes.get(k) != v]
+        if not fresh:
+            return
+        with self.pool.connection() as conn:
+            upsert_template_votes(conn, fresh)
+        for template_id, fingerprint, vote in fresh:
+            self._recent_votes[(template_id, fingerprint)] = vote
+            self._recent_votes.move_to_end((template_id, fingerprint))
+        while len(self._recent_votes) > self._recent_votes_max:
+            self._recent_votes.popitem(last=False)
+
+    # -- request handling -----------------------------------------------------
+
+    async def _resolve_run(self, sub: RunSubmission) -> dict:
+        async def need(kind: str, key: Optional[str]) -> Optional[str]:
+            if key is None:
+                return None
+            found = await self.resolver.lookup(kind, key)
+            if found is None:
+                raise UnknownReference(f"unknown {kind}: {key!r}")
+            return found
+
+        return {
+            "variant_id": await need("variant", sub.variant),
+            "workflow_id": await need("workflow", sub.workflow),
+            "toolchain_id": await need("toolchain", sub.toolchain),
+            "constraint_profile_id": await need("constraint_profile", sub.constraint_profile),
+            "context_tokens": sub.context_tokens,
+            "kv_cache_type": sub.kv_cache_type,
+            "tokens_per_second": sub.tokens_per_second,
+            "ttft_ms": sub.ttft_ms,
+            "quality_score": sub.quality_score,
+            "success": sub.success,
+            "notes": sub.notes,
+        }
+
+    async def _resolve_vote(self, sub: VoteSubmission) -> Tuple[str, str, int]:
+        template_id = str(sub.template_id)
+        if await self.resolver.lookup("template", template_id) is None:
+            raise UnknownReference(f"unknown template: {template_id!r}")
+        return (template_id, sub.voter_fingerprint, sub.vote)
+
+    async def _ingest(self, body: bytes, model: type[BaseModel], resolve, batcher: MicroBatcher) -> Tuple[int, dict]:
+        try:
+            data = json.loads(body or b"null")
+        except ValueError:
+            return 400, {"error": "invalid JSON"}
+        items = data if isinstance(data, list) else [data]
+        if not items or len(items) > MAX_ITEMS_PER_REQUEST:
+            return 400, {"error": f"expected 1..{MAX_ITEMS_PER_REQUEST} submissions"}
+        try:
+            rows = [await resolve(model.model_validate(item)) for item in items]
+        except ValidationError as e:
+            return 422, {"error": "validation failed", "details": json.loads(e.json(include_url=False))}
+        except UnknownReference as e:
+            return 422, {"error": str(e)}
+        try:
+            await batcher.submit(rows)
+        except WriteTimeout as e:
+            return 202, {"accepted": len(rows), "committed": False,
+                         "warning": f"write {e}; it may still be applied, do not resubmit"}
+        return 201, {"accepted": len(rows)}
+
+    async def _route(self, method: str, path: str, body: bytes) -> Tuple[int, dict]:
+        path = path.split("?", 1)[0]
+        if path == "/healthz":
+            return 200, {"ok": True, "runs": self.runs.stats, "votes": self.votes.stats,
+                         "pending": {"runs": self.runs.pending, "votes": self.votes.pending}}
+        routes = {
+            "/runs": (RunSubmission, self._resolve_run, self.runs),
+            "/votes": (VoteSubmission, self._resolve_vote, self.votes),
+        }
+        if path not in routes:
+            return 404, {"error": "not found"}
+        if method != "POST":
+            return 405, {"error": "method not allowed"}
+        return await self._ingest(body, *routes[path])
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        # Minimal HTTP/1.1: JSON bodies with Content-Length, keep-alive by default.
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    k, _, v = line.decode("latin-1").partition(":")
+                    headers[k.strip().lower()] = v.strip()
+
+                extra: Dict[str, str] = {}
+                length = int(headers.get("content-length") or 0)
+                if length > MAX_BODY_BYTES:
+                    status, payload = 413, {"error": "body too large"}
+                    headers["connection"] = "close"
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    try:
+                        status, payload = await self._route(method.upper(), path, body)
+                    except Overloaded:
+                        status, payload = 503, {"error": "overloaded, retry later"}
+                        extra["Retry-After"] = str(RETRY_AFTER_S)
+                    except Exception as e:
+                        status, payload = 500, {"error": f"write failed: {type(e).__name__}"}
+
+                keep_alive = headers.get("connection", "").lower() != "close"
+                out = json.dumps(payload).encode("utf-8")
+                head = [
+                    f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+                    "Content-Type: application/json",
+                    f"Content-Length: {len(out)}",
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}",
+                    *(f"{k}: {v}" for k, v in extra.items()),
+                ]
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + out)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    # -- lifecycle ------------------------------------------------------------
+
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> None:
+        await asyncio.to_thread(self.pool.open, True)
+        await asyncio.to_thread(self._ensure_partitions)
+        await asyncio.to_thread(self.resolver.reload)
+        self.runs.start()
+        self.votes.start()
+        self._server = await asyncio.start_server(self._handle, host, port, backlog=1024)
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        await self.runs.stop()
+        await self.votes.stop()
+        await asyncio.to_thread(self.pool.close)
+
+    async def serve_forever(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> None:
+        await self.start(host, port)
+        print(f"Ingest service listening on http://{host}:{port} (POST /runs, POST /votes, GET /healthz)")
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+def main():
+    ap = argparse.ArgumentParser(description="Batched ingest service for community workflow runs and template votes")
+    ap.add_argument("--db-url", default=None, help="Postgres URL (or use DATABASE_URL env var)")
+    ap.add_argument("--host", default=DEFAULT_HOST)
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT)
+    ap.add_argument("--pool-size", type=int, default=4, help="Postgres connection pool size")
+    ap.add_argument("--batch-size", type=int, default=500, help="Max submissions per DB write")
+    ap.add_argument("--max-wait-ms", type=float, default=50.0, help="Max time to wait for a batch to fill")
+    ap.add_argument("--max-pending", type=int, default=20_000, help="Queued submissions before answering 503")
+    args = ap.parse_args()
+
+    server = IngestServer(
+        get_db_url(args.db_url),
+        pool_size=args.pool_size,
+        batch_size=args.batch_size,
+        max_wait_ms=args.max_wait_ms,
+        max_pending=args.max_pending,
+    )
+    try:
+        asyncio.run(server.serve_forever(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+from __future__ import annotations
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
+from uuid import UUID
+
+class RunSubmission(BaseModel):
+    variant: str = Field(min_length=1, max_length=256)  # Ollama tag, e.g. "qwen2.5-coder:7b"
+    workflow: str = Field(min_length=1, max_length=128)  # workflow slug
+    toolchain: Optional[str] = Field(default=None, max_length=128)  # toolchain slug
+    constraint_profile: Optional[str] = Field(default=None, max_length=128)
+    context_tokens: Optional[int] = Field(default=None, gt=0)
+    kv_cache_type: Optional[Literal["fp16", "q8", "q4"]] = None
+    tokens_per_second: Optional[float] = Field(default=None, ge=0, allow_inf_nan=False)
+    ttft_ms: Optional[int] = Field(default=None, ge=0)
+    quality_score: Optional[int] = Field(default=None, ge=1, le=10)
+    success: Optional[bool] = None
+    notes: Optional[str] = Field(default=None, max_length=4000)
+
+class VoteSubmission(BaseModel):
+    template_id: UUID
+    voter_fingerprint: str = Field(min_length=8, max_length=128)
+    vote: Literal[1, -1]
@@ -0,0 +1,42 @@
+BEGIN;
+
+-- ---------------------------------------------------------------------------
+-- Crawl-time tag inference
+--
+-- Family tag_rule patterns are now evaluated by the crawler (crawler/tagging.py)
+-- with one compiled regex, and the results are stored in model_family_tag with
+-- source = 'inferred_rule'. The crawler re-tags every family only when the
+-- rule set digest below changes; new families are tagged as they are inserted.
+-- ---------------------------------------------------------------------------
+
+CREATE TABLE IF NOT EXISTS tag_inference_state (
+  id int PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+  rules_digest text NOT NULL,
+  applied_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_model_family_tag_source ON model_family_tag(source);
+
+-- One-time backfill so exports stay correct before the first crawl re-tags.
+-- rules_digest is left unset, so the next crawl re-tags everything with its own matcher.
+INSERT INTO model_family_tag (family_id, tag_id, source, confidence, verification)
+SELECT DISTINCT ON (v.family_id, v.tag_id)
+  v.family_id, v.tag_id, v.source, v.confidence, v.verification
+FROM v_family_tags_inferred v
+WHERE NOT EXISTS (SELECT 1 FROM tag_inference_state)
+ORDER BY v.family_id, v.tag_id, v.confidence DESC
+ON CONFLICT (family_id, tag_id) DO NOTHING;
+
+-- Inferred tags are materialized now; no more families x rules regex join at export.
+CREATE OR REPLACE VIEW v_family_tags_effective AS
+SELECT
+  mft.family_id,
+  mft.tag_id,
+  t.slug AS tag_slug,
+  mft.confidence,
+  mft.source,
+  mft.verification
+FROM model_family_tag mft
+JOIN tag t ON t.id = mft.tag_id;
+
+COMMIT;
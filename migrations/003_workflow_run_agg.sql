@@ -0,0 +1,57 @@
+BEGIN;
+
+-- ---------------------------------------------------------------------------
+-- Maintained workflow-run aggregates
+--
+-- One row per (variant, workflow, toolchain), updated by crawler/run_agg.py in
+-- the same transaction that inserts the runs. TPS/TTFT quantiles come from
+-- mergeable DDSketches (crawler/sketch.py) stored as bytea, so new runs are
+-- folded in without re-sorting the whole workflow_run table. p50/p95 are
+-- materialized on write for the exporter.
+--
+-- v_workflow_run_agg (001) is kept as the exact, full-scan reference.
+-- Rebuild after writing workflow_run by hand: python -m crawler.run_agg
+-- ---------------------------------------------------------------------------
+
+CREATE TABLE IF NOT EXISTS workflow_run_agg (
+  variant_id uuid NOT NULL REFERENCES model_variant(id) ON DELETE CASCADE,
+  workflow_id uuid NOT NULL REFERENCES workflow(id) ON DELETE CASCADE,
+  toolchain_id uuid REFERENCES toolchain(id) ON DELETE CASCADE,
+  run_count bigint NOT NULL DEFAULT 0,
+  run_count_trusted bigint NOT NULL DEFAULT 0,
+  quality_sum numeric NOT NULL DEFAULT 0,
+  quality_count bigint NOT NULL DEFAULT 0,
+  success_count bigint NOT NULL DEFAULT 0,
+  tps_sketch bytea,
+  ttft_sketch bytea,
+  p50_tps float8,
+  p95_tps float8,
+  p50_ttft_ms float8,
+  p95_ttft_ms float8,
+  last_run_at timestamptz,
+  updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_workflow_run_agg_key
+  ON workflow_run_agg (variant_id, workflow_id, (COALESCE(toolchain_id, '00000000-0000-0000-0000-000000000000'::uuid)));
+CREATE INDEX IF NOT EXISTS idx_workflow_run_agg_workflow_toolchain
+  ON workflow_run_agg (workflow_id, toolchain_id);
+
+CREATE OR REPLACE VIEW v_workflow_run_agg_maintained AS
+SELECT
+  variant_id,
+  workflow_id,
+  toolchain_id,
+  run_count,
+  run_count_trusted,
+  p50_tps,
+  p95_tps,
+  p50_ttft_ms,
+  p95_ttft_ms,
+  (quality_sum / NULLIF(quality_count, 0))::numeric AS avg_quality,
+  (success_count::numeric / NULLIF(run_count, 0))::numeric AS avg_success,
+  last_run_at
+FROM workflow_run_agg
+WHERE run_count > 0;
+
+COMMIT;
@@ -0,0 +1,101 @@
+BEGIN;
+
+-- ---------------------------------------------------------------------------
+-- Template vote counters + materialized best template
+--
+-- template_vote_tally keeps vote_sum/vote_count per template, maintained by a
+-- trigger on template_vote, so scoring no longer groups every vote row.
+-- mv_best_task_template materializes the best template per
+-- (workflow, toolchain, variant, family); the exporter refreshes it
+-- (CONCURRENTLY) before reading, which only scans task_template + tally.
+-- ---------------------------------------------------------------------------
+
+CREATE TABLE IF NOT EXISTS template_vote_tally (
+  template_id uuid PRIMARY KEY REFERENCES task_template(id) ON DELETE CASCADE,
+  vote_sum bigint NOT NULL DEFAULT 0,
+  vote_count bigint NOT NULL DEFAULT 0,
+  updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE OR REPLACE FUNCTION apply_template_vote_tally() RETURNS trigger AS $$
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    UPDATE template_vote_tally
+    SET vote_sum = vote_sum - OLD.vote,
+        vote_count = vote_count - 1,
+        updated_at = now()
+    WHERE template_id = OLD.template_id;
+  END IF;
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    INSERT INTO template_vote_tally (template_id, vote_sum, vote_count)
+    VALUES (NEW.template_id, NEW.vote, 1)
+    ON CONFLICT (template_id) DO UPDATE SET
+      vote_sum = template_vote_tally.vote_sum + EXCLUDED.vote_sum,
+      vote_count = template_vote_tally.vote_count + 1,
+      updated_at = now();
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Block vote writes while (re)computing counters so backfill + trigger stay consistent.
+LOCK TABLE template_vote IN SHARE ROW EXCLUSIVE MODE;
+
+INSERT INTO template_vote_tally (template_id, vote_sum, vote_count)
+SELECT template_id, SUM(vote)::bigint, COUNT(*)::bigint
+FROM template_vote
+GROUP BY template_id
+ON CONFLICT (template_id) DO UPDATE SET
+  vote_sum = EXCLUDED.vote_sum,
+  vote_count = EXCLUDED.vote_count,
+  updated_at = now();
+
+DROP TRIGGER IF EXISTS trg_template_vote_tally ON template_vote;
+CREATE TRIGGER trg_template_vote_tally
+AFTER INSERT OR UPDATE OF template_id, vote OR DELETE ON template_vote
+FOR EACH ROW EXECUTE FUNCTION apply_template_vote_tally();
+
+-- Same columns as before; now reads the counters instead of grouping votes.
+CREATE OR REPLACE VIEW v_task_template_score AS
+SELECT
+  tt.*,
+  COALESCE(tvt.vote_sum, 0)::bigint AS vote_sum,
+  COALESCE(tvt.vote_count, 0)::bigint AS vote_count
+FROM task_template tt
+LEFT JOIN template_vote_tally tvt ON tvt.template_id = tt.id;
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_best_task_template AS
+SELECT DISTINCT ON (tt.workflow_id, COALESCE(tt.toolchain_id, '00000000-0000-0000-0000-000000000000'::uuid), COALESCE(tt.variant_id, '00000000-0000-0000-0000-000000000000'::uuid), COALESCE(tt.family_id, '00000000-0000-0000-0000-000000000000'::uuid))
+  tt.id,
+  tt.variant_id,
+  tt.family_id,
+  tt.workflow_id,
+  tt.toolchain_id,
+  tt.task_name,
+  tt.system_prompt,
+  tt.temperature,
+  tt.top_k,
+  tt.top_p,
+  tt.context_usage_pct,
+  tt.notes,
+  tt.verification,
+  tt.submitted_at,
+  COALESCE(tvt.vote_sum, 0)::bigint AS vote_sum,
+  COALESCE(tvt.vote_count, 0)::bigint AS vote_count
+FROM task_template tt
+LEFT JOIN template_vote_tally tvt ON tvt.template_id = tt.id
+ORDER BY
+  tt.workflow_id,
+  COALESCE(tt.toolchain_id, '00000000-0000-0000-0000-000000000000'::uuid),
+  COALESCE(tt.variant_id, '00000000-0000-0000-0000-000000000000'::uuid),
+  COALESCE(tt.family_id, '00000000-0000-0000-0000-000000000000'::uuid),
+  vote_sum DESC,
+  tt.submitted_at DESC
+WITH DATA;
+
+-- Required for REFRESH ... CONCURRENTLY (plain-column unique index).
+CREATE UNIQUE INDEX IF NOT EXISTS uq_mv_best_task_template_id ON mv_best_task_template(id);
+CREATE INDEX IF NOT EXISTS idx_mv_best_task_template_lookup
+  ON mv_best_task_template(workflow_id, toolchain_id, variant_id, family_id);
+
+COMMIT;
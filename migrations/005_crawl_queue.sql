@@ -0,0 +1,32 @@
+BEGIN;
+
+-- ---------------------------------------------------------------------------
+-- Resumable / distributed crawls
+--
+-- Each crawl_run gets a work queue with one row per family slug. A family's
+-- rows and its status = 'done' checkpoint are committed in one transaction,
+-- so `python -m crawler.main --resume [RUN_ID]` skips everything already
+-- committed. Extra processes/hosts join with `--worker [RUN_ID]` and claim
+-- slug ranges with SELECT ... FOR UPDATE SKIP LOCKED.
+-- ---------------------------------------------------------------------------
+
+ALTER TABLE crawl_run ADD COLUMN IF NOT EXISTS options_json jsonb NOT NULL DEFAULT '{}'::jsonb;
+
+CREATE INDEX IF NOT EXISTS idx_crawl_run_status_started ON crawl_run(status, started_at DESC);
+
+CREATE TABLE IF NOT EXISTS crawl_queue (
+  run_id uuid NOT NULL REFERENCES crawl_run(id) ON DELETE CASCADE,
+  slug text NOT NULL,
+  position int NOT NULL,
+  status text NOT NULL DEFAULT 'pending', -- pending | claimed | done | failed
+  claimed_by text,
+  claimed_at timestamptz,
+  finished_at timestamptz,
+  stats_json jsonb NOT NULL DEFAULT '{}'::jsonb,
+  error text,
+  PRIMARY KEY (run_id, slug)
+);
+
+CREATE INDEX IF NOT EXISTS idx_crawl_queue_claim ON crawl_queue(run_id, status, position);
+
+COMMIT;
@@ -0,0 +1,211 @@
+BEGIN;
+
+-- ---------------------------------------------------------------------------
+-- Time-partitioned growth tables
+--
+-- derived_estimate (every crawl appends a full set of estimates) and
+-- workflow_run (community submissions) are range-partitioned by month on
+-- created_at / submitted_at, named <table>_pYYYYMM, plus a <table>_default
+-- catch-all. Covering indexes match the read paths:
+--   * v_variant_vram_components (exporter): variant, profile, offload,
+--     kv type, context, estimate type -> value, read index-only in variant order
+--   * v_workflow_run_agg / rebuilds: (variant, workflow, toolchain) -> metrics
+-- Both lead with variant_id, which also serves ON DELETE CASCADE from
+-- model_variant.
+--
+-- Partitions are created ahead of time by ensure_time_partitions() (the
+-- crawler and the ingest service call it on start). Retention is a metadata
+-- operation: drop_time_partitions(table, older_than) drops whole months.
+--   python -m crawler.partitions ensure
+--   python -m crawler.partitions drop --keep-months 12
+-- ---------------------------------------------------------------------------
+
+-- Create monthly partitions of `parent` covering [from_ts, to_ts]. A month is
+-- built as a plain table, rows that landed in the default partition for that
+-- month are moved into it, then it is attached (SHARE UPDATE EXCLUSIVE on the
+-- parent, so writers keep going). Returns the number of partitions created.
+-- Crawlers and ingest instances call this concurrently: a transaction-scoped
+-- advisory lock per parent serializes the check-then-create.
+CREATE OR REPLACE FUNCTION create_month_partitions(parent text, key_column text, from_ts timestamptz, to_ts timestamptz)
+RETURNS int AS $$
+DECLARE
+  m timestamptz := date_trunc('month', from_ts AT TIME ZONE 'UTC') AT TIME ZONE 'UTC';
+  part text;
+  created int := 0;
+BEGIN
+  PERFORM pg_advisory_xact_lock(hashtext('time_partitions'), hashtext(parent));
+  WHILE m <= to_ts LOOP
+    part := format('%s_p%s', parent, to_char(m AT TIME ZONE 'UTC', 'YYYYMM'));
+    IF to_regclass(part) IS NULL THEN
+      EXECUTE format('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', part, parent);
+      IF to_regclass(parent || '_default') IS NOT NULL THEN
+        EXECUTE format(
+          'WITH moved AS (DELETE FROM %I WHERE %I >= %L AND %I < %L RETURNING *) INSERT INTO %I SELECT * FROM moved',
+          parent || '_default', key_column, m, key_column, m + interval '1 month', part
+        );
+      END IF;
+      EXECUTE format('ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                     parent, part, m, m + interval '1 month');
+      created := created + 1;
+    END IF;
+    m := m + interval '1 month';
+  END LOOP;
+  RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Current month + `months_ahead` for every partitioned growth table.
+CREATE OR REPLACE FUNCTION ensure_time_partitions(months_ahead int DEFAULT 3)
+RETURNS int AS $$
+DECLARE
+  created int := 0;
+BEGIN
+  created := created + create_month_partitions('derived_estimate', 'created_at', now(), now() + make_interval(months => months_ahead));
+  created := created + create_month_partitions('workflow_run', 'submitted_at', now(), now() + make_interval(months => months_ahead));
+  RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Drop every monthly partition of `parent` that ends at or before `older_than`.
+CREATE OR REPLACE FUNCTION drop_time_partitions(parent text, older_than timestamptz)
+RETURNS SETOF text AS $$
+DECLARE
+  part text;
+BEGIN
+  PERFORM pg_advisory_xact_lock(hashtext('time_partitions'), hashtext(parent));
+  FOR part IN
+    SELECT c.relname
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = parent::regclass
+      AND c.relname ~ ('^' || parent || '_p[0-9]{6}$')
+    ORDER BY c.relname
+  LOOP
+    IF (to_date(right(part, 6), 'YYYYMM') + interval '1 month') AT TIME ZONE 'UTC' <= older_than THEN
+      EXECUTE format('DROP TABLE %I', part);
+      RETURN NEXT part;
+    END IF;
+  END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- One-time swap of the unpartitioned tables (skipped once they are partitioned).
+DO $$
+DECLARE
+  oldest timestamptz;
+BEGIN
+  IF (SELECT relkind FROM pg_class WHERE oid = 'derived_estimate'::regclass) <> 'p' THEN
+    LOCK TABLE derived_estimate IN ACCESS EXCLUSIVE MODE;
+    ALTER TABLE derived_estimate RENAME TO derived_estimate_unpartitioned;
+    ALTER TABLE derived_estimate_unpartitioned RENAME CONSTRAINT derived_estimate_pkey TO derived_estimate_unpartitioned_pkey;
+
+    CREATE TABLE derived_estimate (
+      id uuid NOT NULL DEFAULT gen_random_uuid(),
+      variant_id uuid NOT NULL REFERENCES model_variant(id) ON DELETE CASCADE,
+      estimate_profile_id uuid NOT NULL REFERENCES estimate_profile(id) ON DELETE RESTRICT,
+      estimate_type text NOT NULL,
+      value numeric NOT NULL,
+      units text NOT NULL,
+      context_tokens int,
+      kv_cache_type text,
+      offload_fraction numeric,
+      confidence text,
+      verification verification_status NOT NULL DEFAULT 'estimated',
+      created_at timestamptz NOT NULL DEFAULT now(),
+      PRIMARY KEY (id, created_at)
+    ) PARTITION BY RANGE (created_at);
+    CREATE TABLE derived_estimate_default PARTITION OF derived_estimate DEFAULT;
+
+    SELECT COALESCE(MIN(created_at), now()) INTO oldest FROM derived_estimate_unpartitioned;
+    PERFORM create_month_partitions('derived_estimate', 'created_at', oldest, now() + interval '3 months');
+    INSERT INTO derived_estimate SELECT * FROM derived_estimate_unpartitioned;
+  END IF;
+
+  IF (SELECT relkind FROM pg_class WHERE oid = 'workflow_run'::regclass) <> 'p' THEN
+    LOCK TABLE workflow_run IN ACCESS EXCLUSIVE MODE;
+    ALTER TABLE workflow_run RENAME TO workflow_run_unpartitioned;
+    ALTER TABLE workflow_run_unpartitioned RENAME CONSTRAINT workflow_run_pkey TO workflow_run_unpartitioned_pkey;
+
+    CREATE TABLE workflow_run (
+      id uuid NOT NULL DEFAULT gen_random_uuid(),
+      variant_id uuid NOT NULL REFERENCES model_variant(id) ON DELETE CASCADE,
+      workflow_id uuid NOT NULL REFERENCES workflow(id) ON DELETE CASCADE,
+      toolchain_id uuid REFERENCES toolchain(id) ON DELETE SET NULL,
+      constraint_profile_id uuid REFERENCES constraint_profile(id) ON DELETE SET NULL,
+      context_tokens int,
+      kv_cache_type text,
+      tokens_per_second numeric,
+      ttft_ms int,
+      quality_score int,     -- 1-10
+      success boolean,
+      notes text,
+      verification verification_status NOT NULL DEFAULT 'community_verified',
+      submitted_at timestamptz NOT NULL DEFAULT now(),
+      PRIMARY KEY (id, submitted_at)
+    ) PARTITION BY RANGE (submitted_at);
+    CREATE TABLE workflow_run_default PARTITION OF workflow_run DEFAULT;
+
+    SELECT COALESCE(MIN(submitted_at), now()) INTO oldest FROM workflow_run_unpartitioned;
+    PERFORM create_month_partitions('workflow_run', 'submitted_at', oldest, now() + interval '3 months');
+    INSERT INTO workflow_run SELECT * FROM workflow_run_unpartitioned;
+  END IF;
+END$$;
+
+CREATE INDEX IF NOT EXISTS idx_derived_estimate_components
+  ON derived_estimate (variant_id, estimate_profile_id, offload_fraction, kv_cache_type, context_tokens, estimate_type)
+  INCLUDE (value);
+
+CREATE INDEX IF NOT EXISTS idx_workflow_run_agg_key
+  ON workflow_run (variant_id, workflow_id, toolchain_id)
+  INCLUDE (tokens_per_second, ttft_ms, quality_score, success, verification, submitted_at);
+
+-- Rebind the views to the partitioned tables (a rename carries views along), then drop the old copies.
+CREATE OR REPLACE VIEW v_workflow_run_agg AS
+SELECT
+  variant_id,
+  workflow_id,
+  toolchain_id,
+  COUNT(*)::bigint AS run_count,
+  COUNT(*) FILTER (WHERE verification IN ('community_verified','admin_verified'))::bigint AS run_count_trusted,
+  percentile_cont(0.5) WITHIN GROUP (ORDER BY tokens_per_second) AS p50_tps,
+  percentile_cont(0.5) WITHIN GROUP (ORDER BY ttft_ms) AS p50_ttft_ms,
+  AVG(quality_score)::numeric AS avg_quality,
+  AVG(CASE WHEN success THEN 1 ELSE 0 END)::numeric AS avg_success,
+  MAX(submitted_at) AS last_run_at
+FROM workflow_run
+GROUP BY variant_id, workflow_id, toolchain_id;
+
+CREATE OR REPLACE VIEW v_variant_vram_components AS
+SELECT
+  mf.slug AS family_slug,
+  mv.tag AS tag,
+  mv.id AS variant_id,
+  de.kv_cache_type,
+  de.context_tokens,
+  MAX(de.value) FILTER (WHERE de.estimate_type = 'vram_weights_gib')::float8 AS weights_vram_gib,
+  MAX(de.value) FILTER (WHERE de.estimate_type = 'vram_runtime_overhead_gib')::float8 AS runtime_overhead_gib,
+  MAX(de.value) FILTER (WHERE de.estimate_type = 'kv_bytes_per_token_opt')::float8 AS kv_bytes_per_token_opt,
+  MAX(de.value) FILTER (WHERE de.estimate_type = 'kv_bytes_per_token_cons')::float8 AS kv_bytes_per_token_cons
+FROM derived_estimate de
+JOIN model_variant mv ON mv.id = de.variant_id
+JOIN model_family mf ON mf.id = mv.family_id
+JOIN estimate_profile ep ON ep.id = de.estimate_profile_id
+WHERE ep.name = 'vram_estimator'
+  AND ep.version = '1.0.0'
+  AND de.offload_fraction = 1.0
+GROUP BY mf.slug, mv.tag, mv.id, de.kv_cache_type, de.context_tokens;
+
+DROP TABLE IF EXISTS derived_estimate_unpartitioned;
+DROP TABLE IF EXISTS workflow_run_unpartitioned;
+
+-- 001's single-column indexes are covered by idx_derived_estimate_components
+-- (variant_id leads; nothing filters on estimate_type alone). Re-running 001
+-- recreates them on the partitioned table, so they are dropped here each time.
+DROP INDEX IF EXISTS idx_derived_estimate_variant_id;
+DROP INDEX IF EXISTS idx_derived_estimate_type;
+
+COMMIT;
+
+-- Partitions only get vacuumed/analyzed individually; refresh parent stats for the planner.
+ANALYZE derived_estimate;
+ANALYZE workflow_run;
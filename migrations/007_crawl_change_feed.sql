@@ -0,0 +1,104 @@
+BEGIN;
+
+-- ---------------------------------------------------------------------------
+-- Crawl-to-crawl change feed
+--
+-- Every crawled family stores what it looked like in that run
+-- (crawl_variant_snapshot: tag, digest, size, max_context). At the family's
+-- checkpoint the snapshot is diffed against the family's previous snapshot
+-- with a FULL JOIN; the differences go to crawl_change:
+--   entity 'variant': added | removed | changed (digest/size/max_context)
+--   entity 'family':  added (not in the previous successful run, or never
+--                     crawled), changed (any variant change), removed
+--                     (in the previous successful run's listing, gone now;
+--                     recorded when the run finalizes)
+-- The crawler only re-estimates added/changed variants (and ones without
+-- estimates for the run's options), tags added families, and the exporter
+-- re-reads estimates only for what changed since its last export.
+--
+-- Snapshots of the latest 3 runs are kept (pruned when a run finalizes).
+--   python -m crawler.changes --since 2026-10-01   (or a crawl_run id)
+-- ---------------------------------------------------------------------------
+
+CREATE TABLE IF NOT EXISTS crawl_variant_snapshot (
+  run_id uuid NOT NULL REFERENCES crawl_run(id) ON DELETE CASCADE,
+  family_slug text NOT NULL,
+  tag text NOT NULL,
+  variant_id uuid,
+  digest text,
+  size_bytes bigint,
+  max_context int,
+  PRIMARY KEY (run_id, family_slug, tag)
+);
+
+CREATE INDEX IF NOT EXISTS idx_crawl_variant_snapshot_family ON crawl_variant_snapshot(family_slug, run_id);
+
+CREATE TABLE IF NOT EXISTS crawl_change (
+  id bigserial PRIMARY KEY,
+  run_id uuid NOT NULL REFERENCES crawl_run(id) ON DELETE CASCADE,
+  entity text NOT NULL,  -- family | variant
+  change text NOT NULL,  -- added | removed | changed
+  family_slug text NOT NULL,
+  tag text,
+  variant_id uuid,
+  old_digest text,
+  new_digest text,
+  old_size_bytes bigint,
+  new_size_bytes bigint,
+  old_max_context int,
+  new_max_context int,
+  recorded_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_crawl_change_run ON crawl_change(run_id, family_slug);
+CREATE INDEX IF NOT EXISTS idx_crawl_change_recorded_at ON crawl_change(recorded_at);
+
+-- Per-family history lookups ("latest run in which this family was crawled").
+CREATE INDEX IF NOT EXISTS idx_crawl_queue_slug ON crawl_queue(slug, status);
+
+CREATE OR REPLACE VIEW v_crawl_change AS
+SELECT
+  c.id,
+  c.run_id,
+  r.started_at AS run_started_at,
+  r.status AS run_status,
+  c.entity,
+  c.change,
+  c.family_slug,
+  c.tag,
+  c.variant_id,
+  c.old_digest,
+  c.new_digest,
+  c.old_size_bytes,
+  c.new_size_bytes,
+  c.old_max_context,
+  c.new_max_context,
+  c.recorded_at
+FROM crawl_change c
+JOIN crawl_run r ON r.id = c.run_id;
+
+-- One-time baseline (only while no snapshot exists): every family's current
+-- model_variant rows that were seen by the family's latest crawl -- its last
+-- 'done' queue row, or, for families last crawled before 005 (no queue), the
+-- latest successful run. The first run after this migration then reports real
+-- changes instead of the whole catalog.
+INSERT INTO crawl_variant_snapshot (run_id, family_slug, tag, variant_id, digest, size_bytes, max_context)
+SELECT b.run_id, b.slug, mv.tag, mv.id, mv.digest, mv.size_bytes, mv.max_context
+FROM (
+  SELECT mf.id AS family_id, mf.slug, COALESCE(
+    (SELECT q.run_id
+     FROM crawl_queue q
+     JOIN crawl_run r ON r.id = q.run_id
+     WHERE q.slug = mf.slug AND q.status = 'done'
+     ORDER BY r.started_at DESC
+     LIMIT 1),
+    (SELECT id FROM crawl_run WHERE status = 'success' ORDER BY started_at DESC LIMIT 1)
+  ) AS run_id
+  FROM model_family mf
+) b
+JOIN crawl_run r ON r.id = b.run_id
+JOIN model_variant mv ON mv.family_id = b.family_id AND mv.last_seen_at >= r.started_at
+WHERE NOT EXISTS (SELECT 1 FROM crawl_variant_snapshot)
+ON CONFLICT DO NOTHING;
+
+COMMIT;
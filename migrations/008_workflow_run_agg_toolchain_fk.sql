@@ -0,0 +1,19 @@
+BEGIN;
+
+-- ---------------------------------------------------------------------------
+-- workflow_run_agg.toolchain_id follows workflow_run.toolchain_id
+--
+-- Deleting a toolchain keeps its runs (workflow_run: ON DELETE SET NULL), so
+-- their aggregates move to the no-toolchain bucket instead of disappearing.
+-- Where that (variant, workflow) already has a no-toolchain row the delete
+-- fails on uq_workflow_run_agg_key; delete through
+--   python -m crawler.run_agg --delete-toolchain SLUG
+-- which folds the toolchain's rows (sketches included) into that bucket first.
+-- ---------------------------------------------------------------------------
+
+ALTER TABLE workflow_run_agg DROP CONSTRAINT IF EXISTS workflow_run_agg_toolchain_id_fkey;
+ALTER TABLE workflow_run_agg
+  ADD CONSTRAINT workflow_run_agg_toolchain_id_fkey
+  FOREIGN KEY (toolchain_id) REFERENCES toolchain(id) ON DELETE SET NULL;
+
+COMMIT;
@@ -0,0 +1,724 @@
+-- ---------------------------------------------------------------------------
+-- Embedded (SQLite) schema: the tables, views and seeds of migrations/00*.sql
+-- for sqlite:/// DATABASE_URLs. Applied by crawler/embedded.py on connect
+-- (bump SCHEMA_VERSION there after editing); safe to re-run.
+--
+-- Type mapping: uuid -> TEXT (random uuid-formatted default), timestamptz ->
+-- TEXT (ISO-8601 UTC, sorts as text), jsonb / text[] -> JSON (JSON text,
+-- decoded on read), verification_status -> TEXT + CHECK, bytea -> BLOB.
+--
+-- Postgres-only pieces: mv_best_task_template (the exporter reads
+-- v_best_task_template instead) and the one-time backfills of 002/004,
+-- which have nothing to backfill in a new file.
+-- ---------------------------------------------------------------------------
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS crawl_run (
+  id TEXT PRIMARY KEY DEFAULT (lower(hex(randomblob(4)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(6)))),
+  started_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+  finished_at TEXT,
+  status TEXT NOT NULL DEFAULT 'running',
+  stats_json JSON NOT NULL DEFAULT '{}',
+  options_json JSON NOT NULL DEFAULT '{}'
+);
+
+CREATE INDEX IF NOT EXISTS idx_crawl_run_status_started ON crawl_run(status, started_at DESC);
+
+CREATE TABLE IF NOT EXISTS model_family (
+  id TEXT PRIMARY KEY DEFAULT (lower(hex(randomblob(4)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(6)))),
+  slug TEXT NOT NULL UNIQUE,
+  display_name TEXT,
+  description TEXT,
+  labels JSON NOT NULL DEFAULT '[]',
+  downloads INTEGER,
+  catalog_updated_text TEXT,
+  upstream_published_at TEXT,
+  catalog_first_seen_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+  last_seen_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+  verification TEXT NOT NULL DEFAULT 'catalog' CHECK (verification IN ('catalog','estimated','community_verified','admin_verified')),
+  created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+  updated_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS model_variant (
+  id TEXT PRIMARY KEY DEFAULT (lower(hex(randomblob(4)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(6)))),
+  family_id TEXT NOT NULL REFERENCES model_family(id) ON DELETE CASCADE,
+  tag TEXT NOT NULL,
+  tag_short TEXT,
+  digest TEXT,
+  size_bytes INTEGER NOT NULL,
+  max_context INTEGER,
+  input_type TEXT,
+  catalog_age_text TEXT,
+  upstream_published_at TEXT,
+  catalog_first_seen_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+  last_seen_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+  verification TEXT NOT NULL DEFAULT 'catalog' CHECK (verification IN ('catalog','estimated','community_verified','admin_verified')),
+  created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+  updated_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+  UNIQUE (family_id, tag)
+);
+
+CREATE INDEX IF NOT EXISTS idx_model_variant_tag ON model_variant(tag);
+CREATE INDEX IF NOT EXISTS idx_model_variant_size_bytes ON model_variant(size_bytes);
+CREATE INDEX IF NOT EXISTS idx_model_variant_max_context ON model_variant(max_context);
+
+CREATE TABLE IF NOT EXISTS estimate_profile (
+  id TEXT PRIMARY KEY DEFAULT (lower(hex(randomblob(4)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(6)))),
+  name TEXT NOT NULL,
+  version TEXT NOT NULL,
+  assumptions_json JSON NOT NULL,
+  created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+  UNIQUE (name, version)
+);
+
+CREATE TABLE IF NOT EXISTS derived_estimate (
+  id TEXT PRIMARY KEY DEFAULT (lower(hex(randomblob(4)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(6)))),
+  variant_id TEXT NOT NULL REFERENCES model_variant(id) ON DELETE CASCADE,
+  estimate_profile_id TEXT NOT NULL REFERENCES estimate_profile(id) ON DELETE RESTRICT,
+  estimate_type TEXT NOT NULL,
+  value REAL NOT NULL,
+  units TEXT NOT NULL,
+  context_tokens INTEGER,
+  kv_cache_type TEXT,
+  offload_fraction REAL,
+  confidence TEXT,
+  verification TEXT NOT NULL DEFAULT 'estimated' CHECK (verification IN ('catalog','estimated','community_verified','admin_verified')),
+  created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+-- Covering index for v_variant_vram_components (see 006_partition_growth_tables.sql); no partitioning here.
+DROP INDEX IF EXISTS idx_derived_estimate_variant_id;
+DROP INDEX IF EXISTS idx_derived_estimate_type;
+CREATE INDEX IF NOT EXISTS idx_derived_estimate_components
+  ON derived_estimate(variant_id, estimate_profile_id, offload_fraction, kv_cache_type, context_tokens, estimate_type, value);
+
+-- apply_upstream_first_seen(): SQLite triggers cannot assign NEW, so fix the row up afterwards.
+CREATE TRIGGER IF NOT EXISTS trg_family_upstream_first_seen_ins
+AFTER INSERT ON model_family
+FOR EACH ROW WHEN NEW.upstream_published_at IS NOT NULL AND NEW.catalog_first_seen_at > NEW.upstream_published_at
+BEGIN
+  UPDATE model_family SET catalog_first_seen_at = NEW.upstream_published_at WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_family_upstream_first_seen_upd
+AFTER UPDATE ON model_family
+FOR EACH ROW
+BEGIN
+  UPDATE model_family SET
+    catalog_first_seen_at = CASE
+      WHEN NEW.upstream_published_at IS NOT NULL AND NEW.catalog_first_seen_at > NEW.upstream_published_at
+      THEN NEW.upstream_published_at ELSE NEW.catalog_first_seen_at END,
+    updated_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')
+  WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_variant_upstream_first_seen_ins
+AFTER INSERT ON model_variant
+FOR EACH ROW WHEN NEW.upstream_published_at IS NOT NULL AND NEW.catalog_first_seen_at > NEW.upstream_published_at
+BEGIN
+  UPDATE model_variant SET catalog_first_seen_at = NEW.upstream_published_at WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_variant_upstream_first_seen_upd
+AFTER UPDATE ON model_variant
+FOR EACH ROW
+BEGIN
+  UPDATE model_variant SET
+    catalog_first_seen_at = CASE
+      WHEN NEW.upstream_published_at IS NOT NULL AND NEW.catalog_first_seen_at > NEW.upstream_published_at
+      THEN NEW.upstream_published_at ELSE NEW.catalog_first_seen_at END,
+    updated_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')
+  WHERE id = NEW.id;
+END;
+
+-- ---------------------------------------------------------------------------
+-- Workflow / Toolchain / Tags
+-- ---------------------------------------------------------------------------
+
+CREATE TABLE IF NOT EXISTS workflow (
+  id TEXT PRIMARY KEY DEFAULT (lower(hex(randomblob(4)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(6)))),
+  slug TEXT NOT NULL UNIQUE,
+  name TEXT NOT NULL,
+  description TEXT,
+  category TEXT NOT NULL DEFAULT 'other',
+  default_context_tokens INTEGER,
+  default_kv_cache_type TEXT,
+  verification TEXT NOT NULL DEFAULT 'admin_verified' CHECK (verification IN ('catalog','estimated','community_verified','admin_verified')),
+  created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+  updated_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS toolchain (
+  id TEXT PRIMARY KEY DEFAULT (lower(hex(randomblob(4)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(6)))),
+  slug TEXT NOT NULL UNIQUE,
+  display_name TEXT NOT NULL,
+  description TEXT,
+  kind TEXT NOT NULL DEFAULT 'other',
+  components JSON NOT NULL DEFAULT '{}',
+  verification TEXT NOT NULL DEFAULT 'admin_verified' CHECK (verification IN ('catalog','estimated','community_verified','admin_verified')),
+  created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+  updated_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS tag (
+  id TEXT PRIMARY KEY DEFAULT (lower(hex(randomblob(4)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(6)))),
+  slug TEXT NOT NULL UNIQUE,
+  name TEXT NOT NULL,
+  category TEXT NOT NULL DEFAULT 'other',
+  description TEXT,
+  created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS tag_rule (
+  id TEXT PRIMARY KEY DEFAULT (lower(hex(randomblob(4)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(6)))),
+  scope TEXT NOT NULL DEFAULT 'family',
+  pattern TEXT NOT NULL,
+  tag_id TEXT NOT NULL REFERENCES tag(id) ON DELETE CASCADE,
+  confidence REAL NOT NULL DEFAULT 0.60,
+  notes TEXT,
+  created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+  UNIQUE (scope, pattern, tag_id)
+);
+
+CREATE TABLE IF NOT EXISTS model_family_tag (
+  family_id TEXT NOT NULL REFERENCES model_family(id) ON DELETE CASCADE,
+  tag_id TEXT NOT NULL REFERENCES tag(id) ON DELETE CASCADE,
+  source TEXT NOT NULL DEFAULT 'manual',
+  confidence REAL NOT NULL DEFAULT 0.80,
+  verification TEXT NOT NULL DEFAULT 'estimated' CHECK (verification IN ('catalog','estimated','community_verified','admin_verified')),
+  created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+  PRIMARY KEY (family_id, tag_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_model_family_tag_source ON model_family_tag(source);
+
+CREATE TABLE IF NOT EXISTS tag_inference_state (
+  id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+  rules_digest TEXT NOT NULL,
+  applied_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+-- `mf.slug ~* tr.pattern`; regexp() is registered by crawler/embedded.py.
+DROP VIEW IF EXISTS v_family_tags_inferred;
+CREATE VIEW v_family_tags_inferred AS
+SELECT
+  mf.id AS family_id,
+  t.id AS tag_id,
+  t.slug AS tag_slug,
+  tr.confidence AS confidence,
+  'inferred_rule' AS source,
+  'estimated' AS verification
+FROM model_family mf
+JOIN tag_rule tr
+  ON tr.scope = 'family'
+ AND mf.slug REGEXP tr.pattern
+JOIN tag t ON t.id = tr.tag_id;
+
+DROP VIEW IF EXISTS v_family_tags_effective;
+CREATE VIEW v_family_tags_effective AS
+SELECT
+  mft.family_id,
+  mft.tag_id,
+  t.slug AS tag_slug,
+  mft.confidence,
+  mft.source,
+  mft.verification
+FROM model_family_tag mft
+JOIN tag t ON t.id = mft.tag_id;
+
+-- ---------------------------------------------------------------------------
+-- Community signals (runs + templates)
+-- ---------------------------------------------------------------------------
+
+CREATE TABLE IF NOT EXISTS constraint_profile (
+  id TEXT PRIMARY KEY DEFAULT (lower(hex(randomblob(4)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(6)))),
+  slug TEXT NOT NULL UNIQUE,
+  display_name TEXT NOT NULL,
+  vram_gib REAL,
+  ram_gib REAL,
+  gpu_model TEXT,
+  cpu_model TEXT,
+  notes TEXT,
+  verification TEXT NOT NULL DEFAULT 'admin_verified' CHECK (verification IN ('catalog','estimated','community_verified','admin_verified')),
+  created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS workflow_run (
+  id TEXT PRIMARY KEY DEFAULT (lower(hex(randomblob(4)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(6)))),
+  variant_id TEXT NOT NULL REFERENCES model_variant(id) ON DELETE CASCADE,
+  workflow_id TEXT NOT NULL REFERENCES workflow(id) ON DELETE CASCADE,
+  toolchain_id TEXT REFERENCES toolchain(id) ON DELETE SET NULL,
+  constraint_profile_id TEXT REFERENCES constraint_profile(id) ON DELETE SET NULL,
+  context_tokens INTEGER,
+  kv_cache_type TEXT,
+  tokens_per_second REAL,
+  ttft_ms INTEGER,
+  quality_score INTEGER,
+  success BOOLEAN,
+  notes TEXT,
+  verification TEXT NOT NULL DEFAULT 'community_verified' CHECK (verification IN ('catalog','estimated','community_verified','admin_verified')),
+  submitted_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_workflow_run_agg_key
+  ON workflow_run(variant_id, workflow_id, toolchain_id, tokens_per_second, ttft_ms, quality_score, success, verification, submitted_at);
+
+-- Exact full-scan reference; percentile_cont(0.5) as the mean of the middle row(s).
+DROP VIEW IF EXISTS v_workflow_run_agg;
+CREATE VIEW v_workflow_run_agg AS
+WITH tps AS (
+  SELECT variant_id, workflow_id, toolchain_id, tokens_per_second AS v,
+         ROW_NUMBER() OVER (PARTITION BY variant_id, workflow_id, toolchain_id ORDER BY tokens_per_second) AS rn,
+         COUNT(*) OVER (PARTITION BY variant_id, workflow_id, toolchain_id) AS n
+  FROM workflow_run
+  WHERE tokens_per_second IS NOT NULL
+),
+ttft AS (
+  SELECT variant_id, workflow_id, toolchain_id, ttft_ms AS v,
+         ROW_NUMBER() OVER (PARTITION BY variant_id, workflow_id, toolchain_id ORDER BY ttft_ms) AS rn,
+         COUNT(*) OVER (PARTITION BY variant_id, workflow_id, toolchain_id) AS n
+  FROM workflow_run
+  WHERE ttft_ms IS NOT NULL
+),
+tps_median AS (
+  SELECT variant_id, workflow_id, toolchain_id, AVG(v) AS p50
+  FROM tps WHERE rn IN ((n + 1) / 2, (n + 2) / 2)
+  GROUP BY variant_id, workflow_id, toolchain_id
+),
+ttft_median AS (
+  SELECT variant_id, workflow_id, toolchain_id, AVG(v) AS p50
+  FROM ttft WHERE rn IN ((n + 1) / 2, (n + 2) / 2)
+  GROUP BY variant_id, workflow_id, toolchain_id
+),
+agg AS (
+  SELECT
+    variant_id,
+    workflow_id,
+    toolchain_id,
+    COUNT(*) AS run_count,
+    COUNT(*) FILTER (WHERE verification IN ('community_verified','admin_verified')) AS run_count_trusted,
+    AVG(quality_score) AS avg_quality,
+    AVG(CASE WHEN success THEN 1.0 ELSE 0.0 END) AS avg_success,
+    MAX(submitted_at) AS last_run_at
+  FROM workflow_run
+  GROUP BY variant_id, workflow_id, toolchain_id
+)
+SELECT
+  a.variant_id,
+  a.workflow_id,
+  a.toolchain_id,
+  a.run_count,
+  a.run_count_trusted,
+  pt.p50 AS p50_tps,
+  pf.p50 AS p50_ttft_ms,
+  a.avg_quality,
+  a.avg_success,
+  a.last_run_at
+FROM agg a
+LEFT JOIN tps_median pt
+  ON pt.variant_id = a.variant_id AND pt.workflow_id = a.workflow_id AND pt.toolchain_id IS a.toolchain_id
+LEFT JOIN ttft_median pf
+  ON pf.variant_id = a.variant_id AND pf.workflow_id = a.workflow_id AND pf.toolchain_id IS a.toolchain_id;
+
+CREATE TABLE IF NOT EXISTS workflow_run_agg (
+  variant_id TEXT NOT NULL REFERENCES model_variant(id) ON DELETE CASCADE,
+  workflow_id TEXT NOT NULL REFERENCES workflow(id) ON DELETE CASCADE,
+  toolchain_id TEXT REFERENCES toolchain(id) ON DELETE SET NULL,
+  run_count INTEGER NOT NULL DEFAULT 0,
+  run_count_trusted INTEGER NOT NULL DEFAULT 0,
+  quality_sum REAL NOT NULL DEFAULT 0,
+  quality_count INTEGER NOT NULL DEFAULT 0,
+  success_count INTEGER NOT NULL DEFAULT 0,
+  tps_sketch BLOB,
+  ttft_sketch BLOB,
+  p50_tps REAL,
+  p95_tps REAL,
+  p50_ttft_ms REAL,
+  p95_ttft_ms REAL,
+  last_run_at TEXT,
+  updated_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+-- 008: toolchain_id used to be ON DELETE CASCADE. SQLite can't alter a foreign
+-- key, so the table is copied into the current definition (only runs when the
+-- schema version changes).
+DROP TABLE IF EXISTS workflow_run_agg_rebuild;
+CREATE TABLE workflow_run_agg_rebuild AS SELECT * FROM workflow_run_agg;
+DROP TABLE workflow_run_agg;
+CREATE TABLE workflow_run_agg (
+  variant_id TEXT NOT NULL REFERENCES model_variant(id) ON DELETE CASCADE,
+  workflow_id TEXT NOT NULL REFERENCES workflow(id) ON DELETE CASCADE,
+  toolchain_id TEXT REFERENCES toolchain(id) ON DELETE SET NULL,
+  run_count INTEGER NOT NULL DEFAULT 0,
+  run_count_trusted INTEGER NOT NULL DEFAULT 0,
+  quality_sum REAL NOT NULL DEFAULT 0,
+  quality_count INTEGER NOT NULL DEFAULT 0,
+  success_count INTEGER NOT NULL DEFAULT 0,
+  tps_sketch BLOB,
+  ttft_sketch BLOB,
+  p50_tps REAL,
+  p95_tps REAL,
+  p50_ttft_ms REAL,
+  p95_ttft_ms REAL,
+  last_run_at TEXT,
+  updated_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+INSERT INTO workflow_run_agg SELECT * FROM workflow_run_agg_rebuild;
+DROP TABLE workflow_run_agg_rebuild;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_workflow_run_agg_key
+  ON workflow_run_agg (variant_id, workflow_id, COALESCE(toolchain_id, '00000000-0000-0000-0000-000000000000'));
+CREATE INDEX IF NOT EXISTS idx_workflow_run_agg_workflow_toolchain
+  ON workflow_run_agg (workflow_id, toolchain_id);
+
+DROP VIEW IF EXISTS v_workflow_run_agg_maintained;
+CREATE VIEW v_workflow_run_agg_maintained AS
+SELECT
+  variant_id,
+  workflow_id,
+  toolchain_id,
+  run_count,
+  run_count_trusted,
+  p50_tps,
+  p95_tps,
+  p50_ttft_ms,
+  p95_ttft_ms,
+  quality_sum / NULLIF(quality_count, 0) AS avg_quality,
+  CAST(success_count AS REAL) / NULLIF(run_count, 0) AS avg_success,
+  last_run_at
+FROM workflow_run_agg
+WHERE run_count > 0;
+
+CREATE TABLE IF NOT EXISTS task_template (
+  id TEXT PRIMARY KEY DEFAULT (lower(hex(randomblob(4)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(6)))),
+  variant_id TEXT REFERENCES model_variant(id) ON DELETE CASCADE,
+  family_id TEXT REFERENCES model_family(id) ON DELETE CASCADE,
+  workflow_id TEXT NOT NULL REFERENCES workflow(id) ON DELETE CASCADE,
+  toolchain_id TEXT REFERENCES toolchain(id) ON DELETE SET NULL,
+  task_name TEXT NOT NULL,
+  system_prompt TEXT,
+  temperature REAL,
+  top_k INTEGER,
+  top_p REAL,
+  context_usage_pct REAL,
+  notes TEXT,
+  verification TEXT NOT NULL DEFAULT 'community_verified' CHECK (verification IN ('catalog','estimated','community_verified','admin_verified')),
+  submitted_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+  CHECK (variant_id IS NOT NULL OR family_id IS NOT NULL)
+);
+
+CREATE TABLE IF NOT EXISTS template_vote (
+  id TEXT PRIMARY KEY DEFAULT (lower(hex(randomblob(4)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(6)))),
+  template_id TEXT NOT NULL REFERENCES task_template(id) ON DELETE CASCADE,
+  voter_fingerprint TEXT NOT NULL,
+  vote INTEGER NOT NULL,
+  created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+  UNIQUE (template_id, voter_fingerprint)
+);
+
+CREATE TABLE IF NOT EXISTS template_vote_tally (
+  template_id TEXT PRIMARY KEY REFERENCES task_template(id) ON DELETE CASCADE,
+  vote_sum INTEGER NOT NULL DEFAULT 0,
+  vote_count INTEGER NOT NULL DEFAULT 0,
+  updated_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+-- apply_template_vote_tally(), one trigger per operation.
+CREATE TRIGGER IF NOT EXISTS trg_template_vote_tally_ins
+AFTER INSERT ON template_vote
+FOR EACH ROW
+BEGIN
+  INSERT OR IGNORE INTO template_vote_tally (template_id) VALUES (NEW.template_id);
+  UPDATE template_vote_tally
+  SET vote_sum = vote_sum + NEW.vote,
+      vote_count = vote_count + 1,
+      updated_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')
+  WHERE template_id = NEW.template_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_template_vote_tally_upd
+AFTER UPDATE OF template_id, vote ON template_vote
+FOR EACH ROW
+BEGIN
+  UPDATE template_vote_tally
+  SET vote_sum = vote_sum - OLD.vote,
+      vote_count = vote_count - 1,
+      updated_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')
+  WHERE template_id = OLD.template_id;
+  INSERT OR IGNORE INTO template_vote_tally (template_id) VALUES (NEW.template_id);
+  UPDATE template_vote_tally
+  SET vote_sum = vote_sum + NEW.vote,
+      vote_count = vote_count + 1,
+      updated_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')
+  WHERE template_id = NEW.template_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_template_vote_tally_del
+AFTER DELETE ON template_vote
+FOR EACH ROW
+BEGIN
+  UPDATE template_vote_tally
+  SET vote_sum = vote_sum - OLD.vote,
+      vote_count = vote_count - 1,
+      updated_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')
+  WHERE template_id = OLD.template_id;
+END;
+
+DROP VIEW IF EXISTS v_best_task_template;
+DROP VIEW IF EXISTS v_task_template_score;
+CREATE VIEW v_task_template_score AS
+SELECT
+  tt.*,
+  COALESCE(tvt.vote_sum, 0) AS vote_sum,
+  COALESCE(tvt.vote_count, 0) AS vote_count
+FROM task_template tt
+LEFT JOIN template_vote_tally tvt ON tvt.template_id = tt.id;
+
+-- DISTINCT ON (...) ORDER BY vote_sum DESC, submitted_at DESC
+CREATE VIEW v_best_task_template AS
+SELECT
+  id, variant_id, family_id, workflow_id, toolchain_id, task_name, system_prompt,
+  temperature, top_k, top_p, context_usage_pct, notes, verification, submitted_at,
+  vote_sum, vote_count
+FROM (
+  SELECT s.*,
+         ROW_NUMBER() OVER (
+           PARTITION BY s.workflow_id, COALESCE(s.toolchain_id, ''), COALESCE(s.variant_id, ''), COALESCE(s.family_id, '')
+           ORDER BY s.vote_sum DESC, s.submitted_at DESC
+         ) AS rn
+  FROM v_task_template_score s
+)
+WHERE rn = 1;
+
+-- ---------------------------------------------------------------------------
+-- VRAM components view
+-- ---------------------------------------------------------------------------
+
+DROP VIEW IF EXISTS v_variant_vram_components;
+CREATE VIEW v_variant_vram_components AS
+SELECT
+  mf.slug AS family_slug,
+  mv.tag AS tag,
+  mv.id AS variant_id,
+  de.kv_cache_type,
+  de.context_tokens,
+  MAX(de.value) FILTER (WHERE de.estimate_type = 'vram_weights_gib') AS weights_vram_gib,
+  MAX(de.value) FILTER (WHERE de.estimate_type = 'vram_runtime_overhead_gib') AS runtime_overhead_gib,
+  MAX(de.value) FILTER (WHERE de.estimate_type = 'kv_bytes_per_token_opt') AS kv_bytes_per_token_opt,
+  MAX(de.value) FILTER (WHERE de.estimate_type = 'kv_bytes_per_token_cons') AS kv_bytes_per_token_cons
+FROM derived_estimate de
+JOIN model_variant mv ON mv.id = de.variant_id
+JOIN model_family mf ON mf.id = mv.family_id
+JOIN estimate_profile ep ON ep.id = de.estimate_profile_id
+WHERE ep.name = 'vram_estimator'
+  AND ep.version = '1.0.0'
+  AND de.offload_fraction = 1.0
+GROUP BY mf.slug, mv.tag, mv.id, de.kv_cache_type, de.context_tokens;
+
+-- ---------------------------------------------------------------------------
+-- Resumable / distributed crawls
+-- ---------------------------------------------------------------------------
+
+CREATE TABLE IF NOT EXISTS crawl_queue (
+  run_id TEXT NOT NULL REFERENCES crawl_run(id) ON DELETE CASCADE,
+  slug TEXT NOT NULL,
+  position INTEGER NOT NULL,
+  status TEXT NOT NULL DEFAULT 'pending',
+  claimed_by TEXT,
+  claimed_at TEXT,
+  finished_at TEXT,
+  stats_json JSON NOT NULL DEFAULT '{}',
+  error TEXT,
+  PRIMARY KEY (run_id, slug)
+);
+
+CREATE INDEX IF NOT EXISTS idx_crawl_queue_claim ON crawl_queue(run_id, status, position);
+CREATE INDEX IF NOT EXISTS idx_crawl_queue_slug ON crawl_queue(slug, status);
+
+-- ---------------------------------------------------------------------------
+-- Crawl-to-crawl change feed (007_crawl_change_feed.sql)
+-- ---------------------------------------------------------------------------
+
+CREATE TABLE IF NOT EXISTS crawl_variant_snapshot (
+  run_id TEXT NOT NULL REFERENCES crawl_run(id) ON DELETE CASCADE,
+  family_slug TEXT NOT NULL,
+  tag TEXT NOT NULL,
+  variant_id TEXT,
+  digest TEXT,
+  size_bytes INTEGER,
+  max_context INTEGER,
+  PRIMARY KEY (run_id, family_slug, tag)
+);
+
+CREATE INDEX IF NOT EXISTS idx_crawl_variant_snapshot_family ON crawl_variant_snapshot(family_slug, run_id);
+
+CREATE TABLE IF NOT EXISTS crawl_change (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  run_id TEXT NOT NULL REFERENCES crawl_run(id) ON DELETE CASCADE,
+  entity TEXT NOT NULL,
+  change TEXT NOT NULL,
+  family_slug TEXT NOT NULL,
+  tag TEXT,
+  variant_id TEXT,
+  old_digest TEXT,
+  new_digest TEXT,
+  old_size_bytes INTEGER,
+  new_size_bytes INTEGER,
+  old_max_context INTEGER,
+  new_max_context INTEGER,
+  recorded_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_crawl_change_run ON crawl_change(run_id, family_slug);
+CREATE INDEX IF NOT EXISTS idx_crawl_change_recorded_at ON crawl_change(recorded_at);
+
+DROP VIEW IF EXISTS v_crawl_change;
+CREATE VIEW v_crawl_change AS
+SELECT
+  c.id,
+  c.run_id,
+  r.started_at AS run_started_at,
+  r.status AS run_status,
+  c.entity,
+  c.change,
+  c.family_slug,
+  c.tag,
+  c.variant_id,
+  c.old_digest,
+  c.new_digest,
+  c.old_size_bytes,
+  c.new_size_bytes,
+  c.old_max_context,
+  c.new_max_context,
+  c.recorded_at
+FROM crawl_change c
+JOIN crawl_run r ON r.id = c.run_id;
+
+-- Baseline for files created before the feed existed (see 007).
+INSERT OR IGNORE INTO crawl_variant_snapshot (run_id, family_slug, tag, variant_id, digest, size_bytes, max_context)
+SELECT b.run_id, b.slug, mv.tag, mv.id, mv.digest, mv.size_bytes, mv.max_context
+FROM (
+  SELECT mf.id AS family_id, mf.slug, COALESCE(
+    (SELECT q.run_id
+     FROM crawl_queue q
+     JOIN crawl_run r ON r.id = q.run_id
+     WHERE q.slug = mf.slug AND q.status = 'done'
+     ORDER BY r.started_at DESC
+     LIMIT 1),
+    (SELECT id FROM crawl_run WHERE status = 'success' ORDER BY started_at DESC LIMIT 1)
+  ) AS run_id
+  FROM model_family mf
+) b
+JOIN crawl_run r ON r.id = b.run_id
+JOIN model_variant mv ON mv.family_id = b.family_id AND mv.last_seen_at >= r.started_at
+WHERE NOT EXISTS (SELECT 1 FROM crawl_variant_snapshot);
+
+-- ---------------------------------------------------------------------------
+-- Seeds (same rows as migrations/001_init.sql; safe to rerun)
+-- ---------------------------------------------------------------------------
+
+INSERT INTO workflow (slug, name, description, category, default_context_tokens, default_kv_cache_type, verification)
+VALUES
+  ('web-dev', 'Web development', 'Coding in an editor/IDE with repo context, tests, and iterative prompting.', 'software', 8192, 'fp16', 'admin_verified'),
+  ('code-review', 'Code review', 'Review diffs/PRs, suggest improvements, and enforce standards.', 'software', 8192, 'fp16', 'admin_verified'),
+  ('debugging', 'Debugging', 'Investigate errors, logs, and reproduce/fix bugs.', 'software', 8192, 'fp16', 'admin_verified'),
+  ('rag-building', 'RAG building', 'Build or tune retrieval + prompting + evaluation.', 'software', 8192, 'fp16', 'admin_verified'),
+  ('data-analysis', 'Data analysis', 'Summarize and analyze datasets; notebooks; light coding.', 'data', 8192, 'fp16', 'admin_verified'),
+  ('video-editing', 'Video editing', 'Script help, cut lists, captions/subtitles, and post-production notes.', 'creative', 8192, 'fp16', 'admin_verified'),
+  ('transcription', 'Transcription', 'Speech-to-text, subtitle generation, and cleanup.', 'creative', 8192, 'fp16', 'admin_verified'),
+  ('refactor', 'Refactoring', 'Improve structure, readability, and maintainability of an existing codebase.', 'software', 16384, 'fp16', 'admin_verified'),
+  ('agentic-swe', 'Agentic software engineering', 'Plan → implement → test loops with tools (edit/build/test) in an IDE or CLI.', 'software', 16384, 'fp16', 'admin_verified'),
+  ('docs-writing', 'Docs writing', 'Write or improve README, ADRs, runbooks, and internal documentation.', 'productivity', 8192, 'fp16', 'admin_verified'),
+  ('customer-support', 'Customer support', 'Draft support replies, triage, and knowledge base responses.', 'business', 8192, 'fp16', 'admin_verified')
+ON CONFLICT (slug) DO NOTHING;
+
+INSERT INTO toolchain (slug, display_name, description, kind, components, verification)
+VALUES
+  ('vscode+roo-code', 'VS Code + Roo Code', 'Agentic coding in VS Code using Roo Code (local models via Ollama).', 'ide',
+    '{"editor":"VS Code","assistant":"Roo Code","runtime":"Ollama"}', 'admin_verified'),
+  ('vscode+continue', 'VS Code + Continue', 'Coding assistant in VS Code using Continue (supports Ollama).', 'ide',
+    '{"editor":"VS Code","assistant":"Continue","runtime":"Ollama"}', 'admin_verified'),
+  ('vscode+cline', 'VS Code + Cline', 'Agentic coding in VS Code using Cline (tool-use, plans, execution).', 'ide',
+    '{"editor":"VS Code","assistant":"Cline","runtime":"Ollama"}', 'admin_verified'),
+  ('vscode+copilot', 'VS Code + Copilot', 'Popular coding assistant; often compared against local workflows.', 'ide',
+    '{"editor":"VS Code","assistant":"Copilot"}', 'admin_verified'),
+  ('cursor', 'Cursor', 'Agentic-first editor; common benchmark for local-agent parity.', 'ide',
+    '{"editor":"Cursor"}', 'admin_verified'),
+  ('jetbrains+ai', 'JetBrains + AI Assistant', 'JetBrains IDEs with AI Assistant / local integration via plugins.', 'ide',
+    '{"editor":"JetBrains"}', 'admin_verified'),
+  ('neovim+avante', 'Neovim + Avante', 'Neovim agentic workflow using Avante.nvim.', 'ide',
+    '{"editor":"Neovim","assistant":"Avante.nvim","runtime":"Ollama"}', 'admin_verified'),
+  ('cli+aider', 'CLI + Aider', 'Terminal-first agentic coding with repo mapping and patches.', 'cli',
+    '{"assistant":"Aider","runtime":"Ollama"}', 'admin_verified'),
+  ('openwebui+ollama', 'Open WebUI + Ollama', 'Web chat UI for Ollama; common baseline for chat workflows.', 'webui',
+    '{"ui":"Open WebUI","runtime":"Ollama"}', 'admin_verified'),
+  ('anythingllm+ollama', 'AnythingLLM + Ollama', 'Chat/RAG desktop/web app commonly paired with Ollama.', 'webui',
+    '{"ui":"AnythingLLM","runtime":"Ollama"}', 'admin_verified'),
+  ('n8n+ollama', 'n8n + Ollama', 'Automation workflows that call local models via HTTP.', 'automation',
+    '{"orchestrator":"n8n","runtime":"Ollama"}', 'admin_verified'),
+  ('windsurf', 'Windsurf', 'Windsurf IDE/editor with agentic workflows (often compared alongside Cursor).', 'ide',
+    '{"editor":"Windsurf","assistant":"Built-in","runtime":"varies"}', 'admin_verified'),
+  ('zed+assistant', 'Zed + Assistant', 'Zed editor with assistant/chat integrations.', 'ide',
+    '{"editor":"Zed","assistant":"Integrated","runtime":"varies"}', 'admin_verified'),
+  ('emacs+gptel', 'Emacs + gptel', 'Emacs workflows using gptel for chat/edit assistance (can target local endpoints).', 'editor',
+    '{"editor":"Emacs","assistant":"gptel","runtime":"varies"}', 'admin_verified'),
+  ('flowise+ollama', 'Flowise + Ollama', 'Flowise visual LLM workflow builder using Ollama as runtime.', 'automation',
+    '{"builder":"Flowise","runtime":"Ollama"}', 'admin_verified'),
+  ('langflow+ollama', 'Langflow + Ollama', 'Langflow visual builder using Ollama as runtime.', 'automation',
+    '{"builder":"Langflow","runtime":"Ollama"}', 'admin_verified'),
+  ('lmstudio', 'LM Studio', 'Local model runtime/manager; sometimes used instead of Ollama.', 'runtime',
+    '{"runtime":"LM Studio"}', 'admin_verified')
+ON CONFLICT (slug) DO NOTHING;
+
+INSERT INTO tag (slug, name, category, description)
+VALUES
+  ('chat', 'Chat', 'use_case', 'General chat / assistant behavior'),
+  ('code', 'Code', 'use_case', 'Coding / software development'),
+  ('reasoning', 'Reasoning', 'use_case', 'Deliberate reasoning / problem solving'),
+  ('embedding', 'Embedding', 'use_case', 'Vector embeddings for retrieval'),
+  ('multimodal', 'Multimodal', 'use_case', 'Text + vision/audio inputs'),
+  ('math', 'Math', 'specialty', 'Strong mathematical ability'),
+  ('creative', 'Creative', 'specialty', 'Creative writing / ideation'),
+  ('technical', 'Technical', 'specialty', 'Technical explanation / documentation'),
+  ('long-context', 'Long context', 'specialty', 'Useful with larger context windows'),
+  ('instruction-tuned', 'Instruction tuned', 'training_focus', 'SFT/RLHF tuned for instruction following'),
+  ('base', 'Base model', 'training_focus', 'Pretrained/base (not instruction tuned)')
+ON CONFLICT (slug) DO NOTHING;
+
+INSERT INTO tag_rule (scope, pattern, tag_id, confidence, notes)
+SELECT 'family', '(?i)(coder|code|program)', t.id, 0.65, 'Slug/name suggests code specialization'
+FROM tag t WHERE t.slug='code'
+ON CONFLICT DO NOTHING;
+
+INSERT INTO tag_rule (scope, pattern, tag_id, confidence, notes)
+SELECT 'family', '(?i)(embed|embedding)', t.id, 0.75, 'Slug/name suggests embeddings'
+FROM tag t WHERE t.slug='embedding'
+ON CONFLICT DO NOTHING;
+
+INSERT INTO tag_rule (scope, pattern, tag_id, confidence, notes)
+SELECT 'family', '(?i)(vision|vl|multimodal|clip)', t.id, 0.70, 'Slug/name suggests multimodal/vision'
+FROM tag t WHERE t.slug='multimodal'
+ON CONFLICT DO NOTHING;
+
+INSERT INTO tag_rule (scope, pattern, tag_id, confidence, notes)
+SELECT 'family', '(?i)(r1|reason)', t.id, 0.60, 'Slug/name suggests reasoning family'
+FROM tag t WHERE t.slug='reasoning'
+ON CONFLICT DO NOTHING;
+
+INSERT INTO tag_rule (scope, pattern, tag_id, confidence, notes)
+SELECT 'family', '(?i)(math)', t.id, 0.70, 'Slug/name suggests math specialization'
+FROM tag t WHERE t.slug='math'
+ON CONFLICT DO NOTHING;
+
+INSERT INTO constraint_profile (slug, display_name, vram_gib, ram_gib, notes, verification)
+VALUES
+  ('gpu-8gb', 'GPU 8GB', 8, 32, 'Common entry-level discrete GPU budget', 'admin_verified'),
+  ('gpu-12gb', 'GPU 12GB', 12, 32, 'Common midrange discrete GPU budget', 'admin_verified'),
+  ('gpu-16gb', 'GPU 16GB', 16, 32, 'Higher headroom for larger models', 'admin_verified'),
+  ('gpu-24gb', 'GPU 24GB', 24, 64, 'Creator / prosumer GPU headroom', 'admin_verified'),
+  ('cpu-ram-64gb', 'CPU-only (64GB RAM)', NULL, 64, 'No GPU; relies on system RAM and CPU', 'admin_verified')
+ON CONFLICT (slug) DO NOTHING;
+
+COMMIT;
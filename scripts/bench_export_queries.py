@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import os, sys, json, time, random, argparse, statistics
+
+import psycopg
+from psycopg.rows import dict_row
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from crawler.db import get_db_url, require_postgres
+from crawler.main import ESTIMATE_TYPES
+
+BENCH_PREFIX = "bench-family-"
+BENCH_CONTEXTS = (8192, 32768)
+
+# The exporter's queries (scripts/export_site.py), plus the point lookups the partitioning targets.
+QUERIES = {
+    "export: vram components": """
+        SELECT variant_id::text, weights_vram_gib::float8, runtime_overhead_gib::float8,
+               kv_bytes_per_token_opt::float8, kv_bytes_per_token_cons::float8, kv_cache_type
+        FROM v_variant_vram_components
+        ORDER BY family_slug, tag;
+    """,
+    "vram components, one variant": """
+        SELECT * FROM v_variant_vram_components WHERE variant_id = %(variant_id)s;
+    """,
+    "export: run aggregates (full view)": """
+        SELECT wr.variant_id::text AS variant_id, w.slug AS workflow_slug, tc.slug AS toolchain_slug,
+               wr.run_count::bigint, wr.run_count_trusted::bigint, wr.p50_tps::float8, wr.p50_ttft_ms::float8,
+               wr.avg_quality::float8, wr.avg_success::float8, wr.last_run_at::text
+        FROM v_workflow_run_agg wr
+        JOIN workflow w ON w.id = wr.workflow_id
+        JOIN toolchain tc ON tc.id = wr.toolchain_id
+        ORDER BY w.slug, tc.slug;
+    """,
+    "runs of one variant, last 30 days": """
+        SELECT COUNT(*) AS n, AVG(tokens_per_second)::float8 AS avg_tps
+        FROM workflow_run
+        WHERE variant_id = %(variant_id)s AND submitted_at >= now() - interval '30 days';
+    """,
+}
+
+
+def seed(conn: psycopg.Connection, variants: int, crawls: int, runs: int, months: int) -> None:
+    '''
+    Synthetic catalog under BENCH_PREFIX: `variants` variants (10 per family), one full
+    estimate set per variant for each of `crawls` crawls spread over `months`, and
+    `runs` workflow runs. Rows are generated server-side with generate_series.
+    '''
+    with conn.cursor() as cur:
+        if cur.execute("SELECT to_regproc('create_month_partitions') IS NOT NULL AS ok;").fetchone()["ok"]:
+            cur.execute("SELECT create_month_partitions('derived_estimate', 'created_at', now() - make_interval(months => %s), now());", (months,))
+            cur.execute("SELECT create_month_partitions('workflow_run', 'submitted_at', now() - make_interval(months => %s), now());", (months,))
+        cur.execute("""
+            INSERT INTO estimate_profile (name, version, assumptions_json)
+            VALUES ('vram_estimator', '1.0.0', '{}') ON CONFLICT (name, version) DO NOTHING;
+        """)
+        profile_id = cur.execute("SELECT id FROM estimate_profile WHERE name = 'vram_estimator' AND version = '1.0.0';").fetchone()["id"]
+        cur.execute(f"""
+            INSERT INTO model_family (slug, display_name)
+            SELECT '{BENCH_PREFIX}' || i, 'Bench family ' || i FROM generate_series(1, %s) i
+            ON CONFLICT (slug) DO NOTHING;
+        """, (max(1, variants // 10),))
+        cur.execute(f"""
+            INSERT INTO model_variant (family_id, tag, tag_short, size_bytes, max_context)
+            SELECT f.id, f.slug || ':' || k || 'b', k || 'b', (k * 1.1e9)::bigint, 32768
+            FROM model_family f, generate_series(1, 10) k
+            WHERE f.slug LIKE '{BENCH_PREFIX}%%'
+            ON CONFLICT (family_id, tag) DO NOTHING;
+        """)
+        conn.commit()
+
+        types = ", ".join(f"('{t}', '{u}')" for t, u in ESTIMATE_TYPES)
+        contexts = ", ".join(f"({c})" for c in BENCH_CONTEXTS)
+        spacing_days = months * 30.0 / max(1, crawls)
+        for r in range(crawls):
+            t0 = time.perf_counter()
+            cur.execute(f"""
+                INSERT INTO derived_estimate (variant_id, estimate_profile_id, estimate_type, value, units,
+                                              context_tokens, kv_cache_type, offload_fraction, confidence, created_at)
+                SELECT v.id, %(profile_id)s, t.estimate_type, random() * 40, t.units,
+                       c.ctx, 'fp16', 1.0, 'medium', now() - %(age_days)s * interval '1 day'
+                FROM model_variant v
+                JOIN model_family f ON f.id = v.family_id AND f.slug LIKE '{BENCH_PREFIX}%%'
+                CROSS JOIN (VALUES {contexts}) c(ctx)
+                CROSS JOIN (VALUES {types}) t(estimate_type, units);
+            """, {"profile_id": profile_id, "age_days": r * spacing_days})
+            conn.commit()
+            print(f"  crawl {r + 1}/{crawls}: {cur.rowcount} estimates ({time.perf_counter() - t0:.1f}s)")
+
+        batch = 500_000
+        for start in range(0, runs, batch):
+            n = min(batch, runs - start)
+            cur.execute(f"""
+                WITH ids AS (
+                  SELECT (SELECT array_agg(v.id) FROM model_variant v JOIN model_family f ON f.id = v.family_id
+                          WHERE f.slug LIKE '{BENCH_PREFIX}%%') AS variants,
+                         (SELECT array_agg(id) FROM workflow) AS workflows,
+                         (SELECT array_agg(id) FROM toolchain) AS toolchains
+                )
+                INSERT INTO workflow_run (variant_id, workflow_id, toolchain_id, context_tokens, kv_cache_type,
+                                          tokens_per_second, ttft_ms, quality_score, success, verification, submitted_at)
+                SELECT ids.variants[1 + (random() * (cardinality(ids.variants) - 1))::int],
+                       ids.workflows[1 + (random() * (cardinality(ids.workflows) - 1))::int],
+                       ids.toolchains[1 + (random() * (cardinality(ids.toolchains) - 1))::int],
+                       8192, 'fp16', 5 + random() * 120, (50 + random() * 2000)::int, 1 + (random() * 9)::int,
+                       random() < 0.9, 'community_verified',
+                       now() - random() * %(months)s * interval '30 days'
+                FROM ids, generate_series(1, %(n)s);
+            """, {"months": months, "n": n})
+            conn.commit()
+            print(f"  workflow runs: {start + n}/{runs}")
+
+    # Visibility map + statistics, so the planner can pick index-only scans.
+    conn.autocommit = True
+    conn.execute("VACUUM ANALYZE derived_estimate;")
+    conn.execute("VACUUM ANALYZE workflow_run;")
+    conn.autocommit = False
+
+
+def cleanup(conn: psycopg.Connection) -> None:
+    # Estimates and runs go with their variants (ON DELETE CASCADE).
+    conn.execute(f"DELETE FROM model_family WHERE slug LIKE '{BENCH_PREFIX}%%';")
+    conn.commit()
+
+
+def plan_summary(conn: psycopg.Connection, query: str, params: dict) -> str:
+    '''Scan node types and how many relations (partitions) the plan touches.'''
+    plan = conn.execute("EXPLAIN (FORMAT JSON) " + query, params).fetchone()["QUERY PLAN"]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    scans, relations = {}, set()
+    stack = [plan[0]["Plan"]]
+    while stack:
+        node = stack.pop()
+        if "Relation Name" in node:
+            scans[node["Node Type"]] = scans.get(node["Node Type"], 0) + 1
+            relations.add(node["Relation Name"])
+        stack.extend(node.get("Plans", []))
+    return ", ".join(f"{k} x{v}" for k, v in sorted(scans.items())) + f"; {len(relations)} relations"
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Seed synthetic estimates/runs and time the export queries (Postgres)")
+    ap.add_argument("--db-url", default=None, help="Postgres URL (or use DATABASE_URL env var)")
+    ap.add_argument("--variants", type=int, default=10_000)
+    ap.add_argument("--crawls", type=int, default=32, help="Estimate sets per variant (one per simulated crawl)")
+    ap.add_argument("--runs", type=int, default=2_000_000, help="Synthetic workflow runs")
+    ap.add_argument("--months", type=int, default=12, help="History the crawls/runs are spread over")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--skip-seed", action="store_true", help="Reuse rows from a previous run")
+    ap.add_argument("--cleanup", action="store_true", help="Delete the synthetic rows and exit")
+    args = ap.parse_args()
+
+    db_url = get_db_url(args.db_url)
+    require_postgres(db_url, "bench_export_queries")
+    with psycopg.connect(db_url, row_factory=dict_row) as conn:
+        if args.cleanup:
+            cleanup(conn)
+            print("Removed synthetic rows")
+            return
+        if not args.skip_seed:
+            n_est = args.variants * args.crawls * len(BENCH_CONTEXTS) * len(ESTIMATE_TYPES)
+            print(f"Seeding {args.variants} variants, {n_est} estimates, {args.runs} workflow runs")
+            t0 = time.perf_counter()
+            seed(conn, args.variants, args.crawls, args.runs, args.months)
+            print(f"Seeded in {time.perf_counter() - t0:.1f}s")
+
+        counts = conn.execute("SELECT (SELECT COUNT(*) FROM derived_estimate) AS estimates, (SELECT COUNT(*) FROM workflow_run) AS runs;").fetchone()
+        partitioned = conn.execute("SELECT relkind = 'p' AS p FROM pg_class WHERE oid = 'derived_estimate'::regclass;").fetchone()["p"]
+        print(f"derived_estimate: {counts['estimates']} rows, workflow_run: {counts['runs']} rows ({'partitioned' if partitioned else 'unpartitioned'})")
+
+        sample = conn.execute(f"""
+            SELECT v.id FROM model_variant v JOIN model_family f ON f.id = v.family_id
+            WHERE f.slug LIKE '{BENCH_PREFIX}%%';
+        """).fetchall()
+        rng = random.Random(7)
+
+        width = max(len(k) for k in QUERIES)
+        print(f"{'query':<{width}}  {'rows':>8}  {'min ms':>9}  {'median ms':>9}  plan")
+        for label, query in QUERIES.items():
+            params = {"variant_id": rng.choice(sample)["id"] if sample else None}
+            timings, rows = [], 0
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                rows = len(conn.execute(query, params).fetchall())
+                timings.append((time.perf_counter() - t0) * 1000)
+            conn.rollback()
+            print(f"{label:<{width}}  {rows:>8}  {min(timings):>9.1f}  {statistics.median(timings):>9.1f}  {plan_summary(conn, query, params)}")
+            conn.rollback()
+
+
+if __name__ == "__main__":
+    main()
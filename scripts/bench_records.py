@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import os, sys, gc, time, random, argparse, tracemalloc
+from dataclasses import dataclass
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from crawler.types import FamilyParsed, VariantParsed
+from crawler.vram import VramEstimate, estimate_vram_total_gib
+from crawler.main import estimate_rows
+
+# The record types as they were before the switch to NamedTuples, for comparison.
+class LegacyFamilyParsed(BaseModel):
+    slug: str
+    display_name: Optional[str] = None
+    description: Optional[str] = None
+    labels: List[str] = Field(default_factory=list)
+    downloads: Optional[int] = None
+    catalog_updated_text: Optional[str] = None
+
+class LegacyVariantParsed(BaseModel):
+    family_slug: str
+    tag: str
+    tag_short: Optional[str] = None
+    digest: Optional[str] = None
+    size_bytes: int
+    max_context: Optional[int] = None
+    input_type: Optional[str] = None
+    catalog_age_text: Optional[str] = None
+
+@dataclass(frozen=True)
+class LegacyVramEstimate:
+    total_gib_opt: float
+    total_gib_cons: float
+    weights_gib: float
+    kv_gib_opt: float
+    kv_gib_cons: float
+    runtime_overhead_gib: float
+    confidence: Literal["low", "medium"]
+    notes: str
+
+def legacy_estimate_row(*, variant_id: str, profile_id: str, estimate_type: str, value: float, units: str,
+                        context_tokens: int, kv_cache_type: str, offload_fraction: float, confidence: str,
+                        verification: str = "estimated") -> tuple:
+    '''The parameter tuple the old per-row insert_estimate(conn, **kwargs) bound, minus the DB call.'''
+    return (variant_id, profile_id, estimate_type, value, units, context_tokens, kv_cache_type,
+            offload_fraction, confidence, verification)
+
+def legacy_estimate_rows(args: argparse.Namespace, profile_id: str, variant_id: str, var: LegacyVariantParsed) -> List[tuple]:
+    '''The old write_estimates: a dataclass estimate per context point, one keyword call per row.'''
+    rows: List[tuple] = []
+    ctx_points = set([args.context_default])
+    if var.max_context and var.max_context > 0:
+        ctx_points.add(var.max_context)
+
+    for ctx in sorted(ctx_points):
+        est = LegacyVramEstimate(*estimate_vram_total_gib(
+            size_bytes=var.size_bytes,
+            tag=var.tag,
+            context_tokens=int(ctx),
+            kv_cache_type=args.kv_cache_type,
+            offload_fraction=1.0,
+        ))
+        kv_bpt_opt = (est.kv_gib_opt * (1024 ** 3)) / float(ctx) if ctx else None
+        kv_bpt_cons = (est.kv_gib_cons * (1024 ** 3)) / float(ctx) if ctx else None
+        for estimate_type, value, units in (
+            ("vram_total_gib_opt", est.total_gib_opt, "GiB"),
+            ("vram_total_gib_cons", est.total_gib_cons, "GiB"),
+            ("vram_weights_gib", est.weights_gib, "GiB"),
+            ("vram_runtime_overhead_gib", est.runtime_overhead_gib, "GiB"),
+            ("vram_kv_gib_opt", est.kv_gib_opt, "GiB"),
+            ("vram_kv_gib_cons", est.kv_gib_cons, "GiB"),
+            ("kv_bytes_per_token_opt", kv_bpt_opt, "bytes/token"),
+            ("kv_bytes_per_token_cons", kv_bpt_cons, "bytes/token"),
+        ):
+            rows.append(legacy_estimate_row(
+                variant_id=variant_id,
+                profile_id=profile_id,
+                estimate_type=estimate_type,
+                value=value,
+                units=units,
+                context_tokens=int(ctx),
+                kv_cache_type=args.kv_cache_type,
+                offload_fraction=1.0,
+                confidence=est.confidence,
+                verification="estimated",
+            ))
+    return rows
+
+TIERS = ["0.5b", "1.5b", "3b", "7b", "8b", "14b", "32b", "70b", "8x7b", "671b"]
+QUANTS = ["", "-q4_K_M", "-q8_0", "-fp16", "-instruct-q4_0"]
+
+def synth_fields(n: int, seed: int) -> List[dict]:
+    '''Field dicts shaped like what crawler/parse.py scrapes from a tags page.'''
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        family = f"family{i // 12}"
+        tag_short = f"{rng.choice(TIERS)}{rng.choice(QUANTS)}-{i % 12}"
+        out.append({
+            "family_slug": family,
+            "tag": f"{family}:{tag_short}",
+            "tag_short": tag_short,
+            "digest": f"{rng.getrandbits(48):012x}",
+            "size_bytes": rng.randint(300_000_000, 400_000_000_000),
+            "max_context": rng.choice([None, 4096, 8192, 32768, 131072]),
+            "input_type": rng.choice(["Text", "Vision"]),
+            "catalog_age_text": f"{rng.randint(1, 11)} months ago",
+        })
+    return out
+
+def estimate_values(fields: List[dict]) -> List[tuple]:
+    '''Two estimates per variant (default context + max context), as plain tuples.'''
+    out = []
+    for f in fields:
+        for ctx in (8192, f["max_context"] or 8192):
+            out.append(tuple(estimate_vram_total_gib(size_bytes=f["size_bytes"], tag=f["tag"], context_tokens=ctx)))
+    return out
+
+def measure(label: str, build, n: int) -> dict:
+    '''Build records for n variants and keep them alive; report retained/peak bytes per variant and time.'''
+    gc.collect()
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    t0 = time.perf_counter()
+    kept = build()
+    elapsed = time.perf_counter() - t0
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return {
+        "records": label,
+        "bytes/variant": round((current - base) / n, 1),
+        "peak bytes/variant": round((peak - base) / n, 1),
+        "us/variant": round(elapsed / n * 1e6, 2),
+        "variants/s": round(n / elapsed),
+    }
+
+def main():
+    ap = argparse.ArgumentParser(description="Per-variant allocation and throughput of crawl records (pydantic/dataclass vs NamedTuple)")
+    ap.add_argument("--variants", type=int, default=200_000)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+    n = args.variants
+
+    fields = synth_fields(n, args.seed)
+    est_values = estimate_values(fields)
+    labels = ["tools", "vision"]
+
+    def legacy():
+        fams = [LegacyFamilyParsed(slug=f"family{i}", labels=labels, downloads=1000) for i in range(0, n, 12)]
+        variants = [LegacyVariantParsed(**f) for f in fields]
+        estimates = [LegacyVramEstimate(*v) for v in est_values]
+        return fams, variants, estimates
+
+    def checked():
+        fams = [FamilyParsed.checked(slug=f"family{i}", labels=labels, downloads=1000) for i in range(0, n, 12)]
+        variants = [VariantParsed.checked(**f) for f in fields]
+        estimates = [VramEstimate(*v) for v in est_values]
+        return fams, variants, estimates
+
+    def trusted():
+        fams = [FamilyParsed(slug=f"family{i}", labels=tuple(labels), downloads=1000) for i in range(0, n, 12)]
+        variants = [VariantParsed(**f) for f in fields]
+        estimates = [VramEstimate(*v) for v in est_values]
+        return fams, variants, estimates
+
+    rows = [
+        measure("pydantic + dataclass (before)", legacy, n),
+        measure("NamedTuple, validated at parse", checked, n),
+        measure("NamedTuple, no validation", trusted, n),
+    ]
+
+    # Whole estimate path per variant: boundary check -> estimates -> derived_estimate row tuples.
+    est_args = argparse.Namespace(context_default=8192, kv_cache_type="fp16")
+    def legacy_pipeline():
+        out = []
+        for f in fields:
+            var = LegacyVariantParsed(**f)
+            out.extend(legacy_estimate_rows(est_args, "profile", "variant", var))
+        return out
+    rows.append(measure("pydantic parse + estimate rows (before)", legacy_pipeline, n))
+
+    def pipeline():
+        out = []
+        for f in fields:
+            var = VariantParsed.checked(**f)
+            out.extend(estimate_rows(est_args, "profile", "variant", var))
+        return out
+    rows.append(measure("parse check + estimate rows (after)", pipeline, n))
+
+    print(f"{n} variants, {len(est_values)} estimates")
+    width = max(len(r["records"]) for r in rows)
+    cols = ["bytes/variant", "peak bytes/variant", "us/variant", "variants/s"]
+    print(f"{'records':<{width}}  " + "  ".join(f"{c:>18}" for c in cols))
+    for r in rows:
+        print(f"{r['records']:<{width}}  " + "  ".join(f"{r[c]:>18}" for c in cols))
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,11 @@
 from __future__ import annotations
 
-import os, json, argparse
+import os, sys, json, argparse
 from datetime import datetime, timezone
 
-import psycopg
-from psycopg.rows import dict_row
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from crawler.db import connect, is_sqlite
+from crawler.fit import build_fit_tables
 
 DEFAULT_WORKFLOWS = [
     {"slug": "web-dev", "name": "Web Development", "description": "Coding workflows in an editor/IDE with an assistant/agent.", "category": "software"},
@@ -19,6 +20,10 @@ DEFAULT_TOOLCHAINS = [
 ]
 
 def to_regclass(cur, name: str):
+    if is_sqlite(cur.connection):
+        cur.execute("SELECT name AS r FROM sqlite_master WHERE name = %s AND type IN ('table', 'view');", (name.split(".")[-1],))
+        row = cur.fetchone()
+        return row["r"] if row else None
     cur.execute("SELECT to_regclass(%s) AS r;", (name,))
     row = cur.fetchone()
     return row["r"]
@@ -29,11 +34,70 @@ def table_exists(cur, table: str) -> bool:
 def view_exists(cur, view: str) -> bool:
     return to_regclass(cur, f"public.{view}") is not None
 
+def list_tables(cur) -> list:
+    if is_sqlite(cur.connection):
+        cur.execute("SELECT name AS tablename FROM sqlite_master WHERE type = 'table' ORDER BY name;")
+    else:
+        cur.execute("""
+            SELECT tablename
+            FROM pg_catalog.pg_tables
+            WHERE schemaname='public'
+            ORDER BY tablename;
+        """)
+    return [r["tablename"] for r in cur.fetchall()]
+
+
+COMPONENTS_SQL = """
+    SELECT variant_id::text,
+           weights_vram_gib::float8,
+           runtime_overhead_gib::float8,
+           kv_bytes_per_token_opt::float8,
+           kv_bytes_per_token_cons::float8,
+           kv_cache_type
+    FROM v_variant_vram_components
+    {where}
+    ORDER BY family_slug, tag;
+"""
+
+def load_previous_export(path: str):
+    '''The previous catalog.json if it carries a change-feed cursor (written by this exporter).'''
+    try:
+        with open(path, encoding="utf-8") as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        return None
+    cursor = previous.get("change_cursor") or {}
+    if cursor.get("change_id") is None or not cursor.get("estimates_after"):
+        return None
+    return previous
+
+def changed_variant_ids(cur, cursor: dict) -> list:
+    '''Variants in the change feed after the cursor, plus any with estimates written since.'''
+    cur.execute("""
+        SELECT variant_id::text AS id FROM crawl_change
+        WHERE id > %(change_id)s AND variant_id IS NOT NULL
+        UNION
+        SELECT variant_id::text AS id FROM derived_estimate
+        WHERE created_at > %(estimates_after)s::timestamptz;
+    """, cursor)
+    return [r["id"] for r in cur.fetchall()]
+
+def merge_components(previous: list, fresh: list, changed: list, variants: list) -> list:
+    '''Previous rows for unchanged variants + fresh rows for changed ones, in catalog order.'''
+    changed_set = set(changed)
+    order = {v["id"]: i for i, v in enumerate(variants)}
+    rows = [c for c in previous if c["variant_id"] not in changed_set] + fresh
+    rows = [c for c in rows if c["variant_id"] in order]
+    rows.sort(key=lambda c: order[c["variant_id"]])
+    return rows
+
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--db-url", default=os.environ.get("DATABASE_URL", ""))
     ap.add_argument("--out", default="site/data/catalog.json")
+    ap.add_argument("--incremental", action="store_true",
+                    help="Re-read VRAM components only for variants changed since the previous export at --out")
     args = ap.parse_args()
 
     if not args.db_url:
@@ -41,31 +105,57 @@ def main():
 
     out_path = args.out
     os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    previous = load_previous_export(out_path) if args.incremental else None
 
-    with psycopg.connect(args.db_url, row_factory=dict_row) as conn:
+    # postgresql://... or sqlite:///path.db (embedded; everything runs in-process)
+    with connect(args.db_url) as conn:
         with conn.cursor() as cur:
             # Required core tables
             required = ["model_family", "model_variant", "derived_estimate", "estimate_profile"]
             missing_required = [t for t in required if not table_exists(cur, t)]
             if missing_required:
-                cur.execute("""
-                    SELECT tablename
-                    FROM pg_catalog.pg_tables
-                    WHERE schemaname='public'
-                    ORDER BY tablename;
-                """)
-                existing = [r["tablename"] for r in cur.fetchall()]
+                existing = list_tables(cur)
                 raise SystemExit(
                     "Schema not applied correctly. Missing required tables: "
                     f"{missing_required}. Existing tables: {existing}"
                 )
 
+            # Change-feed position + DB clock for the next --incremental export. A crawl
+            # transaction that is still open holds a lower crawl_change id / an earlier
+            # created_at than the cursor and would be skipped once it commits, so the
+            # cursor is only recorded when no crawl_run is running (checked in the same
+            # statement: a run's final status commits after all of its families).
+            change_cursor = None
+            if table_exists(cur, "crawl_change"):
+                cur.execute("""
+                    SELECT COALESCE((SELECT MAX(id) FROM crawl_change), 0) AS change_id,
+                           now()::text AS estimates_after,
+                           (SELECT id::text FROM crawl_run WHERE status = 'running'
+                            ORDER BY started_at DESC LIMIT 1) AS running_run_id;
+                """)
+                row = cur.fetchone()
+                if row["running_run_id"] is None:
+                    change_cursor = {"change_id": row["change_id"], "estimates_after": row["estimates_after"]}
+                elif previous is not None:
+                    raise SystemExit(
+                        f"crawl_run {row['running_run_id']} is still running; --incremental could miss "
+                        "its uncommitted changes. Export after it finishes, or without --incremental."
+                    )
+
             # Optional workflow/toolchain (seeded by migration; exporter tolerates absence)
             if table_exists(cur, "workflow"):
                 cur.execute("SELECT slug, name, description, category FROM workflow ORDER BY name;")
                 workflows = cur.fetchall()
+                cur.execute("""
+                    SELECT DISTINCT default_context_tokens
+                    FROM workflow
+                    WHERE default_context_tokens IS NOT NULL
+                    ORDER BY default_context_tokens;
+                """)
+                context_buckets = [r["default_context_tokens"] for r in cur.fetchall()]
             else:
                 workflows = DEFAULT_WORKFLOWS
+                context_buckets = [8192]
 
             if table_exists(cur, "toolchain"):
                 cur.execute("SELECT slug, display_name, description FROM toolchain ORDER BY display_name;")
@@ -84,7 +174,7 @@ def main():
 
             cur.execute("""
                 SELECT mv.id::text AS id, mf.slug AS family_slug, mv.tag, mv.tag_short, mv.digest,
-                       mv.size_bytes, (mv.size_bytes::numeric/(1024^3))::float8 AS size_gib,
+                       mv.size_bytes, (mv.size_bytes / 1073741824.0)::float8 AS size_gib,
                        mv.max_context, mv.input_type,
                        mv.catalog_first_seen_at::text, mv.last_seen_at::text, mv.verification
                 FROM model_variant mv
@@ -93,25 +183,33 @@ def main():
             """)
             variants = cur.fetchall()
 
-            # VRAM estimator components (view)
+            # VRAM estimator components (view). The pivot reads the whole estimate
+            # history, so with --incremental only variants in the change feed (or with
+            # new estimates) since the previous export are re-read.
+            changed = None
             if view_exists(cur, "v_variant_vram_components"):
-                cur.execute("""
-                    SELECT variant_id::text,
-                           weights_vram_gib::float8,
-                           runtime_overhead_gib::float8,
-                           kv_bytes_per_token_opt::float8,
-                           kv_bytes_per_token_cons::float8,
-                           kv_cache_type
-                    FROM v_variant_vram_components
-                    ORDER BY family_slug, tag;
-                """)
-                comps = cur.fetchall()
+                if previous is not None and change_cursor is not None:
+                    changed = changed_variant_ids(cur, previous["change_cursor"])
+                    fresh = []
+                    if changed:
+                        cur.execute(COMPONENTS_SQL.format(where="WHERE variant_id = ANY(%s::uuid[])"), (changed,))
+                        fresh = cur.fetchall()
+                    comps = merge_components(previous.get("variant_components") or [], fresh, changed, variants)
+                else:
+                    cur.execute(COMPONENTS_SQL.format(where=""))
+                    comps = cur.fetchall()
             else:
                 comps = []
 
-            # Community signal
-            if view_exists(cur, "v_workflow_run_agg") and table_exists(cur, "workflow") and table_exists(cur, "toolchain"):
-                cur.execute("""
+            # Community signal (maintained aggregates; falls back to the full-scan view)
+            run_agg_view = "v_workflow_run_agg_maintained" if view_exists(cur, "v_workflow_run_agg_maintained") else "v_workflow_run_agg"
+            if view_exists(cur, run_agg_view) and table_exists(cur, "workflow") and table_exists(cur, "toolchain"):
+                p95_cols = (
+                    "wr.p95_tps::float8, wr.p95_ttft_ms::float8,"
+                    if run_agg_view == "v_workflow_run_agg_maintained"
+                    else "NULL::float8 AS p95_tps, NULL::float8 AS p95_ttft_ms,"
+                )
+                cur.execute(f"""
                     SELECT
                       wr.variant_id::text AS variant_id,
                       w.slug AS workflow_slug,
@@ -120,10 +218,11 @@ def main():
                       wr.run_count_trusted::bigint,
                       wr.p50_tps::float8,
                       wr.p50_ttft_ms::float8,
+                      {p95_cols}
                       wr.avg_quality::float8,
                       wr.avg_success::float8,
                       wr.last_run_at::text
-                    FROM v_workflow_run_agg wr
+                    FROM {run_agg_view} wr
                     JOIN workflow w ON w.id = wr.workflow_id
                     JOIN toolchain tc ON tc.id = wr.toolchain_id
                     ORDER BY w.slug, tc.slug;
@@ -132,8 +231,13 @@ def main():
             else:
                 run_agg = []
 
-            if view_exists(cur, "v_best_task_template") and table_exists(cur, "workflow"):
-                cur.execute("""
+            # Best templates (materialized; refresh is cheap since votes are pre-counted)
+            best_template_view = "v_best_task_template"
+            if view_exists(cur, "mv_best_task_template"):
+                cur.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY mv_best_task_template;")
+                best_template_view = "mv_best_task_template"
+            if view_exists(cur, best_template_view) and table_exists(cur, "workflow"):
+                cur.execute(f"""
                     SELECT
                       coalesce(vbt.variant_id::text, null) AS variant_id,
                       w.slug AS workflow_slug,
@@ -148,7 +252,7 @@ def main():
                       vbt.vote_sum::bigint,
                       vbt.submitted_at::text,
                       vbt.verification::text
-                    FROM v_best_task_template vbt
+                    FROM {best_template_view} vbt
                     JOIN workflow w ON w.id = vbt.workflow_id
                     LEFT JOIN toolchain tc ON tc.id = vbt.toolchain_id
                     ORDER BY w.slug;
@@ -190,6 +294,9 @@ def main():
             else:
                 constraint_profiles = []
 
+    # Precomputed fits for the preset views (hardware profile x workflow context x KV type)
+    fit_tables = build_fit_tables(comps, variants, constraint_profiles, context_buckets)
+
     payload = {
         "generated_at": datetime.now(timezone.utc).isoformat(),
         "workflows": workflows,
@@ -200,8 +307,10 @@ def main():
         "families": families,
         "variants": variants,
         "variant_components": comps,
+        "fit_tables": fit_tables,
         "workflow_run_agg": run_agg,
         "best_templates": best_templates,
+        "change_cursor": change_cursor,
         "notes": {
             "deployment": "Static GitHub Pages build. No live DB/API in this mode.",
             "estimates": "VRAM/KV values are estimated unless explicitly verified.",
@@ -209,12 +318,14 @@ def main():
     }
 
     with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(payload, f, ensure_ascii=False, indent=2)
+        json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
 
     print(
         f"Wrote {out_path} "
         f"(families={len(families)}, variants={len(variants)}, comps={len(comps)}, "
-        f"tags={len(tags)}, workflows={len(workflows)}, toolchains={len(toolchains)})"
+        f"tags={len(tags)}, workflows={len(workflows)}, toolchains={len(toolchains)}, "
+        f"fit_tables={len(fit_tables)})"
+        + (f"; incremental: {len(changed)} changed variants" if changed is not None else "")
     )
 
 
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import os, sys, time, random, asyncio, argparse
+
+import httpx
+import psycopg
+from psycopg.rows import dict_row
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ingest.server import IngestServer
+
+LOADTEST_SLUG = "loadtest-model"
+LOADTEST_TAG = f"{LOADTEST_SLUG}:7b"
+LOADTEST_WORKFLOW = "web-dev"
+LOADTEST_TOOLCHAIN = "vscode+roo-code"
+
+
+def seed(db_url: str, n_templates: int) -> list:
+    '''Create a throwaway family/variant plus templates to vote on. Returns template ids.'''
+    with psycopg.connect(db_url, row_factory=dict_row) as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO model_family (slug, display_name) VALUES (%s, %s)
+                ON CONFLICT (slug) DO UPDATE SET display_name = EXCLUDED.display_name
+                RETURNING id;
+            """, (LOADTEST_SLUG, "Load test model"))
+            family_id = cur.fetchone()["id"]
+            cur.execute("""
+                INSERT INTO model_variant (family_id, tag, tag_short, size_bytes) VALUES (%s, %s, '7b', 4500000000)
+                ON CONFLICT (family_id, tag) DO UPDATE SET size_bytes = EXCLUDED.size_bytes
+                RETURNING id;
+            """, (family_id, LOADTEST_TAG))
+            variant_id = cur.fetchone()["id"]
+            cur.execute("SELECT id FROM workflow WHERE slug = %s;", (LOADTEST_WORKFLOW,))
+            workflow_id = cur.fetchone()["id"]
+            template_ids = []
+            for i in range(n_templates):
+                cur.execute("""
+                    INSERT INTO task_template (variant_id, workflow_id, task_name)
+                    VALUES (%s, %s, %s) RETURNING id::text;
+                """, (variant_id, workflow_id, f"loadtest template {i}"))
+                template_ids.append(cur.fetchone()["id"])
+    return template_ids
+
+
+def cleanup(db_url: str) -> None:
+    with psycopg.connect(db_url) as conn:
+        conn.execute("DELETE FROM model_family WHERE slug = %s;", (LOADTEST_SLUG,))
+
+
+def counts(db_url: str) -> dict:
+    with psycopg.connect(db_url, row_factory=dict_row) as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT
+                  (SELECT COUNT(*) FROM workflow_run wr JOIN model_variant mv ON mv.id = wr.variant_id
+                    WHERE mv.tag = %(tag)s) AS runs,
+                  (SELECT COALESCE(SUM(a.run_count), 0) FROM workflow_run_agg a JOIN model_variant mv ON mv.id = a.variant_id
+                    WHERE mv.tag = %(tag)s) AS agg_run_count,
+                  (SELECT COUNT(*) FROM template_vote tv JOIN task_template tt ON tt.id = tv.template_id
+                    JOIN model_variant mv ON mv.id = tt.variant_id WHERE mv.tag = %(tag)s) AS votes,
+                  (SELECT COALESCE(SUM(t.vote_count), 0) FROM template_vote_tally t JOIN task_template tt ON tt.id = t.template_id
+                    JOIN model_variant mv ON mv.id = tt.variant_id WHERE mv.tag = %(tag)s) AS tally_vote_count;
+            """, {"tag": LOADTEST_TAG})
+            return cur.fetchone()
+
+
+def make_run() -> dict:
+    return {
+        "variant": LOADTEST_TAG,
+        "workflow": LOADTEST_WORKFLOW,
+        "toolchain": LOADTEST_TOOLCHAIN,
+        "context_tokens": random.choice([8192, 16384, 32768]),
+        "kv_cache_type": random.choice(["fp16", "q8", "q4"]),
+        "tokens_per_second": round(random.lognormvariate(3.0, 0.5), 2),
+        "ttft_ms": int(random.lognormvariate(6.0, 0.6)),
+        "quality_score": random.randint(1, 10),
+        "success": random.random() < 0.8,
+    }
+
+
+def make_vote(template_ids: list, n_voters: int) -> dict:
+    return {
+        "template_id": random.choice(template_ids),
+        "voter_fingerprint": f"loadtest-voter-{random.randrange(n_voters):08d}",
+        "vote": random.choice([1, -1]),
+    }
+
+
+async def fire(client: httpx.AsyncClient, path: str, bodies: list, concurrency: int) -> dict:
+    sem = asyncio.Semaphore(concurrency)
+    latencies: list = []
+    stats = {"ok": 0, "retried_503": 0, "unconfirmed_202": 0, "errors": 0}
+
+    async def one(body):
+        async with sem:
+            while True:
+                t0 = time.perf_counter()
+                r = await client.post(path, json=body)
+                if r.status_code == 503:
+                    stats["retried_503"] += 1
+                    await asyncio.sleep(float(r.headers.get("retry-after", "1")) * random.random())
+                    continue
+                latencies.append(time.perf_counter() - t0)
+                stats[{201: "ok", 202: "unconfirmed_202"}.get(r.status_code, "errors")] += 1
+                return
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(b) for b in bodies))
+    elapsed = time.perf_counter() - t0
+    latencies.sort()
+    n_items = sum(len(b) if isinstance(b, list) else 1 for b in bodies)
+    return {
+        **stats,
+        "requests": len(bodies),
+        "items": n_items,
+        "elapsed_s": round(elapsed, 3),
+        "items_per_s": round(n_items / elapsed, 1) if elapsed else None,
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+        "p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 1) if latencies else None,
+    }
+
+
+async def run(args) -> None:
+    template_ids = seed(args.db_url, args.templates)
+    server = None
+    url = args.url
+    if not url:
+        server = IngestServer(args.db_url, pool_size=args.pool_size, batch_size=args.batch_size,
+                              max_wait_ms=args.max_wait_ms, max_pending=args.max_pending)
+        await server.start("127.0.0.1", args.port)
+        url = f"http://127.0.0.1:{args.port}"
+
+    def chunk(items):
+        if args.per_request <= 1:
+            return items
+        return [items[i:i + args.per_request] for i in range(0, len(items), args.per_request)]
+
+    runs = chunk([make_run() for _ in range(args.runs)])
+    votes = chunk([make_vote(template_ids, args.voters) for _ in range(args.votes)])
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60.0) as client:
+            before = counts(args.db_url)
+            run_stats, vote_stats = await asyncio.gather(
+                fire(client, "/runs", runs, args.concurrency),
+                fire(client, "/votes", votes, args.concurrency),
+            )
+            after = counts(args.db_url)
+            health = (await client.get("/healthz")).json()
+    finally:
+        if server is not None:
+            await server.stop()
+
+    print("runs: ", run_stats)
+    print("votes:", vote_stats)
+    print("db delta:", {k: int(after[k]) - int(before[k]) for k in after})
+    print("server:", health)
+
+    if args.cleanup:
+        cleanup(args.db_url)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Load test the ingest service against a local Postgres")
+    ap.add_argument("--db-url", default=os.environ.get("DATABASE_URL", ""))
+    ap.add_argument("--url", default=None, help="Target a running ingest service instead of starting one in-process")
+    ap.add_argument("--port", type=int, default=8091)
+    ap.add_argument("--runs", type=int, default=20_000)
+    ap.add_argument("--votes", type=int, default=50_000)
+    ap.add_argument("--templates", type=int, default=50)
+    ap.add_argument("--voters", type=int, default=10_000, help="Distinct voter fingerprints (repeats exercise dedupe)")
+    ap.add_argument("--per-request", type=int, default=1, help="Submissions per request (JSON array when > 1)")
+    ap.add_argument("--concurrency", type=int, default=200)
+    ap.add_argument("--pool-size", type=int, default=4)
+    ap.add_argument("--batch-size", type=int, default=500)
+    ap.add_argument("--max-wait-ms", type=float, default=50.0)
+    ap.add_argument("--max-pending", type=int, default=20_000)
+    ap.add_argument("--cleanup", action="store_true", help="Delete the seeded load-test family afterwards")
+    args = ap.parse_args()
+
+    if not args.db_url:
+        raise SystemExit("DATABASE_URL is required")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
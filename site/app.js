@@ -57,12 +57,6 @@ async function loadCatalog() {
   return await res.json();
 }
 
-function byId(list) {
-  const m = new Map();
-  for (const x of list) m.set(x.id, x);
-  return m;
-}
-
 function el(id) { return document.getElementById(id); }
 
 function option(text, value) {
@@ -139,6 +133,7 @@ function renderDetail(variant, family, comps, ctx, budget, kvType, runAgg, bestT
     <div style="margin-bottom:10px">
       ${runAgg ? `
         <div class="muted">trusted runs: ${fmtInt(runAgg.run_count_trusted)} · p50 TPS: ${fmtNum(runAgg.p50_tps,1)} · p50 TTFT: ${fmtInt(runAgg.p50_ttft_ms)}</div>
+        <div class="muted">p95 TPS: ${fmtNum(runAgg.p95_tps,1)} · p95 TTFT: ${fmtInt(runAgg.p95_ttft_ms)}</div>
         <div class="muted">avg quality: ${fmtNum(runAgg.avg_quality,1)} · avg success: ${fmtNum(runAgg.avg_success,1)} · last run: ${runAgg.last_run_at}</div>
       ` : `<div class="muted">No workflow runs recorded yet for this workflow/toolchain.</div>`}
     </div>
@@ -199,6 +194,7 @@ for (const ft of (catalog.family_tags || [])) {
   const familiesBySlug = new Map((catalog.families || []).map(f => [f.slug, f]));
   const variants = catalog.variants || [];
   const compsByVariantId = new Map((catalog.variant_components || []).map(c => [c.variant_id, c]));
+  const fitTablesKeyed = new Map((catalog.fit_tables || []).map(t => [`${t.budget_gib}|${t.context_tokens}|${t.kv_cache_type}`, t]));
   const runAgg = catalog.workflow_run_agg || [];
   const runAggKeyed = new Map(runAgg.map(r => [`${r.variant_id}|${r.workflow_slug}|${r.toolchain_slug}`, r]));
   const bestTemplates = catalog.best_templates || [];
@@ -224,7 +220,43 @@ for (const ft of (catalog.family_tags || [])) {
 
     const results = [];
 
-    for (const v of variants) {
+    // Preset views (hardware profile x workflow context x KV type) are precomputed by the exporter.
+    const candidates = [];
+    const fitTable = fitTablesKeyed.get(`${budget}|${ctx}|${kv}`);
+    if (fitTable) {
+      for (let i = 0; i < fitTable.variant_idx.length; i++) {
+        const v = variants[fitTable.variant_idx[i]];
+        if (!v) continue;
+        candidates.push({
+          v,
+          tier: fitTable.fit_tiers[i],
+          vramOpt: fitTable.vram_required_opt_gib[i],
+          vramCons: fitTable.vram_required_cons_gib[i],
+          maxCtx: fitTable.max_context_tokens_cons[i],
+        });
+      }
+    } else {
+      for (const v of variants) {
+        const comps = compsByVariantId.get(v.id);
+        if (!comps) continue;
+
+        const weights = comps.weights_vram_gib;
+        const runtime = comps.runtime_overhead_gib;
+        const kvOpt = comps.kv_bytes_per_token_opt;
+        const kvCons = comps.kv_bytes_per_token_cons;
+        // Incomplete components are left out, as in the precomputed tables (crawler/fit.py).
+        if (weights == null || runtime == null || kvOpt == null || kvCons == null) continue;
+
+        const vramOpt = computeVram(weights, runtime, kvOpt, ctx, kv);
+        const vramCons = computeVram(weights, runtime, kvCons, ctx, kv);
+        const tier = fitTier(vramCons, vramOpt, budget);
+        if (tier === 'no_fit') continue;
+
+        candidates.push({v, tier, vramOpt, vramCons, maxCtx: maxCtxThatFits(budget, weights, runtime, kvCons, kv)});
+      }
+    }
+
+    for (const {v, tier, vramOpt, vramCons, maxCtx} of candidates) {
       const fam = familiesBySlug.get(v.family_slug);
       const text = `${v.family_slug} ${v.tag} ${fam?.display_name || ''} ${(fam?.labels || []).join(' ')}`.toLowerCase();
       if (q && !text.includes(q)) continue;
@@ -235,19 +267,6 @@ if (useCase) {
   if (!tags || !tags.has(useCase)) continue;
 }
 
-      const comps = compsByVariantId.get(v.id);
-      if (!comps) continue;
-
-      const weights = comps.weights_vram_gib;
-      const runtime = comps.runtime_overhead_gib;
-      const kvOpt = comps.kv_bytes_per_token_opt;
-      const kvCons = comps.kv_bytes_per_token_cons;
-
-      const vramOpt = computeVram(weights, runtime, kvOpt, ctx, kv);
-      const vramCons = computeVram(weights, runtime, kvCons, ctx, kv);
-      const tier = fitTier(vramCons, vramOpt, budget);
-      if (tier === 'no_fit') continue;
-
       let run = null;
       if (workflow && toolchain) run = runAggKeyed.get(`${v.id}|${workflow}|${toolchain}`) || null;
 
@@ -272,7 +291,7 @@ if (useCase) {
         fit_tier: tier,
         vram_required_opt_gib: vramOpt,
         vram_required_cons_gib: vramCons,
-        max_context_tokens_cons: maxCtxThatFits(budget, weights, runtime, kvCons, kv),
+        max_context_tokens_cons: maxCtx,
         run_count_trusted: run?.run_count_trusted || 0,
         p50_tps: run?.p50_tps ?? null,
         p50_ttft_ms: run?.p50_ttft_ms ?? null,
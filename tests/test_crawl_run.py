@@ -0,0 +1,87 @@
+from __future__ import annotations
+import sys
+import pytest
+import crawler.main as crawler_main
+from crawler.db import connect, finalize_crawl_run
+from crawler.types import FamilyParsed, VariantParsed
+
+CATALOG = {
+    "alpha": {"7b": 4_000_000_000, "13b": 7_500_000_000},
+    "beta": {"3b": 2_000_000_000},
+}
+
+@pytest.fixture
+def db_url(tmp_path):
+    return f"sqlite:///{tmp_path / 'catalog.db'}"
+
+def crawl(monkeypatch, db_url: str, catalog: dict, *extra: str, failing=()):
+    '''Run crawler.main against an in-memory library listing; `failing` slugs raise while parsing.'''
+    def parse_family(html, slug):
+        if slug in failing:
+            raise RuntimeError(f"fetch gave up on {slug}")
+        variants = [VariantParsed(family_slug=slug, tag=f"{slug}:{t}", tag_short=t, size_bytes=size, digest=f"{slug}-{t}")
+                    for t, size in catalog[slug].items()]
+        return FamilyParsed(slug=slug), variants
+
+    monkeypatch.setattr(crawler_main, "fetch_text", lambda url: url)
+    monkeypatch.setattr(crawler_main, "parse_library_slugs", lambda html: list(catalog))
+    monkeypatch.setattr(crawler_main, "parse_family_and_variants_from_tags_page", parse_family)
+    monkeypatch.setattr(sys, "argv", ["crawler", "--db-url", db_url, "--delay", "0", *extra])
+    crawler_main.main()
+
+def latest_run(conn) -> dict:
+    with conn.cursor() as cur:
+        cur.execute("SELECT id, status, stats_json FROM crawl_run ORDER BY started_at DESC LIMIT 1;")
+        return cur.fetchone()
+
+def queue_statuses(conn, run_id: str) -> dict:
+    with conn.cursor() as cur:
+        cur.execute("SELECT slug, status FROM crawl_queue WHERE run_id = %s ORDER BY slug;", (run_id,))
+        return {r["slug"]: r["status"] for r in cur.fetchall()}
+
+def test_finalize_twice_keeps_stats_and_removed_families(monkeypatch, db_url):
+    crawl(monkeypatch, db_url, CATALOG)
+    crawl(monkeypatch, db_url, {"alpha": CATALOG["alpha"]})
+
+    with connect(db_url) as conn:
+        run = latest_run(conn)
+        assert run["status"] == "success"
+        assert run["stats_json"]["families_removed"] == 1
+
+        assert finalize_crawl_run(conn, run["id"]) is None
+        conn.commit()
+
+        assert latest_run(conn)["stats_json"] == run["stats_json"]
+        with conn.cursor() as cur:
+            cur.execute("SELECT family_slug FROM crawl_change WHERE run_id = %s AND change = 'removed';", (run["id"],))
+            assert [r["family_slug"] for r in cur.fetchall()] == ["beta"]
+
+def test_resume_retries_failed_families_of_a_finished_run(monkeypatch, db_url):
+    crawl(monkeypatch, db_url, CATALOG, failing={"beta"})
+    with connect(db_url) as conn:
+        run = latest_run(conn)
+        assert run["status"] == "success"
+        assert run["stats_json"]["families_failed"] == 1
+        assert queue_statuses(conn, run["id"]) == {"alpha": "done", "beta": "failed"}
+
+    crawl(monkeypatch, db_url, CATALOG, "--resume")
+    with connect(db_url) as conn:
+        resumed = latest_run(conn)
+        assert resumed["id"] == run["id"]
+        assert resumed["status"] == "success"
+        assert resumed["stats_json"]["families_failed"] == 0
+        assert queue_statuses(conn, run["id"]) == {"alpha": "done", "beta": "done"}
+
+def test_resume_refuses_a_clean_successful_run(monkeypatch, db_url):
+    crawl(monkeypatch, db_url, CATALOG)
+    with pytest.raises(SystemExit, match="is success; nothing to resume"):
+        crawl(monkeypatch, db_url, CATALOG, "--resume")
+
+def test_finalize_prunes_snapshots_of_old_runs(monkeypatch, db_url):
+    for _ in range(4):
+        crawl(monkeypatch, db_url, CATALOG)
+    with connect(db_url) as conn, conn.cursor() as cur:
+        cur.execute("SELECT id FROM crawl_run ORDER BY started_at DESC;")
+        runs = [r["id"] for r in cur.fetchall()]
+        cur.execute("SELECT DISTINCT run_id FROM crawl_variant_snapshot;")
+        assert {r["run_id"] for r in cur.fetchall()} == set(runs[:3])
@@ -0,0 +1,59 @@
+from __future__ import annotations
+import asyncio
+import json
+from crawler.run_agg import fold_runs
+from crawler.sketch import DDSketch
+from ingest.server import IngestServer, MicroBatcher
+
+class StubResolver:
+    async def lookup(self, kind: str, key: str):
+        return f"{kind}-id"
+
+def make_server(written: list) -> IngestServer:
+    # No pool/DB: resolve every slug and collect batches in memory.
+    server = IngestServer.__new__(IngestServer)
+    server.resolver = StubResolver()
+    server.runs = MicroBatcher(written.extend, batch_size=100, max_wait_s=0.01, max_pending=1000, workers=1)
+    server.votes = MicroBatcher(written.extend, batch_size=100, max_wait_s=0.01, max_pending=1000, workers=1)
+    return server
+
+def post_runs(body: bytes):
+    written: list = []
+
+    async def go():
+        server = make_server(written)
+        server.runs.start()
+        try:
+            return await server._route("POST", "/runs", body)
+        finally:
+            await server.runs.stop()
+
+    return asyncio.run(go()), written
+
+def test_infinite_tps_is_rejected_with_422():
+    body = b'{"variant": "m:7b", "workflow": "web-dev", "tokens_per_second": 1e400}'
+    (status, payload), written = post_runs(body)
+    assert status == 422
+    assert payload["details"][0]["loc"] == ["tokens_per_second"]
+    assert written == []
+
+def test_finite_tps_is_accepted():
+    body = json.dumps({"variant": "m:7b", "workflow": "web-dev", "tokens_per_second": 42.5}).encode()
+    (status, payload), written = post_runs(body)
+    assert (status, payload) == (201, {"accepted": 1})
+    assert written[0]["tokens_per_second"] == 42.5
+
+def test_sketch_skips_non_finite_values():
+    sketch = DDSketch()
+    for v in (10.0, float("inf"), float("-inf"), float("nan"), 20.0):
+        sketch.add(v)
+    assert sketch.count == 2
+
+def test_fold_runs_survives_an_infinite_value():
+    runs = [
+        {"variant_id": "v", "workflow_id": "w", "toolchain_id": None, "tokens_per_second": tps, "ttft_ms": 100}
+        for tps in (10.0, float("inf"), 30.0)
+    ]
+    agg = fold_runs(runs)[("v", "w", None)]
+    assert agg.run_count == 3
+    assert agg.tps.count == 2